@@ -2,12 +2,30 @@
 # Creado por Jeysshon
 # Parsing posicional + matching con MASTERDATA. Incluye SALARIO en Netos y Preno_Convertida.
 # MEJORADO: Formateo de fechas y optimizaciones
+# Interfaz Streamlit: el motor (parsing, MASTERDATA, exportación) está en el paquete liquidacion/
 
-import streamlit as st
-import pandas as pd
 import re
-from datetime import datetime, timedelta
-import io
+
+import pandas as pd
+import streamlit as st
+from datetime import datetime
+
+from liquidacion import (
+    huella_lote, exportar_a_archivo, hojas_de_resumen,
+    ErrorLiquidacion,
+    FORMATOS_EXPORTACION, EXTENSION_EXPORTACION, MIME_EXPORTACION,
+    CACHE_RESULTADOS, hash_archivo,
+    GESTOR_TRABAJOS, procesar_y_exportar, copiar_archivo,
+    HISTORICO, borrar_estados,
+)
+from liquidacion.conciliacion import (
+    incidencias, resumen_conciliacion, leer_prefijos, PREFIJOS_DEDUCCION, PREFIJOS_INFORMATIVOS,
+    AVISO_SIN_PREFIJOS,
+)
+from liquidacion.trabajos import EN_COLA, FALLIDO
+
+# Desde Streamlit 1.52 download_button acepta una función que se llama al hacer clic
+DESCARGA_DIFERIDA = tuple(int(p) for p in re.findall(r'\d+', st.__version__)[:2]) >= (1, 52)
 
 # -------------------------------
 # Configuración de página
@@ -132,298 +150,453 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # -------------------------------
-# Utilidades mejoradas
+# Caché entre reejecuciones
 # -------------------------------
-def safe_slice(s: str, a: int, b: int) -> str:
-    """Extrae una subcadena de forma segura"""
-    if a >= len(s): 
-        return ""
-    return s[a:b]
-
-def to_num(v):
-    """Convierte un valor a número de forma segura"""
-    try:
-        if pd.isna(v) or v == '': 
-            return 0
-        return float(str(v).replace('.', '').replace(',', '.'))
-    except:
-        return 0
-
-def formatear_fecha_excel(fecha_valor):
+def huella_archivo(archivo) -> str:
+    """SHA-256 del archivo subido, memorizado en la sesión por file_id para no rehacerlo en cada rerun"""
+    memo = st.session_state.setdefault('_huellas_archivos', {})
+    clave = (archivo.file_id, archivo.name, archivo.size)
+    if clave not in memo:
+        memo[clave] = hash_archivo(archivo)
+    return memo[clave]
+
+def huella_liquidaciones(archivos) -> str:
+    """Huella de un archivo de liquidación o, si son varios, del lote completo"""
+    if len(archivos) == 1:
+        return huella_archivo(archivos[0])
+    return huella_lote([(a.name, huella_archivo(a)) for a in archivos])
+
+def enviar_trabajo(archivos_liquidacion, archivo_masterdata, huellas, perfilar: bool, incremental: bool,
+                   prefijos: tuple):
     """
-    Convierte números de fecha de Excel (serial date) a formato dd/mm/yyyy
+    Envía el procesamiento y la exportación a Excel al pool de trabajos. Sesiones con
+    los mismos archivos y el mismo modo comparten el trabajo (salvo que se perfile).
+    Desde otra sesión solo se puede reconectar quien cargue los mismos archivos.
     """
-    try:
-        # Si ya es una cadena con formato de fecha, devolverla
-        if isinstance(fecha_valor, str):
-            # Verificar si ya está en formato dd/mm/yyyy
-            if re.match(r'\d{1,2}/\d{1,2}/\d{4}', fecha_valor):
-                return fecha_valor
-        
-        # Si es un número (serial date de Excel)
-        if isinstance(fecha_valor, (int, float)) and not pd.isna(fecha_valor):
-            # Excel cuenta desde 1900-01-01, pero tiene un bug del año bisiesto
-            # Fecha base de Excel: 1900-01-01 = 1
-            fecha_base = datetime(1899, 12, 30)  # Compensar el bug de Excel
-            fecha_convertida = fecha_base + timedelta(days=int(fecha_valor))
-            return fecha_convertida.strftime('%d/%m/%Y')
-        
-        # Si es un objeto datetime
-        if isinstance(fecha_valor, datetime):
-            return fecha_valor.strftime('%d/%m/%Y')
-        
-        # Si es pd.Timestamp
-        if isinstance(fecha_valor, pd.Timestamp):
-            return fecha_valor.strftime('%d/%m/%Y')
-        
-        # Si no se puede convertir, devolver valor original
-        return fecha_valor
-        
-    except Exception:
-        # En caso de error, devolver el valor original
-        return fecha_valor
-
-CODIGO_REGEX = re.compile(r'^\s*(/5\d+|[YZ]\d{3}|\d{4}|\d{3,5})')
-
-def extraer_codigo_y_concepto(linea: str):
-    """Extrae código y concepto de una línea"""
-    texto = linea.replace('\t', ' ')
-    m = CODIGO_REGEX.match(texto)
-    if m:
-        codigo = m.group(1).strip()
-        idx_fin = m.end()
-    else:
-        parts = texto.strip().split()
-        codigo = parts[0] if parts else ""
-        idx_fin = texto.find(codigo) + len(codigo) if codigo else 0
-    concepto = texto[idx_fin:50].strip()
-    return codigo, concepto
-
-def _normalize(s: str) -> str:
-    """Normaliza una cadena para comparación"""
-    s = s.lower().strip()
-    s = s.replace('á','a').replace('é','e').replace('í','i').replace('ó','o').replace('ú','u')
-    return re.sub(r'[^a-z0-9]', '', s)
-
-CANDIDATOS_SALARIO = [
-    'importe','importebase','salario','salariobase','sueldo','sueldobase',
-    'basico','basicos','basicointegral','remuneracion','remuneraciones','valorbase'
-]
-
-def adjuntar_salario(df_merged: pd.DataFrame) -> pd.DataFrame:
-    """Identifica y adjunta la columna de salario automáticamente"""
-    if 'SALARIO' in df_merged.columns:
-        return df_merged
-
-    norm_map = {col: _normalize(col) for col in df_merged.columns}
-    elegido = None
-    for col, key in norm_map.items():
-        if any(cand in key for cand in CANDIDATOS_SALARIO):
-            elegido = col
-            break
-
-    if elegido:
-        df_merged['SALARIO'] = df_merged[elegido]
-        # Convertir a numérico si es texto
-        if df_merged['SALARIO'].dtype == object:
-            df_merged['SALARIO'] = df_merged['SALARIO'].apply(lambda x: to_num(x) if isinstance(x, str) else x)
-    else:
-        df_merged['SALARIO'] = pd.NA
+    nombres = [a.name for a in archivos_liquidacion]
+    trabajo = GESTOR_TRABAJOS.enviar(
+        procesar_y_exportar,
+        [copiar_archivo(a) for a in archivos_liquidacion], copiar_archivo(archivo_masterdata),
+        formato='xlsx', cache=CACHE_RESULTADOS, huellas=huellas,
+        max_procesos=GESTOR_TRABAJOS.procesos_por_trabajo(), incremental=incremental, prefijos=prefijos,
+        descripcion=f"{', '.join(nombres)} + {archivo_masterdata.name}",
+        clave=None if perfilar else ('consolidacion', incremental, prefijos) + huellas,
+        perfil=perfilar,
+        datos={'liquidacion': nombres, 'masterdata': archivo_masterdata.name},
+        acceso=huellas,
+    )
+    st.session_state.setdefault('trabajos_sesion', []).append(trabajo.id)
+    return trabajo
 
-    return df_merged
+def reconectar_trabajo(id_trabajo: str, archivos_liquidacion, archivo_masterdata):
+    """
+    Trabajo enviado desde esta sesión o, si es de otra, de los mismos archivos
+    cargados (el ID solo no da acceso a los resultados de otra sesión). None si no hay.
+    """
+    if id_trabajo in st.session_state.get('trabajos_sesion', []):
+        return GESTOR_TRABAJOS.obtener(id_trabajo)
+    if not (archivos_liquidacion and archivo_masterdata):
+        return None
+    huellas = (huella_liquidaciones(archivos_liquidacion), huella_archivo(archivo_masterdata))
+    trabajo = GESTOR_TRABAJOS.reconectar(id_trabajo, huellas)
+    if trabajo is not None:
+        st.session_state.setdefault('trabajos_sesion', []).append(trabajo.id)
+    return trabajo
 
-# -------------------------------
-# Parsing de Liquidación (mejorado)
-# -------------------------------
-def procesar_liquidacion_pipeline(contenido_archivo_txt: str) -> pd.DataFrame:
-    """Procesa el archivo de liquidación con parsing posicional mejorado"""
-    lineas = contenido_archivo_txt.split('\n')
-    df = pd.DataFrame({'Linea': [linea.strip('\r') for linea in lineas if linea.strip()]})
-
-    def extraer_sap(linea):
-        if 'Núm. Personal' in linea or 'Nm. Personal' in linea:
-            m = re.search(r'Personal\.+(\d+)', linea)
-            return m.group(1) if m else None
+def exportacion_en_trabajo(resultado, formato: str):
+    """
+    Exportación del resultado en `formato`. El Excel lo genera el trabajo de
+    consolidación; los otros formatos se generan al pedirlos en un trabajo del
+    pool (sin bloquear la sesión) y quedan en disco con el resultado. Devuelve el
+    ArchivoExportado, o None mientras se genera (se muestra su avance).
+    """
+    exportado = resultado['exportaciones'].get(formato)
+    if exportado is not None:
+        return exportado
+
+    def exportar():
+        return exportar_a_archivo(
+            resultado['df_conceptos'], resultado['df_netos'], resultado['masterdata'], formato,
+            hojas_adicionales=hojas_de_resumen(resultado['df_conceptos'], resultado['resumen_df'],
+                                               resultado['conciliacion']))
+
+    trabajo = GESTOR_TRABAJOS.enviar(
+        exportar, descripcion=f"Exportación {formato}",
+        clave=('exportacion', formato, resultado['prefijos']) + resultado['huellas'],
+        datos={'formato': formato})
+    if not trabajo.terminado:
+        mostrar_avance(trabajo.id, reconectable=False)
         return None
+    if trabajo.estado == FALLIDO:
+        raise trabajo.error
+    return resultado['exportaciones'].setdefault(formato, trabajo.resultado)
 
-    df['SAP_Ident'] = df['Linea'].apply(extraer_sap)
-    df['SAP_Ident'] = df['SAP_Ident'].fillna(method='ffill')
-
-    def es_concepto(linea):
-        s = linea.strip()
-        if 'PESOS CON 00/100' in s: 
-            return False
-        if len(s) <= 30: 
-            return False
-        codigo, _ = extraer_codigo_y_concepto(s)
-        return bool(re.match(r'^(Y|Z|9|2|/5)', codigo))
-
-    df = df[df['Linea'].apply(es_concepto)].copy()
-
-    def parsear(row):
-        linea = row['Linea']
-        codigo, concepto = extraer_codigo_y_concepto(linea)
-        return {
-            'CÓDIGO':   codigo,
-            'CONCEPTO': concepto,
-            'CANTIDAD': safe_slice(linea, 50, 70).strip(),
-            'VALOR':    safe_slice(linea, 69, 89).strip(),
-            'SAP':      row['SAP_Ident'],
-        }
-
-    out = pd.DataFrame([parsear(r) for _, r in df.iterrows()])
-    if not out.empty:
-        out['CANTIDAD'] = out['CANTIDAD'].apply(to_num)
-        out['VALOR']    = out['VALOR'].apply(to_num)
-        out['SAP']      = pd.to_numeric(out['SAP'], errors='coerce')
-    
-    return out
+def descargar_exportacion(exportado, filename: str, mime: str):
+    """
+    Botón de descarga de una exportación en disco (ArchivoExportado). Con
+    DESCARGA_DIFERIDA el archivo se lee recién al hacer clic; si no, se le pasa a
+    Streamlit abierto y este lo lee en cada ejecución de la página.
+    """
+    opciones = dict(label="📥 Descargar Consolidado", file_name=filename, mime=mime,
+                    type="primary", use_container_width=True)
+    if DESCARGA_DIFERIDA:
+        st.download_button(data=exportado.leer, **opciones)
+    else:
+        with exportado.abrir() as archivo:
+            st.download_button(data=archivo, **opciones)
 
 # -------------------------------
-# Parsing de Netos (mejorado)
+# Resultados
 # -------------------------------
-def procesar_netos_pipeline(contenido_archivo_txt: str) -> pd.DataFrame:
-    """Procesa los netos del archivo con parsing mejorado"""
-    lineas = contenido_archivo_txt.split('\n')
-    df = pd.DataFrame({'Linea': [linea.strip() for linea in lineas if linea.strip()]})
-
-    def extraer_sap(linea):
-        if 'Núm. Personal' in linea or 'Nm. Personal' in linea:
-            m = re.search(r'Personal\.+(\d+)', linea)
-            return m.group(1) if m else None
-        return None
+def mostrar_resultados(resultado):
+    """Resultados de un trabajo terminado (ver procesar_y_exportar)"""
+    df_conceptos, df_netos = resultado['df_conceptos'], resultado['df_netos']
+    masterdata_df, resumen_df = resultado['masterdata_df'], resultado['resumen_df']
 
-    df['SAP_Ident'] = df['Linea'].apply(extraer_sap)
-    df['SAP_Ident'] = df['SAP_Ident'].fillna(method='ffill')
-
-    df = df[df['Linea'].str.contains('Total General', na=False)].copy()
+    # Métricas mejoradas
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown(f"""
+        <div class="metric-box">
+            <div class="metric-number">{len(df_conceptos) if df_conceptos is not None else 0:,}</div>
+            <div class="metric-label">Conceptos Extraídos</div>
+        </div>
+        """, unsafe_allow_html=True)
+    with col2:
+        st.markdown(f"""
+        <div class="metric-box">
+            <div class="metric-number">{len(df_netos) if df_netos is not None else 0:,}</div>
+            <div class="metric-label">Netos Procesados</div>
+        </div>
+        """, unsafe_allow_html=True)
+    with col3:
+        st.markdown(f"""
+        <div class="metric-box">
+            <div class="metric-number">{len(masterdata_df):,}</div>
+            <div class="metric-label">Registros MASTERDATA</div>
+        </div>
+        """, unsafe_allow_html=True)
+        estado_snapshot = masterdata_df.attrs.get('snapshot')
+        if estado_snapshot == 'acierto':
+            st.caption("⚡ MASTERDATA cargado desde snapshot Parquet")
+        elif estado_snapshot == 'fallo':
+            st.caption("📄 MASTERDATA leído del archivo original (snapshot creado)")
+
+    importes_no_convertidos = sum(df.attrs.get('importes_no_convertidos', 0)
+                                  for df in (df_conceptos, df_netos) if df is not None)
+    if importes_no_convertidos:
+        st.warning(f"⚠️ {importes_no_convertidos:,} importes del archivo de liquidación no son un número válido y se tomaron como 0")
+
+    cambios = df_conceptos.attrs.get('cambios_sap') if df_conceptos is not None else None
+    cambios_df = pd.DataFrame(cambios) if cambios is not None else None
+    if cambios_df is not None:
+        conteo = cambios_df['CAMBIO'].value_counts()
+        st.info(f"🔁 Versión corregida: se reprocesaron {df_conceptos.attrs.get('bloques_reprocesados', 0):,} "
+                f"de {df_conceptos.attrs.get('bloques_totales', 0):,} bloques. SAP nuevos: {conteo.get('nuevo', 0):,}, "
+                f"eliminados: {conteo.get('eliminado', 0):,}, modificados: {conteo.get('modificado', 0):,}")
+        if not cambios_df.empty:
+            with st.expander("🔍 SAP que cambiaron respecto de la versión anterior"):
+                st.dataframe(cambios_df, use_container_width=True, hide_index=True)
+
+    if resumen_df is not None:
+        with st.expander(f"🗂️ Resumen por archivo ({len(resumen_df)} archivos)", expanded=True):
+            st.dataframe(resumen_df, use_container_width=True, hide_index=True)
+
+    mostrar_conciliacion(resultado['conciliacion'], resultado['prefijos'])
+
+    # Tabs mejoradas
+    tab1, tab2, tab3, tab4 = st.tabs(["👁️ Vista Previa", "📊 Análisis", "📥 Descargar", "🗄️ Histórico"])
+    
+    with tab1:
+        mostrar_explorador(resultado['explorador'])
 
-    def parsear(row):
-        linea = row['Linea']
-        return {
-            'NETO':  safe_slice(linea, 0, 32).strip(),
-            'Valor': linea[-20:].strip(),
-            'SAP':   row['SAP_Ident'],
-        }
+    with tab2:
+        st.subheader("📊 Análisis de Datos")
+        mostrar_analisis(resultado['cubo'])
 
-    out = pd.DataFrame([parsear(r) for _, r in df.iterrows()])
-    if not out.empty:
-        out['Valor'] = out['Valor'].apply(to_num)
-        out['SAP']   = pd.to_numeric(out['SAP'], errors='coerce')
-    
-    return out
+    with tab3:
+        st.subheader("📥 Descarga de Resultados")
+        
+        formato = st.radio(
+            "Formato de salida",
+            FORMATOS_EXPORTACION,
+            format_func={'xlsx': 'Excel (.xlsx)', 'csv': 'CSV (.zip)', 'parquet': 'Parquet (.zip)'}.get,
+            horizontal=True,
+        )
+
+        # MASTERDATA proyectado e indexado una vez por archivo (en el trabajo); se reutiliza en ambas hojas
+        masterdata = resultado['masterdata']
+        for aviso in masterdata.avisos:
+            st.warning(f"⚠️ {aviso}")
 
-# -------------------------------
-# Procesamiento principal (mejorado)
-# -------------------------------
-def procesar_archivos(archivo_liquidacion, archivo_masterdata):
-    """Procesa los archivos principales con manejo mejorado de errores"""
-    try:
-        # Procesar liquidación
-        contenido = archivo_liquidacion.getvalue().decode('latin-1', errors='ignore')
-        df_conceptos = procesar_liquidacion_pipeline(contenido)
-        df_netos     = procesar_netos_pipeline(contenido)
-
-        if df_conceptos.empty and df_netos.empty:
-            st.error("❌ No se pudieron extraer datos del archivo de liquidación.")
-            return None, None, None
-
-        # Procesar MASTERDATA con mejor detección de formato
         try:
-            archivo_nombre = archivo_masterdata.name.lower()
-            
-            if archivo_nombre.endswith('.csv'):
-                masterdata_df = pd.read_csv(archivo_masterdata, encoding='utf-8')
-            elif archivo_nombre.endswith('.xlsb'):
-                masterdata_df = pd.read_excel(archivo_masterdata, engine='pyxlsb')
-            elif archivo_nombre.endswith(('.xlsx', '.xls', '.xlsm')):
-                try:
-                    masterdata_df = pd.read_excel(archivo_masterdata, engine='openpyxl')
-                except:
-                    masterdata_df = pd.read_excel(archivo_masterdata, engine='xlrd')
-            else:
-                masterdata_df = pd.read_excel(archivo_masterdata)
-                
-        except Exception as e:
-            st.error(f"❌ Error al leer MASTERDATA: {str(e)}")
-            return None, None, None
-
-        # Limpiar nombres de columnas
-        masterdata_df.columns = masterdata_df.columns.str.strip()
+            exportado = exportacion_en_trabajo(resultado, formato)
+        except ErrorLiquidacion as e:
+            st.error(f"❌ {e}")
+            exportado = None
         
-        if 'Nº pers.' not in masterdata_df.columns:
-            st.error("❌ No se encontró la columna 'Nº pers.' en MASTERDATA")
-            st.info(f"📋 Columnas encontradas: {', '.join(masterdata_df.columns)}")
-            return None, None, None
+        if exportado is not None:
+            fecha = st.session_state.get('fecha_resultado', datetime.now())
+            filename = f"JMC_Nomina2025_{fecha.strftime('%Y%m%d_%H%M%S')}.{EXTENSION_EXPORTACION[formato]}"
             
-        return df_conceptos, df_netos, masterdata_df
-
-    except Exception as e:
-        st.error(f"❌ Error durante el procesamiento: {str(e)}")
-        return None, None, None
-
-# -------------------------------
-# Exportación a Excel (mejorada con formateo de fechas)
-# -------------------------------
-def crear_excel_descarga(df_conceptos, df_netos, masterdata_df):
-    """Crea archivo Excel con formato mejorado y fechas correctas"""
-    output = io.BytesIO()
-    try:
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            # Información sobre el archivo
+            st.info("📋 **Contenido del archivo:**\n- Hoja 'Netos': Datos consolidados con fechas formato dd/mm/yyyy\n- Hoja 'Preno_Convertida': Conceptos detallados con fechas formato dd/mm/yyyy (se divide en Preno_Convertida_2, _3... si supera el límite de filas de Excel)"
+                    + ("\n- Hoja 'Conciliacion': SAP cuyos conceptos no cuadran con su Total General o que no están en MASTERDATA"
+                       if resultado['conciliacion'] is not None else ""))
             
-            # Procesar Netos
-            if df_netos is not None and masterdata_df is not None:
-                netos = pd.merge(df_netos, masterdata_df, left_on='SAP', right_on='Nº pers.', how='left')
-                netos = adjuntar_salario(netos)
-                
-                cols_map = {
-                    'NETO':'NETO','Valor':'Valor','SAP':'SAP',
-                    'Número ID':'CÉDULA','Número de personal':'NOMBRE',
-                    'División de personal':'REGIONAL','Ce.coste':'CE_COSTE',
-                    'Fecha':'F. ING','Función':'CARGO','Área de personal':'NIVEL'
-                }
-                
-                cols_base = [c for c in cols_map.keys() if c in netos.columns]
-                df_final = netos[cols_base].rename(columns=cols_map)
-                df_final['SALARIO'] = netos['SALARIO']
-                
-                # FORMATEAR FECHAS AQUÍ
-                if 'F. ING' in df_final.columns:
-                    df_final['F. ING'] = df_final['F. ING'].apply(formatear_fecha_excel)
-                
-                order = ['NETO','Valor','SAP','CÉDULA','NOMBRE','REGIONAL','CE_COSTE','SALARIO','F. ING','CARGO','NIVEL']
-                df_final = df_final[[c for c in order if c in df_final.columns]]
-                df_final.to_excel(writer, sheet_name='Netos', index=False)
-
-            # Procesar Conceptos
-            if df_conceptos is not None and masterdata_df is not None:
-                conceptos = pd.merge(df_conceptos, masterdata_df, left_on='SAP', right_on='Nº pers.', how='left')
-                conceptos = adjuntar_salario(conceptos)
-                
-                cols_map = {
-                    'CÓDIGO':'CÓDIGO','CONCEPTO':'CONCEPTO','CANTIDAD':'CANTIDAD','VALOR':'VALOR','SAP':'SAP',
-                    'Número ID':'CÉDULA','Número de personal':'NOMBRE',
-                    'Fecha':'F. INGRESO','Función':'CARGO','Área de personal':'NIVEL'
-                }
-                
-                cols_base = [c for c in cols_map.keys() if c in conceptos.columns]
-                df_final = conceptos[cols_base].rename(columns=cols_map)
-                df_final['SALARIO'] = conceptos['SALARIO']
-                
-                # FORMATEAR FECHAS AQUÍ
-                if 'F. INGRESO' in df_final.columns:
-                    df_final['F. INGRESO'] = df_final['F. INGRESO'].apply(formatear_fecha_excel)
-                
-                order = ['CÓDIGO','CONCEPTO','CANTIDAD','VALOR','SAP','CÉDULA','NOMBRE','SALARIO','F. INGRESO','CARGO','NIVEL']
-                df_final = df_final[[c for c in order if c in df_final.columns]]
-                df_final.to_excel(writer, sheet_name='Preno_Convertida', index=False)
-
-        output.seek(0)
-        return output
-
-    except Exception as e:
-        st.error(f"❌ Error al crear archivo Excel: {str(e)}")
-        return None
+            descargar_exportacion(exportado, filename, MIME_EXPORTACION[formato])
+            
+            st.success(f"✅ Archivo listo: {filename}")
+
+    with tab4:
+        st.subheader("🗄️ Histórico por período")
+        try:
+            registrar_en_historico(resultado)
+            mostrar_comparacion_periodos()
+        except ErrorLiquidacion as e:
+            st.error(f"❌ {e}")
+
+def mostrar_conciliacion(conciliacion, prefijos):
+    """Resumen de la conciliación de conceptos contra 'Total General' y SAP con incidencias"""
+    if conciliacion is None:
+        st.info(f"⚖️ {AVISO_SIN_PREFIJOS[0].upper()}{AVISO_SIN_PREFIJOS[1:]}. Indica los prefijos en la sección "
+                f"\"Conciliación\" de la barra lateral y vuelve a procesar.")
+        return
+    resumen = resumen_conciliacion(conciliacion)
+    con_incidencia = resumen['diferencia'] + resumen['sin_total_general'] + resumen['sin_conceptos']
+    icono = "✅" if not con_incidencia else "⚠️"
+    with st.expander(f"{icono} Conciliación conceptos vs Total General "
+                     f"({resumen['cuadra']:,} cuadran, {con_incidencia:,} con diferencias)", expanded=bool(con_incidencia)):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("No cuadran", f"{resumen['diferencia']:,}")
+        col2.metric("Sin Total General", f"{resumen['sin_total_general']:,}")
+        col3.metric("Sin conceptos", f"{resumen['sin_conceptos']:,}")
+        col4.metric("SAP sin MASTERDATA", f"{resumen['sin_masterdata']:,}")
+        tabla = incidencias(conciliacion)
+        if not tabla.empty:
+            st.dataframe(tabla.head(1000), use_container_width=True, hide_index=True)
+            st.caption(f"{len(tabla):,} SAP con incidencias (se muestran los 1.000 de mayor diferencia; "
+                       f"todos están en la hoja 'Conciliacion' del archivo descargado). Neto calculado = "
+                       f"devengos − deducciones; los códigos {', '.join(prefijos[0])}... restan"
+                       + (f" y los {', '.join(prefijos[1])}... no se suman." if prefijos[1] else "."))
+
+# Hojas que se pueden explorar y tamaños de página
+HOJAS_EXPLORADOR = {'Preno_Convertida': "📋 Conceptos (Preno_Convertida)", 'Netos': "💰 Netos"}
+TAMANOS_PAGINA = [25, 50, 100, 500]
+
+def _lista_valores(texto: str) -> list:
+    """Valores separados por coma o espacio de un campo de texto"""
+    return [v for v in re.split(r'[,\s]+', texto.strip()) if v]
+
+def mostrar_explorador(explorador):
+    """Hojas combinadas con filtros y páginas: solo se cruza con MASTERDATA la página visible"""
+    hojas = [h for h in HOJAS_EXPLORADOR if h in explorador.hojas]
+    if not hojas:
+        st.info("📋 No hay conceptos ni netos para mostrar")
+        return
+    nombre = st.radio("Hoja", hojas, format_func=HOJAS_EXPLORADOR.get, horizontal=True, key='explorador_hoja')
+    hoja = explorador[nombre]
+
+    col1, col2, col3, col4 = st.columns(4)
+    sap = col1.text_input("SAP", key='explorador_sap', placeholder="Varios separados por coma")
+    cedula = col2.text_input("Cédula", key='explorador_cedula', placeholder="Varias separadas por coma",
+                             disabled=not explorador.filtra_cedula())
+    regional = col3.multiselect("Regional", explorador.regionales(), key='explorador_regional', placeholder="Todas")
+    codigo = col4.multiselect("Código", explorador.codigos(), key='explorador_codigo', placeholder="Todos",
+                              disabled=nombre != 'Preno_Convertida')
+    saps = _lista_valores(sap)
+    if not all(v.isdigit() for v in saps):
+        st.warning("⚠️ El SAP debe ser numérico")
+        return
+
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    orden = col1.selectbox("Ordenar por", hoja.columnas, index=None, key=f'explorador_orden_{nombre}',
+                           placeholder="Orden del archivo")
+    descendente = col2.toggle("Descendente", key='explorador_descendente')
+    tam_pagina = col3.selectbox("Filas por página", TAMANOS_PAGINA, index=1, key='explorador_tam_pagina')
+    consulta = dict(sap=[int(v) for v in saps], cedula=_lista_valores(cedula), regional=regional,
+                    codigo=codigo if nombre == 'Preno_Convertida' else None, orden=orden, descendente=descendente)
+    total = len(hoja.posiciones(**consulta))
+    paginas = max(1, -(-total // tam_pagina))
+    pagina = col4.number_input(f"Página (de {paginas:,})", min_value=1, max_value=paginas, value=1,
+                               key=f'explorador_pagina_{nombre}')
+
+    tabla, total = hoja.pagina(min(pagina, paginas), tam_pagina, **consulta)
+    st.dataframe(tabla, use_container_width=True, hide_index=True)
+    inicio = (min(pagina, paginas) - 1) * tam_pagina
+    if total:
+        st.caption(f"Filas {inicio + 1:,}–{inicio + len(tabla):,} de {total:,} ({len(hoja):,} en la hoja completa)")
+    else:
+        st.caption(f"Ninguna fila cumple los filtros ({len(hoja):,} en la hoja completa)")
+
+# Dimensiones del cubo que se pueden filtrar y desglosar en la pestaña de análisis
+DIMENSIONES_ANALISIS = {'REGIONAL': "Regional", 'CE_COSTE': "Centro de coste", 'NIVEL': "Nivel", 'CÓDIGO': "Código"}
+
+def mostrar_analisis(cubo):
+    """Filtros y desgloses sobre el cubo precalculado (no reagrupa las filas de conceptos y netos)"""
+    columnas = st.columns(len(DIMENSIONES_ANALISIS))
+    filtros = {}
+    for columna, (dimension, etiqueta) in zip(columnas, DIMENSIONES_ANALISIS.items()):
+        with columna:
+            formato = (lambda c: f"{c} · {cubo.nombres_codigo.get(c, '')}") if dimension == 'CÓDIGO' else str
+            filtros[dimension] = st.multiselect(etiqueta, cubo.valores(dimension), format_func=formato,
+                                                key=f'filtro_{dimension}', placeholder="Todos")
+
+    totales = cubo.totales(**filtros)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Códigos únicos", f"{totales['codigos']:,}")
+    col2.metric("Valor total conceptos", f"${totales['valor']:,.0f}")
+    col3.metric("Empleados únicos", f"{totales['empleados']:,}")
+    col4.metric("Neto total", f"${totales['neto']:,.0f}")
+    if filtros['CÓDIGO']:
+        st.caption("El filtro de código aplica a los conceptos; empleados y neto se filtran solo por regional, centro y nivel.")
+
+    st.markdown("#### 💰 Neto por regional")
+    netos_regional = cubo.netos_por('REGIONAL', **filtros)
+    if not netos_regional.empty:
+        st.bar_chart(netos_regional.astype({'REGIONAL': str}), x='REGIONAL', y='NETO', horizontal=True)
+        st.dataframe(netos_regional, use_container_width=True, hide_index=True)
+
+    st.markdown("#### 🔎 Desglose de conceptos")
+    dimension = st.selectbox("Desglosar por", list(DIMENSIONES_ANALISIS), index=3,
+                             format_func=DIMENSIONES_ANALISIS.get, key='desglose_conceptos')
+    st.dataframe(cubo.conceptos_por(dimension, **filtros), use_container_width=True, hide_index=True)
+
+PERIODO_REGEX = re.compile(r'^20\d{2}-(0[1-9]|1[0-2])$')
+
+def registrar_en_historico(resultado):
+    """Guarda los conceptos y netos del resultado en el histórico, por período y archivo"""
+    resumen_df = resultado['resumen_df']
+    if resumen_df is None:
+        etiqueta, detectado = "Período (AAAA-MM)", resultado['periodo']
+        pendientes = 1
+    else:
+        etiqueta, detectado = "Período de los archivos sin período detectado (AAAA-MM)", None
+        pendientes = int(resumen_df['PERIODO'].isna().sum())
+
+    col1, col2 = st.columns([2, 1])
+    periodo = None
+    if pendientes:
+        periodo = col1.text_input(etiqueta, value=detectado or '', key=f"periodo_historico_{resultado['huellas'][0]}",
+                                  help="Se detecta del nombre del archivo o del encabezado del recibo").strip()
+    else:
+        col1.caption("Cada archivo del lote se guarda en su período detectado")
+    with col2:
+        st.write("")
+        guardar = st.button("💾 Guardar en el histórico", use_container_width=True)
+    reemplazar = st.checkbox("Reemplazar la versión anterior del archivo en el período", value=False,
+                             key=f"reemplazar_historico_{resultado['huellas'][0]}",
+                             help="Borra las corridas del período con el mismo nombre de archivo (versión corregida). "
+                                  "Sin marcarlo, un archivo distinto con el mismo nombre se guarda aparte")
+    if not guardar:
+        return
+    if pendientes and not PERIODO_REGEX.match(periodo):
+        st.warning("⚠️ Indica el período con el formato AAAA-MM (p. ej. 2025-01)")
+        return
+    with st.spinner("Guardando en el histórico..."):
+        corridas = HISTORICO.registrar(resultado['df_conceptos'], resultado['df_netos'], resultado['masterdata'],
+                                       periodo=periodo, archivo=resultado['archivos'][0],
+                                       reemplazar=reemplazar)
+    st.success(f"✅ {len(corridas)} archivo(s) guardados en el histórico: {', '.join(sorted(corridas['periodo'].unique()))}")
+
+def mostrar_comparacion_periodos():
+    """Comparación entre dos períodos del histórico (consulta la base, no vuelve a parsear los TXT)"""
+    periodos = HISTORICO.periodos()
+    with st.expander(f"🗂️ Archivos en el histórico ({len(periodos)} períodos)"):
+        st.dataframe(HISTORICO.corridas(), use_container_width=True, hide_index=True)
+        st.caption(f"Base: `{HISTORICO.ruta}`")
+    if len(periodos) < 2:
+        st.info("📋 Guarda al menos dos períodos para compararlos")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    periodo = col1.selectbox("Período", periodos, key='historico_periodo')
+    opciones = [p for p in periodos if p != periodo]
+    anteriores = [p for p in opciones if p < periodo]
+    base = col2.selectbox("Comparar con", opciones, key='historico_base',
+                          index=opciones.index(anteriores[0]) if anteriores else 0)
+    umbral = col3.number_input("Variación de neto mayor a (%)", min_value=0.0, value=10.0, step=5.0,
+                               key='historico_umbral')
+
+    plantilla = HISTORICO.variacion_empleados(base, periodo)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric(f"Empleados {periodo}", f"{int(plantilla['EMPLEADOS'].sum()):,}",
+                f"{int(plantilla['VARIACION'].sum()):+,}")
+    col2.metric(f"Empleados {base}", f"{int(plantilla['EMPLEADOS_ANTERIOR'].sum()):,}")
+    col3.metric("Ingresos", f"{int(plantilla['INGRESOS'].sum()):,}")
+    col4.metric("Retiros", f"{int(plantilla['RETIROS'].sum()):,}")
+
+    st.markdown("#### 👥 Plantilla por regional")
+    st.dataframe(plantilla, use_container_width=True, hide_index=True)
+    with st.expander("🔁 Ingresos y retiros"):
+        st.dataframe(HISTORICO.movimientos_empleados(base, periodo), use_container_width=True, hide_index=True)
+
+    variacion = HISTORICO.variacion_netos(base, periodo, umbral)
+    st.markdown(f"#### 💰 Empleados con neto que varió más de {umbral:g}% ({len(variacion):,})")
+    st.dataframe(variacion, use_container_width=True, hide_index=True)
+    if not variacion.empty:
+        sap = st.selectbox("Ver conceptos del SAP", variacion['SAP'], index=None, key='historico_sap',
+                           placeholder="Selecciona un SAP")
+        if sap is not None:
+            st.dataframe(HISTORICO.conceptos_empleado(sap, (base, periodo)), use_container_width=True, hide_index=True)
+
+    st.markdown("#### 🏷️ Códigos nuevos y faltantes")
+    st.dataframe(HISTORICO.cambios_codigos(base, periodo), use_container_width=True, hide_index=True)
+
+# Texto de la barra de avance por etapa principal (ver PESOS_PROGRESO)
+ETAPAS_AVANCE = {
+    'liquidacion': "Parseando la liquidación",
+    'lote': "Parseando los archivos del lote",
+    'masterdata': "Leyendo MASTERDATA",
+    'cubo': "Calculando el cubo de análisis",
+    'conciliacion': "Conciliando con Total General",
+    'combinacion': "Cruzando con MASTERDATA",
+    'escritura': "Generando el archivo de salida",
+}
+
+@st.fragment(run_every=1.0)
+def mostrar_avance(id_trabajo: str, reconectable: bool = True):
+    """Barra de avance del trabajo; se refresca sola y recarga la página cuando termina"""
+    trabajo = GESTOR_TRABAJOS.obtener(id_trabajo)
+    if trabajo is None or trabajo.terminado:
+        st.rerun()
+    avance = trabajo.progreso.como_dict()
+    if trabajo.estado == EN_COLA:
+        texto = "⏳ En cola: esperando a que terminen otros procesamientos..."
+    elif avance['etapa'] is None:
+        texto = "🔄 Iniciando..."
+    else:
+        texto = f"🔄 {ETAPAS_AVANCE.get(avance['etapa'].split('_')[0], avance['etapa'])}"
+        if avance['lineas']:
+            texto += f" · {avance['lineas']:,} líneas leídas"
+        if avance['empleados']:
+            texto += f" · {avance['empleados']:,} empleados"
+    st.progress(avance['fraccion'], text=texto)
+    if reconectable:
+        st.caption(f"Trabajo `{trabajo.id}`: puedes cerrar esta página y reconectarte después con este ID "
+                   f"(desde otra sesión, cargando los mismos archivos)")
+
+def mostrar_error(error):
+    st.error(f"❌ {error}")
+    columnas = getattr(error, 'columnas', None)
+    if columnas:
+        st.info(f"📋 Columnas encontradas: {', '.join(columnas)}")
+    if not isinstance(error, ErrorLiquidacion):
+        st.info("📋 Error inesperado: revisa el log del servidor")
+
+def mostrar_rendimiento(registro):
+    """Panel con el tiempo, filas y pico de memoria por etapa de la última ejecución procesada"""
+    with st.expander(f"⏱️ Rendimiento ({registro.segundos:,.2f} s, pico {registro.memoria_pico_mb:,.0f} MB)"):
+        st.dataframe(registro.tabla(), use_container_width=True, hide_index=True)
+        st.caption("Tiempos del trabajo que procesó los archivos; las etapas sangradas son parte de la anterior.")
+        if registro.memoria_proceso:
+            st.caption("El trabajo corrió junto con otros: los picos de memoria son los del servidor completo, "
+                       "no solo los de este trabajo.")
+        if registro.perfil is not None:
+            st.text(registro.resumen_perfil())
+            st.download_button("📥 Descargar perfil (.prof)", registro.perfil_bytes(),
+                               file_name=f"perfil_{registro.fecha.strftime('%Y%m%d_%H%M%S')}.prof",
+                               mime='application/octet-stream')
 
 # -------------------------------
 # Interfaz principal (mejorada)
@@ -463,21 +636,25 @@ def main():
     # Sidebar mejorado
     st.sidebar.header("📁 Cargar Archivos")
     
-    archivo_liquidacion = st.sidebar.file_uploader(
-        "📄 Archivo de liquidación (.txt)", 
-        type=['txt'],
-        help="Archivo TXT con datos de liquidación de nómina"
+    archivos_liquidacion = st.sidebar.file_uploader(
+        "📄 Archivos de liquidación (.txt, .gz, .zip, .zst)", 
+        type=['txt', 'gz', 'zip', 'zst'],
+        accept_multiple_files=True,
+        help="Uno o varios TXT de liquidación de nómina (p. ej. uno por compañía y período). "
+             "Se pueden subir comprimidos; un .zip con varios TXT se procesa como lote"
     )
     
     archivo_masterdata = st.sidebar.file_uploader(
         "📊 MASTERDATA", 
-        type=['xlsx', 'xlsb', 'xls', 'xlsm', 'csv'],
-        help="Archivo con datos maestros de empleados"
+        type=['xlsx', 'xlsb', 'xls', 'xlsm', 'csv', 'gz', 'zip', 'zst'],
+        help="Archivo con datos maestros de empleados (también comprimido en .gz, .zip o .zst)"
     )
     
     # Estado de archivos mejorado
-    if archivo_liquidacion:
-        st.sidebar.markdown('<div class="status-success">✅ Liquidación cargada</div>', unsafe_allow_html=True)
+    if archivos_liquidacion:
+        texto_carga = "Liquidación cargada" if len(archivos_liquidacion) == 1 \
+            else f"{len(archivos_liquidacion)} liquidaciones cargadas (lote)"
+        st.sidebar.markdown(f'<div class="status-success">✅ {texto_carga}</div>', unsafe_allow_html=True)
     if archivo_masterdata:
         st.sidebar.markdown('<div class="status-success">✅ MASTERDATA cargado</div>', unsafe_allow_html=True)
 
@@ -488,97 +665,67 @@ def main():
     st.sidebar.markdown("- **Encoding:** Latin-1")
     st.sidebar.markdown("- **Salarios:** Auto-detectados")
 
+    st.sidebar.markdown("---")
+    perfilar = st.sidebar.checkbox("🔬 Perfilar la próxima ejecución (cProfile)",
+                                   help="Agrega al panel de rendimiento las funciones más costosas y el perfil descargable")
+    incremental = st.sidebar.checkbox(
+        "♻️ Reproceso incremental",
+        help="Reutiliza los empleados sin cambios de la versión anterior del mismo archivo (mismo encabezado) "
+             "e informa qué SAP cambiaron. Guarda las filas parseadas en el servidor hasta que se borren.")
+    if st.sidebar.button("🗑️ Borrar estado incremental", use_container_width=True):
+        st.sidebar.success(f"✅ {borrar_estados()} estados borrados")
+    with st.sidebar.expander("⚖️ Conciliación"):
+        prefijos = (
+            leer_prefijos(st.text_input("Prefijos de deducciones", ','.join(PREFIJOS_DEDUCCION),
+                                        help="Códigos que restan del neto, separados por coma. Sin ninguno, no se concilia")),
+            leer_prefijos(st.text_input("Prefijos informativos", ','.join(PREFIJOS_INFORMATIVOS),
+                                        help="Códigos que no suman al neto (bases), separados por coma")),
+        )
+
     # Botón de procesamiento
-    if st.sidebar.button("🚀 Procesar Datos", type="primary", use_container_width=True):
-        if archivo_liquidacion and archivo_masterdata:
-            with st.spinner('🔄 Procesando archivos...'):
-                df_conceptos, df_netos, masterdata_df = procesar_archivos(archivo_liquidacion, archivo_masterdata)
-            
-            if df_conceptos is not None or df_netos is not None:
-                st.success("✅ Procesamiento completado exitosamente")
-                
-                # Métricas mejoradas
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.markdown(f"""
-                    <div class="metric-box">
-                        <div class="metric-number">{len(df_conceptos) if df_conceptos is not None else 0:,}</div>
-                        <div class="metric-label">Conceptos Extraídos</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                with col2:
-                    st.markdown(f"""
-                    <div class="metric-box">
-                        <div class="metric-number">{len(df_netos) if df_netos is not None else 0:,}</div>
-                        <div class="metric-label">Netos Procesados</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                with col3:
-                    st.markdown(f"""
-                    <div class="metric-box">
-                        <div class="metric-number">{len(masterdata_df):,}</div>
-                        <div class="metric-label">Registros MASTERDATA</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-                # Tabs mejoradas
-                tab1, tab2, tab3 = st.tabs(["👁️ Vista Previa", "📊 Análisis", "📥 Descargar"])
-                
-                with tab1:
-                    if df_conceptos is not None:
-                        st.subheader("📋 Conceptos de Nómina")
-                        st.dataframe(df_conceptos.head(10), use_container_width=True)
-                    
-                    if df_netos is not None:
-                        st.subheader("💰 Netos de Liquidación")
-                        st.dataframe(df_netos.head(10), use_container_width=True)
-
-                with tab2:
-                    st.subheader("📊 Análisis de Datos")
-                    
-                    if df_conceptos is not None:
-                        # Análisis de conceptos
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            conceptos_unicos = df_conceptos['CÓDIGO'].nunique()
-                            st.metric("Códigos únicos", conceptos_unicos)
-                        with col2:
-                            valor_total = df_conceptos['VALOR'].sum()
-                            st.metric("Valor total conceptos", f"${valor_total:,.0f}")
-                    
-                    if df_netos is not None:
-                        # Análisis de netos
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            empleados_unicos = df_netos['SAP'].nunique()
-                            st.metric("Empleados únicos", empleados_unicos)
-                        with col2:
-                            neto_total = df_netos['Valor'].sum()
-                            st.metric("Neto total", f"${neto_total:,.0f}")
-
-                with tab3:
-                    st.subheader("📥 Descarga de Resultados")
-                    
-                    excel_file = crear_excel_descarga(df_conceptos, df_netos, masterdata_df)
-                    
-                    if excel_file:
-                        filename = f"JMC_Nomina2025_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-                        
-                        # Información sobre el archivo
-                        st.info("📋 **Contenido del archivo:**\n- Hoja 'Netos': Datos consolidados con fechas formato dd/mm/yyyy\n- Hoja 'Preno_Convertida': Conceptos detallados con fechas formato dd/mm/yyyy")
-                        
-                        st.download_button(
-                            label="📥 Descargar Excel Consolidado",
-                            data=excel_file.getvalue(),
-                            file_name=filename,
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                            type="primary",
-                            use_container_width=True
-                        )
-                        
-                        st.success(f"✅ Archivo listo: {filename}")
-        else:
-            st.sidebar.markdown('<div class="status-warning">⚠️ Carga ambos archivos para continuar</div>', unsafe_allow_html=True)
+    procesar_click = st.sidebar.button("🚀 Procesar Datos", type="primary", use_container_width=True)
+    if procesar_click and not (archivos_liquidacion and archivo_masterdata):
+        st.sidebar.markdown('<div class="status-warning">⚠️ Carga ambos archivos para continuar</div>', unsafe_allow_html=True)
+        procesar_click = False
+
+    # Reconexión: los trabajos terminados se conservan en el servidor por un tiempo
+    with st.sidebar.expander("🔗 Reconectar a un trabajo"):
+        id_trabajo = st.text_input("ID del trabajo", help="Se muestra junto a los resultados de cada procesamiento. "
+                                   "Desde otra sesión, carga también los mismos archivos que se procesaron")
+        if st.button("Reconectar", use_container_width=True) and id_trabajo.strip():
+            if reconectar_trabajo(id_trabajo.strip(), archivos_liquidacion, archivo_masterdata) is None:
+                st.warning("⚠️ No hay un trabajo con ese ID de esta sesión o de los archivos cargados "
+                           "(puede haber expirado)")
+            else:
+                st.session_state['trabajo'] = id_trabajo.strip()
+                st.session_state['trabajo_reconectado'] = True
+
+    # El procesamiento corre en el pool de trabajos; la sesión solo sigue su avance
+    if procesar_click:
+        huellas = (huella_liquidaciones(archivos_liquidacion), huella_archivo(archivo_masterdata))
+        trabajo = enviar_trabajo(archivos_liquidacion, archivo_masterdata, huellas, perfilar, incremental, prefijos)
+        st.session_state['trabajo'] = trabajo.id
+        st.session_state['trabajo_reconectado'] = False
+        st.session_state['fecha_resultado'] = datetime.now()
+
+    trabajo = GESTOR_TRABAJOS.obtener(st.session_state['trabajo']) if 'trabajo' in st.session_state else None
+    if 'trabajo' in st.session_state and trabajo is None:
+        st.warning("⚠️ El resultado del último procesamiento ya no está disponible; vuelve a procesar los archivos")
+        del st.session_state['trabajo']
+    elif trabajo is not None and not trabajo.terminado:
+        mostrar_avance(trabajo.id)
+    elif trabajo is not None and trabajo.estado == FALLIDO:
+        mostrar_error(trabajo.error)
+    elif trabajo is not None:
+        # Los resultados se conservan entre reejecuciones mientras los archivos cargados no cambien
+        huellas = trabajo.resultado['huellas']
+        vigente = st.session_state.get('trabajo_reconectado') or not (archivos_liquidacion and archivo_masterdata) \
+            or huellas == (huella_liquidaciones(archivos_liquidacion), huella_archivo(archivo_masterdata))
+        if vigente:
+            st.success(f"✅ Procesamiento completado exitosamente · trabajo `{trabajo.id}` ({trabajo.descripcion})")
+            mostrar_resultados(trabajo.resultado)
+            if trabajo.ejecucion is not None:
+                mostrar_rendimiento(trabajo.ejecucion)
 
     # Footer mejorado
     st.markdown("---")
@@ -0,0 +1,239 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Benchmarks por etapa sobre los datos de bench/generar_datos.py.
+#
+#   python bench/benchmark.py 10k 100k                 -> mide y agrega a bench/resultados.jsonl
+#   python bench/benchmark.py 1m -e escaneo masterdata  (solo algunas etapas)
+#   python bench/benchmark.py --comparar               (últimas dos versiones medidas)
+#
+# Cada etapa corre en un proceso nuevo: la preparación (p. ej. parsear antes de
+# medir la exportación) no se mide, y el pico de memoria es el de la etapa.
+# Por cada etapa se informa el tiempo, filas por segundo y pico de RSS.
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from generar_datos import TAMANOS, generar_liquidacion, generar_masterdata, rutas_datos  # noqa: E402
+from liquidacion.rendimiento import pico_memoria_mb, reiniciar_pico_memoria, rss_memoria_mb  # noqa: E402
+
+RESULTADOS = Path(__file__).resolve().parent / 'resultados.jsonl'
+
+# -------------------------------
+# Etapas: cada una devuelve (preparar, medir); medir devuelve las filas producidas
+# -------------------------------
+def _texto_liquidacion(liquidacion) -> str:
+    """El TXT decodificado, como lo recibían los pipelines en app.py (no se mide)"""
+    return liquidacion.read_bytes().decode('latin-1')
+
+
+def _etapa_conceptos(liquidacion, masterdata):
+    from liquidacion import procesar_liquidacion_pipeline
+    return lambda: _texto_liquidacion(liquidacion), lambda texto: len(procesar_liquidacion_pipeline(texto))
+
+
+def _etapa_netos(liquidacion, masterdata):
+    from liquidacion import procesar_netos_pipeline
+    return lambda: _texto_liquidacion(liquidacion), lambda texto: len(procesar_netos_pipeline(texto))
+
+
+def _etapa_escaneo(liquidacion, masterdata):
+    from liquidacion import escanear_liquidacion
+
+    def medir(_):
+        df_conceptos, df_netos = escanear_liquidacion(liquidacion)
+        return len(df_conceptos) + len(df_netos)
+    return None, medir
+
+
+def _etapa_escaneo_paralelo(liquidacion, masterdata):
+    from liquidacion import escanear_liquidacion_paralelo
+
+    def medir(_):
+        df_conceptos, df_netos = escanear_liquidacion_paralelo(liquidacion, os.cpu_count())
+        return len(df_conceptos) + len(df_netos)
+    return None, medir
+
+
+def _etapa_masterdata(liquidacion, masterdata):
+    from liquidacion import leer_masterdata
+    return None, lambda _: len(leer_masterdata(masterdata))
+
+
+def _etapa_snapshot(liquidacion, masterdata):
+    from liquidacion import hash_archivo, leer_masterdata_con_snapshot
+
+    def preparar():
+        huella = hash_archivo(masterdata)
+        leer_masterdata_con_snapshot(masterdata, huella)  # crea el snapshot si falta
+        return huella
+    return preparar, lambda huella: len(leer_masterdata_con_snapshot(masterdata, huella))
+
+
+def _datos_parseados(liquidacion, masterdata):
+    from liquidacion import escanear_liquidacion, leer_masterdata
+    df_conceptos, df_netos = escanear_liquidacion(liquidacion)
+    return df_conceptos, df_netos, leer_masterdata(masterdata)
+
+
+def _etapa_combinar(liquidacion, masterdata):
+    from liquidacion import preparar_hojas
+
+    def medir(datos):
+        return sum(len(df) for df in preparar_hojas(*datos).values())
+    return lambda: _datos_parseados(liquidacion, masterdata), medir
+
+
+def _etapa_exportar(liquidacion, masterdata):
+    from liquidacion import crear_excel_descarga
+
+    def medir(datos):
+        df_conceptos, df_netos, _ = datos
+        with tempfile.TemporaryFile() as destino:
+            crear_excel_descarga(*datos, destino=destino)
+        return len(df_conceptos) + len(df_netos)
+    return lambda: _datos_parseados(liquidacion, masterdata), medir
+
+
+ETAPAS = {
+    'conceptos': _etapa_conceptos,          # procesar_liquidacion_pipeline sobre el texto ya decodificado
+    'netos': _etapa_netos,                  # procesar_netos_pipeline sobre el texto ya decodificado
+    'escaneo': _etapa_escaneo,              # conceptos y netos en una pasada
+    'escaneo_paralelo': _etapa_escaneo_paralelo,
+    'masterdata': _etapa_masterdata,        # lectura del archivo original (read_excel / csv)
+    'snapshot': _etapa_snapshot,            # lectura desde el snapshot Parquet
+    'combinar': _etapa_combinar,            # merge con MASTERDATA (preparar_hojas)
+    'exportar': _etapa_exportar,            # crear_excel_descarga, incluye el merge
+}
+
+
+def _correr_etapa(etapa: str, liquidacion: str, masterdata: str, directorio_snapshots: str) -> dict:
+    """Se ejecuta en un proceso nuevo"""
+    os.environ['LIQUIDACION_SNAPSHOTS'] = directorio_snapshots
+    preparar, medir = ETAPAS[etapa](Path(liquidacion), Path(masterdata))
+    datos = preparar() if preparar else None
+
+    pico_reiniciado = reiniciar_pico_memoria()
+    base = rss_memoria_mb() or 0.0
+    inicio = time.perf_counter()
+    filas = medir(datos)
+    segundos = time.perf_counter() - inicio
+    pico = pico_memoria_mb()
+    return {
+        'segundos': round(segundos, 4),
+        'filas': filas,
+        'filas_por_segundo': round(filas / segundos) if segundos else None,
+        'pico_rss_mb': round(pico, 1),
+        # Sin reinicio del pico, el incremento incluye la preparación
+        'incremento_rss_mb': round(pico - base, 1),
+        'pico_exacto': pico_reiniciado,
+    }
+
+# -------------------------------
+# Resultados
+# -------------------------------
+def _git(*args) -> str:
+    try:
+        return subprocess.run(['git', *args], cwd=RAIZ, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def version_codigo() -> dict:
+    commit = _git('rev-parse', '--short', 'HEAD')
+    return {'commit': commit + ('+cambios' if commit and _git('status', '--porcelain', '--', 'liquidacion') else ''),
+            'asunto': _git('log', '-1', '--format=%s')}
+
+
+def medir(tamanos, etapas, repeticiones: int = 1, directorio_datos: Path = None, guardar: bool = True,
+          formato_masterdata: str = 'xlsx'):
+    """Mide cada etapa por tamaño (el mejor tiempo de `repeticiones`) y agrega los resultados a RESULTADOS"""
+    contexto = multiprocessing.get_context('spawn')
+    comunes = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        **version_codigo(),
+        'maquina': platform.node(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+    }
+    resultados = []
+    with tempfile.TemporaryDirectory() as snapshots:
+        for tamano in tamanos:
+            liquidacion, masterdata = rutas_datos(tamano, directorio_datos, formato_masterdata)
+            if not liquidacion.exists() or not masterdata.exists():
+                print(f"Generando datos {tamano}...", file=sys.stderr)
+                generar_liquidacion(liquidacion, TAMANOS[tamano])
+                generar_masterdata(masterdata, TAMANOS[tamano])
+            for etapa in etapas:
+                corridas = []
+                for _ in range(repeticiones):
+                    with contexto.Pool(1) as pool:
+                        corridas.append(pool.apply(_correr_etapa, (etapa, str(liquidacion), str(masterdata), snapshots)))
+                mejor = min(corridas, key=lambda r: r['segundos'])
+                registro = {**comunes, 'tamano': tamano, 'empleados': TAMANOS[tamano],
+                            'formato_masterdata': formato_masterdata, 'etapa': etapa,
+                            'repeticiones': repeticiones, **mejor}
+                resultados.append(registro)
+                print(f"{tamano:>5} {etapa:<17} {mejor['segundos']:>9.3f} s {mejor['filas']:>11,} filas "
+                      f"{mejor['filas_por_segundo'] or 0:>11,} filas/s {mejor['pico_rss_mb']:>8,.0f} MB pico")
+                if guardar:
+                    with open(RESULTADOS, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+    return resultados
+
+
+def comparar(commits=None, archivo: Path = RESULTADOS):
+    """Tabla de tiempos por (tamaño, etapa) entre versiones; por defecto las dos últimas medidas"""
+    import pandas as pd
+
+    df = pd.read_json(archivo, lines=True)
+    if not commits:
+        commits = list(dict.fromkeys(df['commit'][::-1]))[:2][::-1]
+    df = df[df['commit'].isin(commits)].drop_duplicates(['commit', 'tamano', 'etapa'], keep='last')
+    tabla = df.pivot_table(index=['tamano', 'etapa'], columns='commit', values='segundos')
+    tabla = tabla[[c for c in commits if c in tabla.columns]]
+    if tabla.shape[1] >= 2:
+        tabla['variacion_%'] = ((tabla.iloc[:, -1] / tabla.iloc[:, 0] - 1) * 100).round(1)
+    print(tabla.to_string())
+    return tabla
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks por etapa del motor de liquidación")
+    parser.add_argument('tamanos', nargs='*', metavar='TAMANO',
+                        help=f"Tamaños a medir: {', '.join(TAMANOS)} (se generan si faltan)")
+    parser.add_argument('-e', '--etapas', nargs='+', choices=list(ETAPAS), default=list(ETAPAS))
+    parser.add_argument('-r', '--repeticiones', type=int, default=1)
+    parser.add_argument('-d', '--directorio', type=Path, default=None, help="Directorio de datos generados")
+    parser.add_argument('--formato-masterdata', choices=['xlsx', 'csv'], default='xlsx')
+    parser.add_argument('--no-guardar', action='store_true', help=f"No agregar a {RESULTADOS.name}")
+    parser.add_argument('--comparar', nargs='*', metavar='COMMIT',
+                        help="Compara versiones guardadas (por defecto, las dos últimas)")
+    args = parser.parse_args(argv)
+
+    if args.comparar is not None:
+        comparar(args.comparar)
+        return 0
+    if not args.tamanos:
+        parser.error("indique al menos un tamaño o --comparar")
+    desconocidos = [t for t in args.tamanos if t not in TAMANOS]
+    if desconocidos:
+        parser.error(f"tamaño no válido: {', '.join(desconocidos)} (opciones: {', '.join(TAMANOS)})")
+    medir(args.tamanos, args.etapas, args.repeticiones, args.directorio, not args.no_guardar,
+          args.formato_masterdata)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Generador de datos sintéticos para los benchmarks: un archivo de liquidación
+# con recibos de ancho fijo y un MASTERDATA con los mismos 'Nº pers.'.
+#
+#   python bench/generar_datos.py 10k               -> bench/datos/liquidacion_10k.txt, masterdata_10k.xlsx
+#   python bench/generar_datos.py 1m --formato-masterdata csv
+#   python bench/generar_datos.py 100k --columnas-extra 140   (extracto de RR. HH. de ~150 columnas)
+#
+# Los recibos siguen el formato que espera el parser: cabecera 'Núm. Personal',
+# código y concepto hasta la columna 50, CANTIDAD en 50–69, VALOR en 69–89 y la
+# línea 'Total General' con el neto en los últimos 20 caracteres.
+
+import argparse
+import random
+import sys
+from pathlib import Path
+
+TAMANOS = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+DIR_DATOS = Path(__file__).resolve().parent / 'datos'
+SAP_INICIAL = 10_000
+
+# (código, concepto, es_deduccion); los códigos 1xxx y 3xxx los descarta el parser, como en producción
+CONCEPTOS = [
+    ('Y001', 'Salario básico', False), ('Y010', 'Horas extra diurnas', False),
+    ('Y015', 'Recargo nocturno', False), ('Y020', 'Dominicales y festivos', False),
+    ('Z105', 'Salud EPS', True), ('Z110', 'Pensión obligatoria', True),
+    ('Z120', 'Fondo de solidaridad', True), ('Z200', 'Retención en la fuente', True),
+    ('9010', 'Bonificación por ventas', False), ('9050', 'Auxilio de alimentación', False),
+    ('2010', 'Préstamo empleados', True), ('2030', 'Libranza', True),
+    ('/550', 'Base de cotización', False), ('/560', 'Base retención', False),
+    ('1000', 'Auxilio de transporte', False), ('3100', 'Provisión vacaciones', False),
+]
+REGIONALES = ['Bogotá', 'Antioquia', 'Eje Cafetero', 'Costa', 'Santanderes', 'Centro', 'Sur Occidente']
+CARGOS = ['Operador de tienda', 'Cajero', 'Jefe de tienda', 'Auxiliar de bodega', 'Analista', 'Coordinador']
+NIVELES = ['Operativo', 'Administrativo', 'Directivo']
+NOMBRES = ['ANA', 'CARLOS', 'DIANA', 'JORGE', 'LUISA', 'MARTA', 'PEDRO', 'SOFIA', 'ANDRES', 'CAMILA']
+APELLIDOS = ['GOMEZ', 'RODRIGUEZ', 'MARTINEZ', 'LOPEZ', 'GARCIA', 'PEREZ', 'SANCHEZ', 'RAMIREZ', 'TORRES']
+
+
+def importe(valor: float) -> str:
+    """Formato colombiano: miles con '.', decimales con ','"""
+    return f'{valor:,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+def linea_concepto(codigo: str, concepto: str, cantidad: float, valor: float) -> str:
+    izquierda = f' {codigo:<5} {concepto}'.ljust(50)[:50]
+    return f'{izquierda}{importe(cantidad):>19}{importe(valor):>20}'
+
+
+def recibo(rng: random.Random, sap: int, periodo: str) -> list:
+    """Líneas del recibo de un empleado"""
+    lineas = [
+        'JERONIMO MARTINS COLOMBIA SAS                     Recibo de pago de nómina',
+        f'Período de liquidación 01.{periodo[5:]}.{periodo[:4]}',
+        f'Núm. Personal.......{sap}      Nombre {rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}',
+        f'División {rng.choice(REGIONALES)}             Ce.coste {rng.randint(1000, 9999)}',
+        '',
+    ]
+    salario = rng.randint(1_300_000, 12_000_000)
+    neto = 0.0
+    for codigo, concepto, deduccion in rng.sample(CONCEPTOS, rng.randint(5, 10)):
+        valor = round(salario * (rng.uniform(0.01, 0.08) if deduccion else rng.uniform(0.05, 0.5)), 2)
+        lineas.append(linea_concepto(codigo, concepto, rng.choice((0, 1, 8, 15, 30)), valor))
+        if not codigo.startswith(('/', '1', '3')):
+            neto += -valor if deduccion else valor
+    lineas += [
+        'SON: ' + 'VALOR EN LETRAS PESOS CON 00/100 M/CTE'.ljust(60),
+        f'{"   Total General":<69}{importe(neto):>20}',
+        '',
+    ]
+    return lineas
+
+
+def generar_liquidacion(ruta: Path, n_empleados: int, semilla: int = 0, periodo: str = '2025-01') -> Path:
+    """Escribe n_empleados recibos (latin-1, como los genera SAP)"""
+    rng = random.Random(semilla)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with open(ruta, 'w', encoding='latin-1', newline='\n') as f:
+        for i in range(n_empleados):
+            f.write('\n'.join(recibo(rng, SAP_INICIAL + i, periodo)))
+            f.write('\n')
+    return ruta
+
+
+def filas_masterdata(n_empleados: int, semilla: int, cobertura: float, columnas_extra: int = 0):
+    """
+    Filas del MASTERDATA; `cobertura` es la fracción de empleados de la liquidación
+    presentes. `columnas_extra` agrega columnas que el procesamiento no usa (texto y
+    números alternados) antes del salario.
+    """
+    rng = random.Random(semilla + 1)
+    for i in range(n_empleados):
+        if rng.random() > cobertura:
+            continue
+        extra = [f'V{rng.randint(0, 999)}' if j % 2 else rng.randint(0, 100_000) for j in range(columnas_extra)]
+        yield [
+            SAP_INICIAL + i,
+            str(rng.randint(10_000_000, 1_199_999_999)),
+            f'{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)} {rng.choice(NOMBRES)}',
+            rng.choice(REGIONALES),
+            f'CC{rng.randint(1000, 9999)}',
+            rng.randint(36_000, 45_500),  # serial de Excel (1998–2024)
+            rng.choice(CARGOS),
+            rng.choice(NIVELES),
+            *extra,
+            rng.randint(1_300_000, 12_000_000),
+        ]
+
+
+COLUMNAS_MASTERDATA = ['Nº pers.', 'Número ID', 'Número de personal', 'División de personal',
+                       'Ce.coste', 'Fecha', 'Función', 'Área de personal', 'Importe']
+
+
+def columnas_masterdata(columnas_extra: int = 0) -> list:
+    return COLUMNAS_MASTERDATA[:-1] + [f'Campo {j + 1:03d}' for j in range(columnas_extra)] + COLUMNAS_MASTERDATA[-1:]
+
+
+def generar_masterdata(ruta: Path, n_empleados: int, semilla: int = 0, cobertura: float = 0.99,
+                       columnas_extra: int = 0) -> Path:
+    """Escribe el MASTERDATA en .xlsx (xlsxwriter, fila por fila) o .csv según la extensión"""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    filas = filas_masterdata(n_empleados, semilla, cobertura, columnas_extra)
+    encabezado = columnas_masterdata(columnas_extra)
+    if ruta.suffix.lower() == '.csv':
+        import csv
+        with open(ruta, 'w', encoding='utf-8', newline='') as f:
+            escritor = csv.writer(f)
+            escritor.writerow(encabezado)
+            escritor.writerows(filas)
+        return ruta
+
+    import xlsxwriter
+    libro = xlsxwriter.Workbook(ruta, {'constant_memory': True})
+    hoja = libro.add_worksheet('MASTERDATA')
+    hoja.write_row(0, 0, encabezado)
+    for fila, valores in enumerate(filas, start=1):
+        hoja.write_row(fila, 0, valores)
+    libro.close()
+    return ruta
+
+
+def rutas_datos(tamano: str, directorio: Path = None, formato_masterdata: str = 'xlsx'):
+    directorio = Path(directorio or DIR_DATOS)
+    return (directorio / f'liquidacion_{tamano}.txt',
+            directorio / f'masterdata_{tamano}.{formato_masterdata}')
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Genera liquidación y MASTERDATA sintéticos")
+    parser.add_argument('tamanos', nargs='+', choices=sorted(TAMANOS, key=TAMANOS.get),
+                        help="Cantidad de empleados")
+    parser.add_argument('-d', '--directorio', default=DIR_DATOS, help=f"Destino (por defecto {DIR_DATOS})")
+    parser.add_argument('--formato-masterdata', choices=['xlsx', 'csv'], default='xlsx')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--columnas-extra', type=int, default=0,
+                        help="Columnas de MASTERDATA que el procesamiento no usa (para medir la proyección)")
+    args = parser.parse_args(argv)
+
+    for tamano in args.tamanos:
+        liquidacion, masterdata = rutas_datos(tamano, args.directorio, args.formato_masterdata)
+        generar_liquidacion(liquidacion, TAMANOS[tamano], args.semilla)
+        generar_masterdata(masterdata, TAMANOS[tamano], args.semilla, columnas_extra=args.columnas_extra)
+        print(f"{tamano}: {liquidacion} ({liquidacion.stat().st_size / 2**20:,.1f} MB), "
+              f"{masterdata} ({masterdata.stat().st_size / 2**20:,.1f} MB)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
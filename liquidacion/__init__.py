@@ -0,0 +1,105 @@
+# Jerónimo Martins Colombia — Nómina 2025
+"""
+Motor de consolidación de nómina: parsing posicional de la liquidación,
+lectura de MASTERDATA y exportación. No depende de Streamlit, por lo que
+se puede importar desde scripts, tareas programadas o la línea de comandos
+(`python -m liquidacion procesar ...`).
+
+Los nombres públicos se cargan bajo demanda: importar el paquete no importa
+pandas ni los lectores de Excel hasta que se usa alguna función.
+"""
+
+import importlib
+
+_EXPORTS = {
+    'ErrorLiquidacion': 'errores',
+    'ErrorArchivoLiquidacion': 'errores',
+    'ErrorMasterdata': 'errores',
+    'ErrorExportacion': 'errores',
+    'ErrorHistorico': 'errores',
+    'to_num': 'utilidades',
+    'to_num_serie': 'utilidades',
+    'convertir_importes': 'utilidades',
+    'formatear_fechas_excel': 'utilidades',
+    'formatear_fecha_excel': 'utilidades',
+    'adjuntar_salario': 'utilidades',
+    'CANDIDATOS_SALARIO': 'utilidades',
+    'escanear_liquidacion': 'parser',
+    'iterar_lineas': 'parser',
+    'iterar_lotes_liquidacion': 'parser',
+    'procesar_liquidacion_pipeline': 'parser',
+    'procesar_netos_pipeline': 'parser',
+    'escanear_liquidacion_paralelo': 'paralelo',
+    'limites_bloques': 'paralelo',
+    'ArchivoComprimido': 'comprimidos',
+    'expandir_comprimidos': 'comprimidos',
+    'cargar_liquidacion_incremental': 'incremental',
+    'reprocesar_liquidacion': 'incremental',
+    'diferencias_sap': 'incremental',
+    'borrar_estados': 'incremental',
+    'leer_masterdata': 'masterdata',
+    'COLUMNA_LLAVE': 'masterdata',
+    'limpiar_masterdata': 'masterdata',
+    'leer_masterdata_con_snapshot': 'masterdata',
+    'borrar_snapshots': 'masterdata',
+    'procesar_archivos': 'proceso',
+    'cargar_liquidacion': 'proceso',
+    'cargar_masterdata': 'proceso',
+    'CacheLRU': 'cache',
+    'CACHE_RESULTADOS': 'cache',
+    'hash_archivo': 'cache',
+    'procesar_lote': 'lote',
+    'parsear_lote': 'lote',
+    'detectar_periodo': 'lote',
+    'huella_lote': 'lote',
+    'listar_archivos_liquidacion': 'lote',
+    'periodo_archivo': 'lote',
+    'medir_ejecucion': 'rendimiento',
+    'etapa': 'rendimiento',
+    'Ejecucion': 'rendimiento',
+    'LOG_RENDIMIENTO': 'rendimiento',
+    'Progreso': 'rendimiento',
+    'seguir_progreso': 'rendimiento',
+    'GrafoEtapas': 'grafo',
+    'GESTOR_TRABAJOS': 'trabajos',
+    'GestorTrabajos': 'trabajos',
+    'Trabajo': 'trabajos',
+    'procesar_y_exportar': 'trabajos',
+    'copiar_archivo': 'trabajos',
+    'indexar_masterdata': 'combinacion',
+    'combinar_con_masterdata': 'combinacion',
+    'MasterdataIndexado': 'combinacion',
+    'calcular_cubo': 'cubo',
+    'CuboAnalisis': 'cubo',
+    'conciliar': 'conciliacion',
+    'conciliacion_configurada': 'conciliacion',
+    'incidencias': 'conciliacion',
+    'resumen_conciliacion': 'conciliacion',
+    'ExploradorResultados': 'explorador',
+    'HistoricoNomina': 'historico',
+    'HISTORICO': 'historico',
+    'crear_excel_descarga': 'exportar',
+    'exportar_resultados': 'exportar',
+    'exportar_a_archivo': 'exportar',
+    'ArchivoExportado': 'exportar',
+    'preparar_hojas': 'exportar',
+    'hojas_de_resumen': 'exportar',
+    'FORMATOS_EXPORTACION': 'formatos',
+    'EXTENSION_EXPORTACION': 'formatos',
+    'MIME_EXPORTACION': 'formatos',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(nombre):
+    modulo = _EXPORTS.get(nombre)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    valor = getattr(importlib.import_module(f'.{modulo}', __name__), nombre)
+    globals()[nombre] = valor
+    return valor
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
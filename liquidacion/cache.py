@@ -0,0 +1,144 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Caché en memoria por huella SHA-256 del contenido, con desalojo LRU por tamaño.
+# Se comparte entre sesiones de Streamlit y reejecuciones del script.
+
+import hashlib
+import io
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from .comprimidos import ArchivoComprimido
+from .errores import ErrorArchivoLiquidacion
+
+TAM_BLOQUE_HASH = 1024 * 1024
+# Caracteres del nombre que se muestran en los errores de lectura
+LARGO_NOMBRE_ERROR = 200
+
+
+def hash_archivo(fuente, error=ErrorArchivoLiquidacion) -> str:
+    """
+    SHA-256 (hex) del contenido de bytes, una ruta (str u os.PathLike, como en el
+    parser) o un objeto archivo binario. Los objetos archivo se leen por bloques
+    y se devuelven al inicio. De un ArchivoComprimido se usa el comprimido (y el
+    miembro, en un .zip). Si no se puede leer lanza `error` (una ErrorLiquidacion).
+    """
+    try:
+        return _hash_contenido(fuente)
+    except OSError as e:
+        nombre = os.fspath(fuente) if isinstance(fuente, (str, os.PathLike)) else getattr(fuente, 'name', None)
+        nombre = str(nombre or 'el archivo')
+        if len(nombre) > LARGO_NOMBRE_ERROR:
+            nombre = nombre[:LARGO_NOMBRE_ERROR] + '…'
+        raise error(f"No se pudo leer {nombre}: {e.strerror or e}") from e
+
+
+def _hash_contenido(fuente) -> str:
+    h = hashlib.sha256()
+    if isinstance(fuente, ArchivoComprimido):
+        h.update(f'{_hash_contenido(fuente.origen)}\0{fuente.miembro or ""}'.encode('utf-8'))
+        return h.hexdigest()
+    if isinstance(fuente, (bytes, bytearray, memoryview)):
+        h.update(fuente)
+        return h.hexdigest()
+    if isinstance(fuente, (str, os.PathLike)):
+        with open(fuente, 'rb') as f:
+            return _hash_contenido(f)
+
+    if isinstance(fuente, io.BytesIO):
+        with fuente.getbuffer() as buffer:
+            h.update(buffer)
+    else:
+        fuente.seek(0)
+        for bloque in iter(lambda: fuente.read(TAM_BLOQUE_HASH), b''):
+            h.update(bloque)
+    fuente.seek(0)
+    return h.hexdigest()
+
+
+def tamano_valor(valor) -> int:
+    """Estimación en bytes de lo que ocupa un valor guardado en la caché"""
+    if valor is None:
+        return 0
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(index=True, deep=True))
+    if isinstance(valor, (bytes, bytearray)):
+        return len(valor)
+    if isinstance(valor, io.BytesIO):
+        return valor.getbuffer().nbytes
+    if isinstance(valor, (tuple, list)):
+        return sum(tamano_valor(v) for v in valor)
+    if isinstance(valor, dict):
+        return sum(tamano_valor(v) for v in valor.values())
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """
+    Caché LRU acotada por tamaño total (bytes estimados con tamano_valor).
+    Los valores guardados se comparten: quien los lee no debe modificarlos.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._datos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def __len__(self):
+        return len(self._datos)
+
+    def __contains__(self, clave):
+        return clave in self._datos
+
+    @property
+    def bytes_usados(self) -> int:
+        return self._bytes
+
+    def obtener(self, clave, por_defecto=None):
+        with self._lock:
+            if clave not in self._datos:
+                self.fallos += 1
+                return por_defecto
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return self._datos[clave][0]
+
+    def guardar(self, clave, valor):
+        tam = tamano_valor(valor)
+        with self._lock:
+            if clave in self._datos:
+                self._bytes -= self._datos.pop(clave)[1]
+            if tam > self.max_bytes:
+                # No cabe ni sola: no se guarda para no vaciar la caché
+                return valor
+            self._datos[clave] = (valor, tam)
+            self._bytes += tam
+            while self._bytes > self.max_bytes:
+                _, (_, tam_viejo) = self._datos.popitem(last=False)
+                self._bytes -= tam_viejo
+        return valor
+
+    def obtener_o_calcular(self, clave, funcion):
+        """Devuelve el valor cacheado o lo calcula con funcion() y lo guarda"""
+        faltante = object()
+        valor = self.obtener(clave, faltante)
+        if valor is faltante:
+            valor = self.guardar(clave, funcion())
+        return valor
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+
+
+# Caché compartida del proceso (tamaño en MB configurable con LIQUIDACION_CACHE_MB)
+CACHE_RESULTADOS = CacheLRU(int(os.environ.get('LIQUIDACION_CACHE_MB', '512')) * 1024 * 1024)
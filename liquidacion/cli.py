@@ -0,0 +1,287 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Línea de comandos:
+#   python -m liquidacion procesar LIQUIDACION.txt MASTERDATA.xlsb -o salida.xlsx
+#   python -m liquidacion lote -m MASTERDATA.xlsb DIRECTORIO_O_ARCHIVOS... -o consolidado.xlsx
+#   python -m liquidacion limpiar
+# El motor (pandas y los lectores de Excel) se importa solo al ejecutar un comando,
+# para que --help y los errores de argumentos respondan de inmediato.
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from .formatos import EXTENSION_EXPORTACION, FORMATOS_EXPORTACION
+
+
+def _nombre_salida_por_defecto(formato: str) -> str:
+    return f"JMC_Nomina2025_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{EXTENSION_EXPORTACION[formato]}"
+
+
+def _aviso(mensaje: str):
+    print(f"Aviso: {mensaje}", file=sys.stderr)
+
+
+def _exportar(args, df_conceptos, df_netos, masterdata_df, hojas_adicionales=None) -> Path:
+    """
+    Indexa MASTERDATA, concilia con 'Total General' si hay prefijos de deducción,
+    informa los avisos de calidad y escribe la salida
+    """
+    from .combinacion import indexar_masterdata
+    from .conciliacion import (
+        AVISO_SIN_PREFIJOS, PREFIJOS_DEDUCCION, PREFIJOS_INFORMATIVOS, conciliacion_configurada, conciliar,
+        leer_prefijos, resumen_conciliacion,
+    )
+    from .exportar import exportar_resultados, hojas_de_resumen
+
+    salida = Path(args.salida or _nombre_salida_por_defecto(args.formato))
+    masterdata = indexar_masterdata(masterdata_df)
+    importes_no_convertidos = (df_conceptos.attrs.get('importes_no_convertidos', 0)
+                               + df_netos.attrs.get('importes_no_convertidos', 0))
+    if importes_no_convertidos:
+        _aviso(f"{importes_no_convertidos:,} importes de la liquidación no son un número "
+               f"válido y se tomaron como 0")
+    for aviso in masterdata.avisos:
+        _aviso(aviso)
+    prefijos_deduccion = (leer_prefijos(args.prefijos_deduccion) if args.prefijos_deduccion is not None
+                          else PREFIJOS_DEDUCCION)
+    prefijos_informativos = (leer_prefijos(args.prefijos_informativos) if args.prefijos_informativos is not None
+                             else PREFIJOS_INFORMATIVOS)
+    conciliacion = None
+    if conciliacion_configurada(prefijos_deduccion):
+        conciliacion = conciliar(df_conceptos, df_netos, masterdata, prefijos_deduccion, prefijos_informativos)
+        resumen = resumen_conciliacion(conciliacion)
+        if resumen['diferencia'] or resumen['sin_total_general'] or resumen['sin_conceptos']:
+            _aviso(f"{resumen['diferencia']:,} SAP no cuadran con su 'Total General', "
+                   f"{resumen['sin_total_general']:,} no tienen 'Total General' y {resumen['sin_conceptos']:,} "
+                   f"no tienen conceptos (ver la hoja Conciliacion)")
+    else:
+        _aviso(AVISO_SIN_PREFIJOS)
+    hojas_adicionales = {**(hojas_adicionales or {}), **hojas_de_resumen(conciliacion=conciliacion)}
+    exportar_resultados(df_conceptos, df_netos, masterdata, args.formato, destino=salida,
+                        hojas_adicionales=hojas_adicionales)
+    return salida
+
+
+def _informar_error(e) -> int:
+    print(f"Error: {e}", file=sys.stderr)
+    columnas = getattr(e, 'columnas', None)
+    if columnas:
+        print(f"Columnas encontradas: {', '.join(columnas)}", file=sys.stderr)
+    return 1
+
+
+def _registrar_historico(args, df_conceptos, df_netos, masterdata_df, periodo=None, archivo=None):
+    """Con --historico, agrega el resultado al histórico por período (ver HistoricoNomina.registrar)"""
+    from .historico import HISTORICO
+
+    corridas = HISTORICO.registrar(df_conceptos, df_netos, masterdata_df, periodo=periodo or args.periodo,
+                                   archivo=archivo, reemplazar=args.reemplazar)
+    if not args.silencioso:
+        print(f"Histórico:            {len(corridas):,} archivo(s) en "
+              f"{', '.join(sorted(corridas['periodo'].unique()))} ({HISTORICO.ruta})")
+
+
+def _imprimir_resumen(df_conceptos, df_netos, masterdata_df, salida):
+    print(f"Conceptos extraídos:  {len(df_conceptos):,}")
+    print(f"Netos procesados:     {len(df_netos):,}")
+    print(f"Registros MASTERDATA: {len(masterdata_df):,} (snapshot: {masterdata_df.attrs.get('snapshot')})")
+    print(f"Archivo generado:     {salida}")
+
+
+def comando_procesar(args) -> int:
+    """Procesa liquidación + MASTERDATA y escribe el consolidado"""
+    from .comprimidos import expandir_comprimido
+    from .errores import ErrorLiquidacion
+    from .lote import periodo_archivo
+    from .proceso import procesar_archivos
+
+    import pandas as pd
+
+    try:
+        archivos = expandir_comprimido(Path(args.liquidacion))
+    except ErrorLiquidacion as e:
+        return _informar_error(e)
+    if len(archivos) > 1:
+        print(f"Error: {args.liquidacion} contiene {len(archivos)} archivos de liquidación; "
+              f"procésalos con el comando lote", file=sys.stderr)
+        return 1
+    liquidacion = archivos[0]
+    nombre = Path(liquidacion.name).name
+    periodo = args.periodo or (periodo_archivo(nombre, liquidacion) if args.historico else None)
+    if args.historico and not periodo:
+        print("Error: no se detectó el período del archivo; indícalo con --periodo AAAA-MM", file=sys.stderr)
+        return 1
+
+    try:
+        df_conceptos, df_netos, masterdata_df = procesar_archivos(
+            liquidacion, Path(args.masterdata), snapshots=not args.sin_snapshot,
+            max_procesos=args.procesos, incremental=args.incremental)
+        cambios = df_conceptos.attrs.get('cambios_sap')
+        cambios_df = pd.DataFrame(cambios) if cambios is not None else None
+        salida = _exportar(args, df_conceptos, df_netos, masterdata_df,
+                           hojas_adicionales={'Cambios_SAP': cambios_df} if cambios_df is not None else None)
+        if args.historico:
+            _registrar_historico(args, df_conceptos, df_netos, masterdata_df, periodo, nombre)
+    except ErrorLiquidacion as e:
+        return _informar_error(e)
+
+    if not args.silencioso:
+        if cambios_df is not None:
+            print(f"Bloques reprocesados: {df_conceptos.attrs.get('bloques_reprocesados', 0):,} "
+                  f"de {df_conceptos.attrs.get('bloques_totales', 0):,}")
+            conteo = cambios_df['CAMBIO'].value_counts()
+            print("SAP respecto de la versión anterior: "
+                  + ', '.join(f"{conteo.get(c, 0):,} {c}s" for c in ('nuevo', 'eliminado', 'modificado')))
+        _imprimir_resumen(df_conceptos, df_netos, masterdata_df, salida)
+    return 0
+
+
+def comando_lote(args) -> int:
+    """Procesa varios archivos de liquidación contra un MASTERDATA y escribe un consolidado"""
+    from .errores import ErrorLiquidacion
+    from .lote import listar_archivos_liquidacion, procesar_lote
+
+    omitidos = []
+    try:
+        archivos = listar_archivos_liquidacion(args.liquidaciones, omitidos=omitidos)
+    except ErrorLiquidacion as e:
+        return _informar_error(e)
+    for nombre, motivo in omitidos:
+        _aviso(f"{nombre} se omite: {motivo}")
+    if not archivos:
+        print("Error: no se encontraron archivos de liquidación", file=sys.stderr)
+        return 1
+
+    try:
+        df_conceptos, df_netos, masterdata_df, resumen_df = procesar_lote(
+            archivos, Path(args.masterdata), snapshots=not args.sin_snapshot, max_procesos=args.procesos)
+        salida = _exportar(args, df_conceptos, df_netos, masterdata_df,
+                           hojas_adicionales={'Resumen_Archivos': resumen_df})
+        if args.historico:
+            _registrar_historico(args, df_conceptos, df_netos, masterdata_df)
+    except ErrorLiquidacion as e:
+        return _informar_error(e)
+
+    for fila in resumen_df[resumen_df['ERROR'].notna()].itertuples():
+        _aviso(f"{fila.ARCHIVO}: {fila.ERROR}")
+
+    if not args.silencioso:
+        print(resumen_df.drop(columns=['ERROR']).to_string(index=False))
+        print()
+        print(f"Archivos procesados:  {len(archivos):,}")
+        _imprimir_resumen(df_conceptos, df_netos, masterdata_df, salida)
+    return 0
+
+
+def comando_limpiar(args) -> int:
+    """Borra lo que el procesamiento deja en disco: estado incremental y snapshots (y el histórico)"""
+    from .historico import RUTA_HISTORICO
+    from .incremental import DIR_INCREMENTAL, borrar_estados
+    from .masterdata import DIR_SNAPSHOTS, borrar_snapshots
+
+    print(f"Estados incrementales borrados: {borrar_estados():,} ({DIR_INCREMENTAL})")
+    print(f"Snapshots de MASTERDATA borrados: {borrar_snapshots():,} ({DIR_SNAPSHOTS})")
+    if args.historico:
+        # La base y sus archivos del modo WAL
+        for sufijo in ('', '-wal', '-shm'):
+            RUTA_HISTORICO.with_name(RUTA_HISTORICO.name + sufijo).unlink(missing_ok=True)
+        print(f"Histórico borrado ({RUTA_HISTORICO})")
+    return 0
+
+
+def _argumentos_salida(p):
+    p.add_argument('-o', '--salida', help="Ruta de salida (por defecto JMC_Nomina2025_<fecha>.xlsx o .zip)")
+    p.add_argument('-f', '--formato', choices=FORMATOS_EXPORTACION, default='xlsx',
+                   help="xlsx (por defecto), o csv / parquet empaquetados en un .zip con un archivo por hoja")
+    p.add_argument('--sin-snapshot', action='store_true',
+                   help="No leer ni crear el snapshot Parquet de MASTERDATA")
+    p.add_argument('-q', '--silencioso', action='store_true', help="No imprimir el resumen")
+    p.add_argument('--rendimiento', action='store_true',
+                   help="Imprimir el tiempo, filas y pico de memoria de cada etapa")
+    p.add_argument('--perfil', metavar='ARCHIVO.prof',
+                   help="Perfilar la ejecución con cProfile y guardar el resultado (pstats / snakeviz)")
+    p.add_argument('--historico', action='store_true',
+                   help="Agregar los conceptos y netos al histórico por período (SQLite local, LIQUIDACION_HISTORICO)")
+    p.add_argument('--reemplazar', action='store_true',
+                   help="Con --historico, reemplazar las corridas del período con el mismo nombre de archivo "
+                        "(versión corregida); sin él, un archivo distinto con el mismo nombre se agrega aparte")
+    p.add_argument('--prefijos-deduccion', metavar='P1,P2,...',
+                   help="Prefijos de los códigos que restan en la conciliación con 'Total General' "
+                        "(por defecto LIQUIDACION_PREFIJOS_DEDUCCION; sin ninguno, no se concilia)")
+    p.add_argument('--prefijos-informativos', metavar='P1,P2,...',
+                   help="Prefijos de los códigos que no se suman en la conciliación "
+                        "(por defecto LIQUIDACION_PREFIJOS_INFORMATIVOS)")
+    p.add_argument('--periodo', metavar='AAAA-MM',
+                   help="Período para el histórico (por defecto, el del nombre o el encabezado del archivo; "
+                        "en un lote, solo para los archivos sin período detectado)")
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='liquidacion',
+        description="JMC · Nómina 2025 — consolidación de liquidación y MASTERDATA sin interfaz",
+    )
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p = sub.add_parser('procesar', aliases=['process'],
+                       help="Procesa un archivo de liquidación contra MASTERDATA")
+    p.add_argument('liquidacion', help="Archivo de liquidación (.txt, o comprimido .gz, .zip o .zst)")
+    p.add_argument('masterdata', help="Archivo MASTERDATA (.xlsx, .xlsb, .xls, .xlsm, .csv; también comprimido)")
+    p.add_argument('-p', '--procesos', type=int, default=None,
+                   help="Procesos para parsear el archivo por bloques de empleado (por defecto 1; solo se usan "
+                        "con archivos desde LIQUIDACION_MIN_BYTES_PARALELO, 32 MB por defecto)")
+    p.add_argument('--incremental', action='store_true',
+                   help="Reutilizar los bloques sin cambios de la versión anterior del mismo archivo (guarda las "
+                        "filas parseadas en disco, LIQUIDACION_INCREMENTAL; se borran con el comando limpiar)")
+    _argumentos_salida(p)
+    p.set_defaults(funcion=comando_procesar)
+
+    p = sub.add_parser('lote', aliases=['batch'],
+                       help="Procesa varios archivos de liquidación contra un solo MASTERDATA")
+    p.add_argument('liquidaciones', nargs='+',
+                   help="Archivos de liquidación (.txt o comprimidos .gz, .zip o .zst; un .zip puede traer "
+                        "varios) o directorios que los contienen")
+    p.add_argument('-m', '--masterdata', required=True,
+                   help="Archivo MASTERDATA (.xlsx, .xlsb, .xls, .xlsm, .csv; también comprimido)")
+    p.add_argument('-p', '--procesos', type=int, default=None,
+                   help="Procesos en paralelo, un archivo por proceso (por defecto 1; solo se usan si el lote "
+                        "suma LIQUIDACION_MIN_BYTES_PARALELO, 32 MB por defecto)")
+    _argumentos_salida(p)
+    p.set_defaults(funcion=comando_lote)
+
+    p = sub.add_parser('limpiar', aliases=['clean'],
+                       help="Borra el estado incremental y los snapshots de MASTERDATA guardados en disco")
+    p.add_argument('--historico', action='store_true',
+                   help="Borrar también el histórico por período (LIQUIDACION_HISTORICO)")
+    p.set_defaults(funcion=comando_limpiar)
+
+    return parser
+
+
+def _imprimir_rendimiento(ejecucion):
+    tabla = ejecucion.tabla()
+    if not tabla.empty:
+        ancho = tabla['etapa'].str.len().max()
+        print(tabla.to_string(index=False, na_rep='', formatters={'etapa': lambda e: e.ljust(ancho)}),
+              file=sys.stderr)
+    print(f"Total: {ejecucion.segundos:,.2f} s, pico de memoria {ejecucion.memoria_pico_mb:,.0f} MB"
+          + (" (del proceso)" if ejecucion.memoria_proceso else ""), file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    args = crear_parser().parse_args(argv)
+    if args.comando in ('limpiar', 'clean'):
+        return args.funcion(args)
+    from .rendimiento import medir_ejecucion
+
+    archivos = [args.liquidacion] if args.comando in ('procesar', 'process') else args.liquidaciones
+    datos = {'comando': args.comando, 'liquidacion': [Path(a).name for a in archivos],
+             'masterdata': Path(args.masterdata).name}
+    with medir_ejecucion('cli', datos, perfil=bool(args.perfil)) as ejecucion:
+        codigo = args.funcion(args)
+    if args.perfil:
+        ejecucion.perfil.dump_stats(args.perfil)
+    if args.rendimiento:
+        _imprimir_rendimiento(ejecucion)
+    return codigo
@@ -0,0 +1,115 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Combinación de conceptos y netos con MASTERDATA.
+#
+# MASTERDATA se proyecta una sola vez a las columnas que usan las hojas de
+# salida (más la de salario detectada), se indexa por 'Nº pers.' y ese índice
+# se reutiliza para Netos y Preno_Convertida.
+
+import pandas as pd
+
+from .masterdata import COLUMNA_LLAVE, COLUMNAS_MASTERDATA
+from .utilidades import convertir_importes, detectar_columna_salario, formatear_fechas_excel
+
+# Columnas con pocos valores distintos: pasan a categóricas (REGIONAL, CE_COSTE, CARGO, NIVEL)
+COLUMNAS_CATEGORICAS = ['División de personal', 'Ce.coste', 'Función', 'Área de personal']
+
+
+class MasterdataIndexado:
+    """
+    MASTERDATA proyectado e indexado por 'Nº pers.' (int64, sin nulos ni duplicados),
+    con SALARIO numérico, 'Fecha' ya en dd/mm/yyyy y COLUMNAS_CATEGORICAS categóricas.
+    `duplicados` cuenta las filas de cada 'Nº pers.' repetido; de cada uno se
+    conserva la primera.
+    """
+
+    def __init__(self, tabla: pd.DataFrame, columna_salario, duplicados: pd.Series, filas_sin_llave: int,
+                 salarios_no_convertidos: int = 0, fechas_no_convertidas: int = 0):
+        self.tabla = tabla
+        self.columna_salario = columna_salario
+        self.duplicados = duplicados
+        self.filas_sin_llave = filas_sin_llave
+        self.salarios_no_convertidos = salarios_no_convertidos
+        self.fechas_no_convertidas = fechas_no_convertidas
+
+    def __len__(self):
+        return len(self.tabla)
+
+    def __sizeof__(self):
+        return int(self.tabla.memory_usage(index=True, deep=True).sum())
+
+    @property
+    def avisos(self) -> list:
+        """Mensajes de calidad de MASTERDATA para mostrar al usuario"""
+        avisos = []
+        if len(self.duplicados):
+            ejemplos = ', '.join(str(k) for k in self.duplicados.index[:10])
+            avisos.append(
+                f"{len(self.duplicados):,} 'Nº pers.' duplicados en MASTERDATA "
+                f"({int(self.duplicados.sum()):,} filas); se usa la primera fila de cada uno. "
+                f"Ejemplos: {ejemplos}"
+            )
+        if self.filas_sin_llave:
+            avisos.append(f"{self.filas_sin_llave:,} filas de MASTERDATA sin 'Nº pers.' válido fueron ignoradas")
+        if self.salarios_no_convertidos:
+            avisos.append(f"{self.salarios_no_convertidos:,} salarios de '{self.columna_salario}' "
+                          f"no son un número válido y se tomaron como 0")
+        if self.fechas_no_convertidas:
+            avisos.append(f"{self.fechas_no_convertidas:,} valores de 'Fecha' no se pudieron "
+                          f"convertir a dd/mm/yyyy y se dejaron como estaban")
+        return avisos
+
+
+def indexar_masterdata(masterdata_df: pd.DataFrame) -> MasterdataIndexado:
+    """Proyecta MASTERDATA a las columnas necesarias y lo indexa una vez por 'Nº pers.'"""
+    columna_salario = detectar_columna_salario(masterdata_df.columns)
+    columnas = [c for c in COLUMNAS_MASTERDATA if c in masterdata_df.columns]
+
+    llave = pd.to_numeric(masterdata_df[COLUMNA_LLAVE], errors='coerce')
+    validas = llave.notna().to_numpy()
+    filas_sin_llave = int((~validas).sum())
+
+    tabla = masterdata_df.loc[validas, columnas]
+    salarios_no_convertidos = fechas_no_convertidas = 0
+    if columna_salario:
+        # Convierte solo el texto; los valores ya numéricos quedan igual
+        salario, salarios_no_convertidos = convertir_importes(masterdata_df.loc[validas, columna_salario])
+        tabla = tabla.assign(SALARIO=salario)
+    else:
+        tabla = tabla.assign(SALARIO=pd.NA)
+    if 'Fecha' in tabla.columns:
+        fecha, fechas_no_convertidas = formatear_fechas_excel(tabla['Fecha'])
+        tabla = tabla.assign(Fecha=fecha)
+    categoricas = [c for c in COLUMNAS_CATEGORICAS if c in tabla.columns]
+    if categoricas:
+        tabla = tabla.astype({c: 'category' for c in categoricas})
+    tabla.index = pd.Index(llave[validas].round().astype('int64'), name=COLUMNA_LLAVE)
+
+    repetidas = tabla.index.duplicated(keep='first')
+    duplicados = tabla.index[tabla.index.duplicated(keep=False)].value_counts()
+    if repetidas.any():
+        tabla = tabla[~repetidas]
+
+    return MasterdataIndexado(tabla, columna_salario, duplicados, filas_sin_llave,
+                              salarios_no_convertidos, fechas_no_convertidas)
+
+
+def buscar_en_masterdata(df: pd.DataFrame, masterdata) -> pd.DataFrame:
+    """
+    Columnas de MASTERDATA (y SALARIO) del 'Nº pers.' igual al SAP de cada fila de
+    `df`, con el mismo índice; vacías si el SAP no está en MASTERDATA.
+    """
+    if not isinstance(masterdata, MasterdataIndexado):
+        masterdata = indexar_masterdata(masterdata)
+
+    claves = pd.to_numeric(df['SAP'], errors='coerce').round().astype('Int64')
+    extra = masterdata.tabla.reindex(claves.array)
+    extra.index = df.index
+    return extra
+
+
+def combinar_con_masterdata(df: pd.DataFrame, masterdata) -> pd.DataFrame:
+    """
+    Agrega a `df` las columnas de MASTERDATA (y SALARIO) del 'Nº pers.' igual a su SAP
+    (equivale a un merge left). `masterdata` es un MasterdataIndexado o un DataFrame.
+    """
+    return pd.concat([df, buscar_en_masterdata(df, masterdata)], axis=1)
@@ -0,0 +1,150 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Archivos comprimidos (.gz, .zip, .zst) de liquidación y MASTERDATA.
+#
+# El TXT de recibos es casi todo espacios de relleno y comprime 10–20 veces, así
+# que se sube comprimido. Cada archivo de adentro se representa con un
+# ArchivoComprimido que guarda el comprimido (ruta o bytes) y se descomprime en
+# streaming al leerlo: el parser recibe las líneas sin que el archivo completo
+# se infle en memoria. Un .zip con varios TXT se expande a un archivo por TXT.
+# Los .zst requieren el paquete zstandard, que se importa solo al usarlos.
+
+import gzip
+import io
+import os
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+
+from .errores import ErrorArchivoLiquidacion
+
+FORMATOS_COMPRESION = {'.gz': 'gzip', '.zip': 'zip', '.zst': 'zstd'}
+EXTENSIONES_COMPRIMIDAS = tuple(FORMATOS_COMPRESION)
+
+
+def formato_compresion(nombre) -> str:
+    """'gzip', 'zip' o 'zstd' según la extensión del nombre; None si no es comprimido"""
+    return FORMATOS_COMPRESION.get(Path(str(nombre or '')).suffix.lower())
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ErrorArchivoLiquidacion("Para leer archivos .zst instala el paquete zstandard "
+                                      "(pip install zstandard)") from e
+    return zstandard
+
+
+@contextmanager
+def _abrir_origen(origen):
+    """Objeto archivo binario del comprimido (ruta o bytes)"""
+    if isinstance(origen, os.PathLike):
+        with open(origen, 'rb') as f:
+            yield f
+    else:
+        yield io.BytesIO(origen)
+
+
+class ArchivoComprimido:
+    """
+    Un archivo dentro de un .gz, un .zst o un miembro de un .zip. `origen` es la
+    ruta (Path) o los bytes del comprimido; se puede enviar a otro proceso.
+    `name` es el nombre del archivo de adentro y `size` su tamaño descomprimido,
+    si el formato lo informa (para la barra de avance).
+    """
+
+    def __init__(self, origen, formato: str, nombre: str, miembro: str = None):
+        self.origen = origen
+        self.formato = formato
+        self.name = nombre
+        self.miembro = miembro
+        self._size = False
+
+    def __repr__(self):
+        return f"ArchivoComprimido({self.name!r}, {self.formato})"
+
+    @contextmanager
+    def abrir(self):
+        """Objeto archivo binario que descomprime a medida que se lee"""
+        with _abrir_origen(self.origen) as comprimido:
+            if self.formato == 'gzip':
+                with gzip.GzipFile(fileobj=comprimido) as f:
+                    yield f
+            elif self.formato == 'zip':
+                with zipfile.ZipFile(comprimido) as z, z.open(self.miembro) as f:
+                    yield f
+            else:
+                with _zstandard().ZstdDecompressor().stream_reader(comprimido, read_across_frames=True) as f:
+                    yield f
+
+    def leer(self) -> bytes:
+        """Contenido descomprimido completo (para los formatos que necesitan acceso aleatorio)"""
+        with self.abrir() as f:
+            return f.read()
+
+    @property
+    def size(self):
+        if self._size is False:
+            self._size = self._tamano_descomprimido()
+        return self._size
+
+    def _tamano_descomprimido(self):
+        with _abrir_origen(self.origen) as comprimido:
+            if self.formato == 'zip':
+                with zipfile.ZipFile(comprimido) as z:
+                    return z.getinfo(self.miembro).file_size
+            if self.formato == 'gzip':
+                # ISIZE: últimos 4 bytes, módulo 2**32 (basta para estimar el avance)
+                comprimido.seek(-4, io.SEEK_END)
+                return int.from_bytes(comprimido.read(4), 'little') or None
+            try:
+                tamano = _zstandard().frame_content_size(comprimido.read(18))
+            except Exception:
+                return None
+            return tamano if tamano > 0 else None
+
+
+def _contenido(fuente):
+    """Ruta (Path) o bytes del comprimido subido o indicado"""
+    if isinstance(fuente, (str, os.PathLike)):
+        return Path(fuente)
+    if isinstance(fuente, (bytes, bytearray)):
+        return bytes(fuente)
+    if hasattr(fuente, 'getvalue'):
+        return fuente.getvalue()
+    fuente.seek(0)
+    return fuente.read()
+
+
+def expandir_comprimido(fuente, extensiones=('.txt',), nombre: str = None) -> list:
+    """
+    [ArchivoComprimido] de `fuente` si es .gz, .zip o .zst; [fuente] si no lo es.
+    De un .zip se toman, ordenados por nombre, los miembros con alguna de las
+    `extensiones`. Lanza ErrorArchivoLiquidacion si el .zip no se puede abrir o no
+    trae ninguno.
+    """
+    nombre = nombre or (os.fspath(fuente) if isinstance(fuente, (str, os.PathLike)) else getattr(fuente, 'name', ''))
+    formato = formato_compresion(nombre)
+    if formato is None:
+        return [fuente]
+    origen = _contenido(fuente)
+    if formato != 'zip':
+        return [ArchivoComprimido(origen, formato, Path(nombre).stem)]
+
+    try:
+        with _abrir_origen(origen) as comprimido, zipfile.ZipFile(comprimido) as z:
+            miembros = sorted(
+                info.filename for info in z.infolist()
+                if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+                and not PurePosixPath(info.filename).name.startswith('.')
+                and info.filename.lower().endswith(tuple(extensiones)))
+    except zipfile.BadZipFile as e:
+        raise ErrorArchivoLiquidacion(f"{Path(nombre).name} no es un .zip válido: {e}") from e
+    if not miembros:
+        raise ErrorArchivoLiquidacion(f"{Path(nombre).name} no contiene archivos {', '.join(extensiones)}")
+    return [ArchivoComprimido(origen, formato, PurePosixPath(m).name, m) for m in miembros]
+
+
+def expandir_comprimidos(archivos, extensiones=('.txt',)) -> list:
+    """Archivos con cada comprimido reemplazado por los archivos que contiene (ver expandir_comprimido)"""
+    return [f for fuente in archivos for f in expandir_comprimido(fuente, extensiones)]
@@ -0,0 +1,147 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Conciliación de conceptos contra el 'Total General' de cada recibo.
+#
+# Por cada SAP (y archivo, en un lote) se suman los devengos y deducciones
+# parseados y se comparan con el neto de su línea 'Total General'. Si los
+# cortes de columna del parser dejan de coincidir con el formato del reporte,
+# las diferencias aparecen aquí y no en la revisión posterior del Excel.
+#
+# El signo sale del prefijo del código: las deducciones (salud, pensión,
+# retención, préstamos) restan, los códigos informativos (bases '/5xx') no
+# suman, y el resto son devengos. Los prefijos dependen de los conceptos de
+# nómina de cada sociedad y no hay valores por defecto: se configuran con
+# LIQUIDACION_PREFIJOS_DEDUCCION y LIQUIDACION_PREFIJOS_INFORMATIVOS, o por
+# ejecución con los argumentos de conciliar (--prefijos-deduccion /
+# --prefijos-informativos en la CLI, la sección "Conciliación" de la barra
+# lateral en la app). Sin prefijos de deducción la conciliación no se hace (ver
+# conciliacion_configurada). Los datos de prueba (bench/generar_datos.py) usan
+# 'Z1,Z2,2' y '/'.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from .combinacion import MasterdataIndexado, indexar_masterdata
+from .errores import ErrorLiquidacion
+from .rendimiento import etapa
+
+
+def leer_prefijos(texto: str) -> tuple:
+    """Prefijos separados por coma ('Z1, Z2,2' -> ('Z1', 'Z2', '2'))"""
+    return tuple(p.strip() for p in texto.split(',') if p.strip())
+
+
+def _prefijos(variable: str) -> tuple:
+    return leer_prefijos(os.environ.get(variable, ''))
+
+
+# Prefijos de código que restan del neto y que no lo afectan (vacíos si no se configuran)
+PREFIJOS_DEDUCCION = _prefijos('LIQUIDACION_PREFIJOS_DEDUCCION')
+PREFIJOS_INFORMATIVOS = _prefijos('LIQUIDACION_PREFIJOS_INFORMATIVOS')
+# Diferencia máxima (en pesos) entre el neto calculado y el 'Total General' que se acepta por redondeo
+TOLERANCIA = float(os.environ.get('LIQUIDACION_TOLERANCIA_CONCILIACION', '1'))
+
+CUADRA = 'cuadra'
+DIFERENCIA = 'diferencia'
+SIN_TOTAL = 'sin_total_general'
+SIN_CONCEPTOS = 'sin_conceptos'
+
+AVISO_SIN_PREFIJOS = ("no se concilia con 'Total General' porque no hay prefijos de deducción configurados "
+                      "(LIQUIDACION_PREFIJOS_DEDUCCION o --prefijos-deduccion)")
+
+
+def conciliacion_configurada(prefijos_deduccion=None) -> bool:
+    """Hay prefijos de deducción (los indicados o, si es None, los configurados) para conciliar"""
+    return bool(tuple(PREFIJOS_DEDUCCION if prefijos_deduccion is None else prefijos_deduccion))
+
+
+def signos_codigo(codigos: pd.Series, prefijos_deduccion=PREFIJOS_DEDUCCION,
+                  prefijos_informativos=PREFIJOS_INFORMATIVOS) -> np.ndarray:
+    """
+    Signo de cada fila según su código: -1 deducción, 0 informativo, 1 devengo.
+    Se clasifica cada código distinto una vez y se reparte por los códigos de la categoría.
+    """
+    if not isinstance(codigos.dtype, pd.CategoricalDtype):
+        codigos = codigos.astype('category')
+    categorias = codigos.cat.categories.astype(str)
+    signo_categoria = np.select(
+        [categorias.str.startswith(tuple(prefijos_informativos)), categorias.str.startswith(tuple(prefijos_deduccion))],
+        [0, -1], default=1).astype('int8')
+    # Código -1 (nulo) toma el último valor del arreglo: se agrega un 0 al final
+    return np.append(signo_categoria, np.int8(0))[codigos.cat.codes.to_numpy()]
+
+
+def conciliar(df_conceptos: pd.DataFrame, df_netos: pd.DataFrame, masterdata=None,
+              prefijos_deduccion=PREFIJOS_DEDUCCION, prefijos_informativos=PREFIJOS_INFORMATIVOS,
+              tolerancia: float = TOLERANCIA) -> pd.DataFrame:
+    """
+    Un registro por SAP (por ARCHIVO y SAP si vienen de un lote) con DEVENGOS,
+    DEDUCCIONES, NETO_CALCULADO, TOTAL_GENERAL, DIFERENCIA y ESTADO: 'cuadra',
+    'diferencia' (más de `tolerancia`), 'sin_total_general' (conceptos sin línea
+    'Total General') o 'sin_conceptos' (al revés). Con `masterdata` agrega
+    SIN_MASTERDATA para los SAP que no están en MASTERDATA. Las filas sin SAP
+    (antes de la primera cabecera) quedan con SAP vacío. Lanza ErrorLiquidacion
+    sin prefijos de deducción (ver conciliacion_configurada).
+    """
+    if not conciliacion_configurada(prefijos_deduccion):
+        raise ErrorLiquidacion(AVISO_SIN_PREFIJOS[0].upper() + AVISO_SIN_PREFIJOS[1:])
+    if masterdata is not None and not isinstance(masterdata, MasterdataIndexado):
+        masterdata = indexar_masterdata(masterdata)
+    df_conceptos = df_conceptos if df_conceptos is not None else pd.DataFrame(columns=['CÓDIGO', 'VALOR', 'SAP'])
+    df_netos = df_netos if df_netos is not None else pd.DataFrame(columns=['Valor', 'SAP'])
+    claves = ['ARCHIVO', 'SAP'] if 'ARCHIVO' in df_conceptos.columns or 'ARCHIVO' in df_netos.columns else ['SAP']
+
+    with etapa('conciliacion') as e:
+        signo = signos_codigo(df_conceptos['CÓDIGO'], prefijos_deduccion, prefijos_informativos)
+        valor = df_conceptos['VALOR'].to_numpy(dtype='float64')
+        importes = pd.DataFrame({
+            **{c: df_conceptos[c] for c in claves if c in df_conceptos.columns},
+            'DEVENGOS': np.where(signo > 0, valor, 0.0),
+            'DEDUCCIONES': np.where(signo < 0, valor, 0.0),
+            'CONCEPTOS': np.ones(len(df_conceptos), dtype='int32'),
+        }, index=df_conceptos.index, copy=False)
+        por_sap = importes.groupby(claves, observed=True, dropna=False, sort=False).sum()
+        totales = df_netos.groupby(claves, observed=True, dropna=False, sort=False)['Valor'].agg(['sum', 'size']) \
+            .rename(columns={'sum': 'TOTAL_GENERAL', 'size': 'LINEAS_TOTAL'})
+
+        tabla = por_sap.join(totales, how='outer')
+        sin_total = tabla['LINEAS_TOTAL'].isna().to_numpy()
+        sin_conceptos = tabla['CONCEPTOS'].isna().to_numpy()
+        tabla = tabla.fillna({'DEVENGOS': 0.0, 'DEDUCCIONES': 0.0, 'CONCEPTOS': 0, 'LINEAS_TOTAL': 0})
+        tabla['NETO_CALCULADO'] = tabla['DEVENGOS'] - tabla['DEDUCCIONES']
+        tabla['DIFERENCIA'] = tabla['NETO_CALCULADO'] - tabla['TOTAL_GENERAL']
+        tabla['ESTADO'] = pd.Categorical(
+            np.select([sin_total, sin_conceptos, tabla['DIFERENCIA'].abs().to_numpy() > tolerancia],
+                      [SIN_TOTAL, SIN_CONCEPTOS, DIFERENCIA], default=CUADRA),
+            categories=[CUADRA, DIFERENCIA, SIN_TOTAL, SIN_CONCEPTOS])
+        tabla = tabla.astype({'CONCEPTOS': 'int32', 'LINEAS_TOTAL': 'int32'}).reset_index()
+
+        if masterdata is not None:
+            saps = pd.to_numeric(tabla['SAP'], errors='coerce').astype('Int64')
+            tabla['SIN_MASTERDATA'] = ~saps.isin(masterdata.tabla.index).to_numpy(dtype=bool, na_value=False)
+        e.filas(len(df_conceptos) + len(df_netos), len(tabla))
+
+    columnas = claves + ['CONCEPTOS', 'DEVENGOS', 'DEDUCCIONES', 'NETO_CALCULADO', 'LINEAS_TOTAL',
+                         'TOTAL_GENERAL', 'DIFERENCIA', 'ESTADO'] + (['SIN_MASTERDATA'] if masterdata is not None else [])
+    return tabla[columnas]
+
+
+def incidencias(conciliacion: pd.DataFrame) -> pd.DataFrame:
+    """Registros que no cuadran o cuyo SAP no está en MASTERDATA, de mayor a menor diferencia"""
+    mascara = conciliacion['ESTADO'] != CUADRA
+    if 'SIN_MASTERDATA' in conciliacion.columns:
+        mascara |= conciliacion['SIN_MASTERDATA']
+    tabla = conciliacion[mascara.to_numpy()]
+    orden = tabla['DIFERENCIA'].abs().fillna(np.inf).sort_values(ascending=False, kind='stable').index
+    return tabla.loc[orden].reset_index(drop=True)
+
+
+def resumen_conciliacion(conciliacion: pd.DataFrame) -> dict:
+    """Conteo de registros por ESTADO, SAP sin MASTERDATA y suma absoluta de las diferencias"""
+    conteo = conciliacion['ESTADO'].value_counts()
+    return {
+        **{estado: int(conteo.get(estado, 0)) for estado in (CUADRA, DIFERENCIA, SIN_TOTAL, SIN_CONCEPTOS)},
+        'sin_masterdata': int(conciliacion['SIN_MASTERDATA'].sum()) if 'SIN_MASTERDATA' in conciliacion.columns else 0,
+        'diferencia_absoluta': float(conciliacion['DIFERENCIA'].abs().sum()),
+    }
@@ -0,0 +1,147 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Cubo de agregados para el análisis.
+#
+# Se calcula una vez por resultado: totales y conteos de conceptos por
+# CÓDIGO × REGIONAL × CE_COSTE × NIVEL y netos por REGIONAL × CE_COSTE × NIVEL.
+# Los filtros y desgloses de la interfaz trabajan sobre esos grupos (miles de
+# filas) y no vuelven a agrupar las filas de conceptos y netos (millones).
+
+import pandas as pd
+
+from .combinacion import MasterdataIndexado, buscar_en_masterdata, indexar_masterdata
+from .rendimiento import etapa
+
+# Dimensiones del cubo y la columna de MASTERDATA de la que salen
+DIMENSIONES = {'REGIONAL': 'División de personal', 'CE_COSTE': 'Ce.coste', 'NIVEL': 'Área de personal'}
+# Valor de las dimensiones para los SAP que no están en MASTERDATA
+SIN_DATO = '(sin MASTERDATA)'
+
+
+class CuboAnalisis:
+    """
+    Agregados de un resultado:
+    - `conceptos`: un registro por CÓDIGO × REGIONAL × CE_COSTE × NIVEL con VALOR,
+      CANTIDAD, FILAS y EMPLEADOS (SAP distintos).
+    - `netos`: un registro por REGIONAL × CE_COSTE × NIVEL con NETO, FILAS y EMPLEADOS.
+    - `nombres_codigo`: CONCEPTO de cada CÓDIGO.
+    Cada SAP tiene una sola regional, centro de coste y nivel, así que EMPLEADOS se
+    puede sumar entre esos grupos, pero no entre códigos.
+    """
+
+    def __init__(self, conceptos: pd.DataFrame, netos: pd.DataFrame, nombres_codigo: pd.Series):
+        self.conceptos = conceptos
+        self.netos = netos
+        self.nombres_codigo = nombres_codigo
+
+    def __len__(self):
+        return len(self.conceptos) + len(self.netos)
+
+    def __sizeof__(self):
+        return int(self.conceptos.memory_usage(index=True, deep=True).sum()
+                   + self.netos.memory_usage(index=True, deep=True).sum())
+
+    def valores(self, dimension: str) -> list:
+        """Valores presentes de una dimensión (CÓDIGO, REGIONAL, CE_COSTE o NIVEL), para los filtros"""
+        tabla = self.conceptos if dimension == 'CÓDIGO' or self.netos.empty else self.netos
+        if dimension not in tabla.columns:
+            return []
+        return sorted(tabla[dimension].dropna().unique().tolist(), key=str)
+
+    @staticmethod
+    def _filtrar(tabla: pd.DataFrame, filtros: dict) -> pd.DataFrame:
+        mascara = None
+        for dimension, valores in filtros.items():
+            if not valores or dimension not in tabla.columns:
+                continue
+            coincide = tabla[dimension].isin(valores).to_numpy()
+            mascara = coincide if mascara is None else mascara & coincide
+        return tabla if mascara is None else tabla[mascara]
+
+    def filtrar(self, **filtros):
+        """
+        (conceptos, netos) de los grupos que cumplen los filtros, p. ej.
+        filtrar(REGIONAL=['Costa'], CÓDIGO=['Y001']). Una lista vacía o None no filtra;
+        CÓDIGO no filtra los netos.
+        """
+        return self._filtrar(self.conceptos, filtros), self._filtrar(self.netos, filtros)
+
+    def totales(self, **filtros) -> dict:
+        """Valor y cantidad de conceptos, códigos distintos, empleados y neto con los filtros"""
+        conceptos, netos = self.filtrar(**filtros)
+        return {
+            'valor': float(conceptos['VALOR'].sum()) if not conceptos.empty else 0.0,
+            'cantidad': float(conceptos['CANTIDAD'].sum()) if not conceptos.empty else 0.0,
+            'filas_conceptos': int(conceptos['FILAS'].sum()) if not conceptos.empty else 0,
+            'codigos': int(conceptos['CÓDIGO'].nunique()) if not conceptos.empty else 0,
+            'empleados': int(netos['EMPLEADOS'].sum()) if not netos.empty else 0,
+            'neto': float(netos['NETO'].sum()) if not netos.empty else 0.0,
+        }
+
+    def conceptos_por(self, dimension: str, **filtros) -> pd.DataFrame:
+        """
+        VALOR, CANTIDAD y FILAS de los conceptos por `dimension`, de mayor a menor
+        VALOR. Por CÓDIGO también trae CONCEPTO y EMPLEADOS.
+        """
+        conceptos, _ = self.filtrar(**filtros)
+        sumas = ['VALOR', 'CANTIDAD', 'FILAS'] + (['EMPLEADOS'] if dimension == 'CÓDIGO' else [])
+        tabla = conceptos.groupby(dimension, observed=True, sort=False)[sumas].sum()
+        if dimension == 'CÓDIGO':
+            tabla.insert(0, 'CONCEPTO', self.nombres_codigo.reindex(tabla.index).astype(object))
+        return tabla.sort_values('VALOR', ascending=False).reset_index()
+
+    def netos_por(self, dimension: str, **filtros) -> pd.DataFrame:
+        """NETO, EMPLEADOS y FILAS de los netos por REGIONAL, CE_COSTE o NIVEL, de mayor a menor NETO"""
+        _, netos = self.filtrar(**filtros)
+        tabla = netos.groupby(dimension, observed=True, sort=False)[['NETO', 'EMPLEADOS', 'FILAS']].sum()
+        return tabla.sort_values('NETO', ascending=False).reset_index()
+
+
+def _dimensiones(df: pd.DataFrame, masterdata: MasterdataIndexado) -> dict:
+    """REGIONAL, CE_COSTE y NIVEL de cada fila de `df` (SIN_DATO si el SAP no está en MASTERDATA)"""
+    extra = buscar_en_masterdata(df, masterdata)
+    dimensiones = {}
+    for dimension, columna in DIMENSIONES.items():
+        if columna not in extra.columns:
+            dimensiones[dimension] = pd.Series(SIN_DATO, index=df.index, dtype='category')
+            continue
+        serie = extra[columna]
+        if not isinstance(serie.dtype, pd.CategoricalDtype):
+            serie = serie.astype('category')
+        if serie.isna().any():
+            serie = serie.cat.add_categories([SIN_DATO]).fillna(SIN_DATO)
+        dimensiones[dimension] = serie
+    return dimensiones
+
+
+def calcular_cubo(df_conceptos: pd.DataFrame, df_netos: pd.DataFrame, masterdata) -> CuboAnalisis:
+    """
+    Agrega conceptos y netos por las dimensiones de MASTERDATA (DataFrame o
+    MasterdataIndexado). Ver CuboAnalisis.
+    """
+    if not isinstance(masterdata, MasterdataIndexado):
+        masterdata = indexar_masterdata(masterdata)
+    claves = list(DIMENSIONES)
+
+    with etapa('cubo') as e:
+        if df_conceptos is not None and not df_conceptos.empty:
+            base = pd.DataFrame({'CÓDIGO': df_conceptos['CÓDIGO'], **_dimensiones(df_conceptos, masterdata),
+                                 'VALOR': df_conceptos['VALOR'], 'CANTIDAD': df_conceptos['CANTIDAD'],
+                                 'SAP': df_conceptos['SAP']}, copy=False)
+            conceptos = base.groupby(['CÓDIGO'] + claves, observed=True).agg(
+                VALOR=('VALOR', 'sum'), CANTIDAD=('CANTIDAD', 'sum'),
+                FILAS=('VALOR', 'size'), EMPLEADOS=('SAP', 'nunique')).reset_index()
+            nombres_codigo = df_conceptos.groupby('CÓDIGO', observed=True)['CONCEPTO'].first()
+        else:
+            conceptos = pd.DataFrame(columns=['CÓDIGO'] + claves + ['VALOR', 'CANTIDAD', 'FILAS', 'EMPLEADOS'])
+            nombres_codigo = pd.Series(dtype=object)
+
+        if df_netos is not None and not df_netos.empty:
+            base = pd.DataFrame({**_dimensiones(df_netos, masterdata), 'NETO': df_netos['Valor'],
+                                 'SAP': df_netos['SAP']}, copy=False)
+            netos = base.groupby(claves, observed=True).agg(
+                NETO=('NETO', 'sum'), FILAS=('NETO', 'size'), EMPLEADOS=('SAP', 'nunique')).reset_index()
+        else:
+            netos = pd.DataFrame(columns=claves + ['NETO', 'FILAS', 'EMPLEADOS'])
+
+        e.filas(sum(len(df) for df in (df_conceptos, df_netos) if df is not None), len(conceptos) + len(netos))
+    return CuboAnalisis(conceptos, netos, nombres_codigo)
@@ -0,0 +1,27 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Errores del motor de procesamiento. La interfaz (Streamlit o CLI) decide cómo mostrarlos.
+
+
+class ErrorLiquidacion(Exception):
+    """Error base del procesamiento de liquidación y MASTERDATA"""
+
+
+class ErrorArchivoLiquidacion(ErrorLiquidacion):
+    """No se pudo leer o no se extrajeron datos del archivo de liquidación"""
+
+
+class ErrorMasterdata(ErrorLiquidacion):
+    """No se pudo leer MASTERDATA o le faltan columnas obligatorias"""
+
+    def __init__(self, mensaje: str, columnas=None):
+        super().__init__(mensaje)
+        # Columnas encontradas en el archivo, útiles para diagnosticar
+        self.columnas = list(columnas) if columnas is not None else []
+
+
+class ErrorExportacion(ErrorLiquidacion):
+    """No se pudo generar el archivo de salida"""
+
+
+class ErrorHistorico(ErrorLiquidacion):
+    """No se pudo leer o escribir el histórico de liquidaciones"""
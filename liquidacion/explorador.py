@@ -0,0 +1,202 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Explorador paginado de las hojas Netos y Preno_Convertida.
+#
+# No se arma la hoja combinada completa: los filtros (SAP, CÓDIGO, REGIONAL,
+# cédula) se resuelven con índices ordenados sobre las filas parseadas, el
+# orden se calcula con un argsort de la columna elegida y solo las filas de la
+# página pedida se cruzan con MASTERDATA (ver preparar_netos y
+# preparar_conceptos). Los índices se construyen la primera vez que se usan.
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .combinacion import MasterdataIndexado, indexar_masterdata
+from .exportar import COLUMNAS_CONCEPTOS, COLUMNAS_NETOS, ORDEN_CONCEPTOS, ORDEN_NETOS, \
+    preparar_conceptos, preparar_netos
+
+# Filtros y órdenes recientes que se recuerdan por hoja (cambiar de página no los recalcula)
+CONSULTAS_RECORDADAS = 16
+# Columnas de MASTERDATA por las que se filtra
+COLUMNA_REGIONAL = 'División de personal'
+COLUMNA_CEDULA = 'Número ID'
+
+
+class _IndiceOrdenado:
+    """Posiciones de las filas por clave entera: argsort una vez y búsqueda binaria por consulta"""
+
+    def __init__(self, claves: np.ndarray):
+        self.orden = np.argsort(claves, kind='stable')
+        self.claves = claves[self.orden]
+
+    def posiciones(self, valores) -> np.ndarray:
+        """Posiciones (ordenadas) de las filas cuya clave está en `valores`"""
+        valores = np.unique(np.asarray(valores, dtype=self.claves.dtype))
+        inicios = np.searchsorted(self.claves, valores, side='left')
+        fines = np.searchsorted(self.claves, valores, side='right')
+        partes = [self.orden[i:f] for i, f in zip(inicios, fines) if f > i]
+        return np.sort(np.concatenate(partes)) if partes else np.empty(0, dtype=np.int64)
+
+
+def _texto_cedula(valores: pd.Series) -> pd.Series:
+    """Cédulas como texto comparable: los números enteros sin '.0' (la columna es float si hay vacíos)"""
+    numeros = pd.to_numeric(valores, errors='coerce')
+    enteros = (numeros % 1 == 0).to_numpy(dtype=bool, na_value=False)
+    texto = valores.astype(str).str.strip()
+    return texto.where(~enteros, numeros.where(enteros).astype('Int64').astype(str))
+
+
+def _conocidos(codigos: np.ndarray) -> np.ndarray:
+    """Códigos de categoría de los valores pedidos, sin los desconocidos (-1 es también 'sin valor')"""
+    return codigos[codigos >= 0]
+
+
+def _claves_sap(saps: pd.Series) -> np.ndarray:
+    """SAP como int64 (-1 para las filas sin SAP)"""
+    return pd.to_numeric(saps, errors='coerce').fillna(-1).to_numpy(dtype='int64')
+
+
+class HojaNavegable:
+    """Una hoja (filas parseadas + MASTERDATA) con filtros indexados, orden y páginas"""
+
+    def __init__(self, nombre: str, df: pd.DataFrame, masterdata: MasterdataIndexado, preparar,
+                 columnas: dict, orden: list):
+        self.nombre = nombre
+        self.df = df
+        self.masterdata = masterdata
+        self._preparar = preparar
+        # Columna de salida -> columna de origen, solo las que existen en esta hoja
+        origen = {nuevo: viejo for viejo, nuevo in columnas.items()}
+        disponibles = set(df.columns) | set(masterdata.tabla.columns)
+        self.columnas = [c for c in orden if c == 'SALARIO' or origen.get(c) in disponibles]
+        self._origen = {c: origen.get(c, c) for c in self.columnas}
+        self._indices = {}
+        self._fila_masterdata = None
+        self._consultas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.df)
+
+    # -------------------------------
+    # Índices (perezosos)
+    # -------------------------------
+    def _indice(self, nombre: str) -> _IndiceOrdenado:
+        indice = self._indices.get(nombre)
+        if indice is None:
+            if nombre == 'SAP':
+                claves = _claves_sap(self.df['SAP'])
+            elif nombre == 'CÓDIGO':
+                claves = self.df['CÓDIGO'].cat.codes.to_numpy(dtype='int64')
+            else:  # REGIONAL: código de la categoría de MASTERDATA de cada fila (-1 si no está)
+                regional = self.masterdata.tabla[COLUMNA_REGIONAL]
+                codigos = np.append(regional.cat.codes.to_numpy(dtype='int64'), -1)
+                claves = codigos[self.fila_masterdata()]
+            indice = self._indices[nombre] = _IndiceOrdenado(claves)
+        return indice
+
+    def fila_masterdata(self) -> np.ndarray:
+        """Posición en MASTERDATA del SAP de cada fila (-1 si no está)"""
+        if self._fila_masterdata is None:
+            self._fila_masterdata = self.masterdata.tabla.index.get_indexer(_claves_sap(self.df['SAP']))
+        return self._fila_masterdata
+
+    # -------------------------------
+    # Consulta
+    # -------------------------------
+    def _filtrar(self, sap, codigo, regional, cedula) -> np.ndarray:
+        conjuntos = []
+        if sap:
+            conjuntos.append(self._indice('SAP').posiciones(list(sap)))
+        if cedula and COLUMNA_CEDULA in self.masterdata.tabla.columns:
+            cedulas = _texto_cedula(self.masterdata.tabla[COLUMNA_CEDULA])
+            buscadas = _texto_cedula(pd.Series(list(cedula), dtype=object))
+            saps = self.masterdata.tabla.index[cedulas.isin(buscadas).to_numpy()]
+            conjuntos.append(self._indice('SAP').posiciones(saps.tolist()))
+        if codigo and 'CÓDIGO' in self.df.columns:
+            categorias = self.df['CÓDIGO'].cat.categories
+            conjuntos.append(self._indice('CÓDIGO').posiciones(_conocidos(categorias.get_indexer(list(codigo)))))
+        if regional and COLUMNA_REGIONAL in self.masterdata.tabla.columns:
+            categorias = self.masterdata.tabla[COLUMNA_REGIONAL].cat.categories
+            conjuntos.append(self._indice('REGIONAL').posiciones(_conocidos(categorias.get_indexer(list(regional)))))
+        if not conjuntos:
+            return np.arange(len(self.df))
+        posiciones = conjuntos[0]
+        for otro in conjuntos[1:]:
+            posiciones = np.intersect1d(posiciones, otro, assume_unique=True)
+        return posiciones
+
+    def _clave_orden(self, columna: str, posiciones: np.ndarray) -> pd.Series:
+        """Valores de la columna de salida en las posiciones, sin armar la hoja"""
+        origen = self._origen[columna]
+        if origen in self.df.columns:
+            return self.df[origen].iloc[posiciones].reset_index(drop=True)
+        valores = self.masterdata.tabla[origen].iloc[np.maximum(self.fila_masterdata()[posiciones], 0)]
+        return valores.reset_index(drop=True).where(self.fila_masterdata()[posiciones] >= 0)
+
+    def posiciones(self, sap=None, codigo=None, regional=None, cedula=None,
+                   orden: str = None, descendente: bool = False) -> np.ndarray:
+        """Posiciones de las filas que cumplen los filtros, en el orden pedido (memorizado)"""
+        clave = tuple(tuple(sorted(map(str, v or ()))) for v in (sap, codigo, regional, cedula)) + (orden, descendente)
+        with self._lock:
+            if clave in self._consultas:
+                self._consultas.move_to_end(clave)
+                return self._consultas[clave]
+
+        posiciones = self._filtrar(sap, codigo, regional, cedula)
+        if orden in self.columnas and len(posiciones):
+            permutacion = self._clave_orden(orden, posiciones).sort_values(
+                ascending=not descendente, na_position='last', kind='stable').index.to_numpy()
+            posiciones = posiciones[permutacion]
+
+        with self._lock:
+            self._consultas[clave] = posiciones
+            while len(self._consultas) > CONSULTAS_RECORDADAS:
+                self._consultas.popitem(last=False)
+        return posiciones
+
+    def pagina(self, numero: int = 1, tam_pagina: int = 50, **consulta):
+        """
+        (DataFrame de la página `numero` (desde 1) con las columnas de la hoja, total
+        de filas filtradas). `consulta`: sap, codigo, regional, cedula (listas),
+        orden (columna de salida) y descendente.
+        """
+        posiciones = self.posiciones(**consulta)
+        inicio = max(0, (numero - 1) * tam_pagina)
+        parte = self.df.iloc[posiciones[inicio:inicio + tam_pagina]]
+        return self._preparar(parte, self.masterdata).reset_index(drop=True), len(posiciones)
+
+
+class ExploradorResultados:
+    """Hojas navegables 'Netos' y 'Preno_Convertida' de un resultado"""
+
+    def __init__(self, df_conceptos: pd.DataFrame, df_netos: pd.DataFrame, masterdata):
+        if not isinstance(masterdata, MasterdataIndexado):
+            masterdata = indexar_masterdata(masterdata)
+        self.masterdata = masterdata
+        self.hojas = {}
+        if df_netos is not None and not df_netos.empty:
+            self.hojas['Netos'] = HojaNavegable('Netos', df_netos, masterdata, preparar_netos,
+                                                COLUMNAS_NETOS, ORDEN_NETOS)
+        if df_conceptos is not None and not df_conceptos.empty:
+            self.hojas['Preno_Convertida'] = HojaNavegable('Preno_Convertida', df_conceptos, masterdata,
+                                                           preparar_conceptos, COLUMNAS_CONCEPTOS, ORDEN_CONCEPTOS)
+
+    def __getitem__(self, hoja: str) -> HojaNavegable:
+        return self.hojas[hoja]
+
+    def codigos(self) -> list:
+        """Códigos presentes en los conceptos, para el filtro"""
+        hoja = self.hojas.get('Preno_Convertida')
+        return hoja.df['CÓDIGO'].cat.categories.tolist() if hoja is not None else []
+
+    def filtra_cedula(self) -> bool:
+        """Si MASTERDATA trae la cédula, para el filtro"""
+        return COLUMNA_CEDULA in self.masterdata.tabla.columns
+
+    def regionales(self) -> list:
+        """Regionales de MASTERDATA, para el filtro"""
+        tabla = self.masterdata.tabla
+        return tabla[COLUMNA_REGIONAL].cat.categories.tolist() if COLUMNA_REGIONAL in tabla.columns else []
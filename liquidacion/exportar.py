@@ -0,0 +1,275 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Exportación del resultado consolidado (Netos + Preno_Convertida).
+#
+# El Excel se escribe con xlsxwriter en modo constant_memory: las filas van
+# directo a archivos temporales en disco y no se arma el modelo del libro en
+# RAM. Las hojas que superan el límite de filas de Excel se parten en
+# Preno_Convertida_2, _3, ... También se puede exportar a CSV o Parquet
+# (un .zip con un archivo por hoja) para cargadores que no necesitan xlsx.
+
+import io
+import os
+import tempfile
+import weakref
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from .errores import ErrorExportacion
+from .grafo import GrafoEtapas
+from .rendimiento import etapa, informar_progreso
+from .combinacion import MasterdataIndexado, buscar_en_masterdata, indexar_masterdata
+from .formatos import EXTENSION_EXPORTACION, FORMATOS_EXPORTACION, MIME_EXPORTACION
+
+# Límite de filas de una hoja de Excel (incluida la cabecera)
+MAX_FILAS_HOJA = 1_048_576
+# Filas que se convierten a la vez antes de escribirlas
+TAM_LOTE_ESCRITURA = 50_000
+# Hasta este tamaño la salida temporal queda en memoria; por encima va a disco
+MAX_SPOOL_MEMORIA = 32 * 1024 * 1024
+
+# -------------------------------
+# Preparación de hojas (merge con MASTERDATA; las fechas vienen formateadas del índice)
+# -------------------------------
+def _armar_hoja(df, masterdata, columnas: dict, orden: list) -> pd.DataFrame:
+    """
+    Hoja de salida a partir de `df` y su búsqueda en MASTERDATA: renombra según
+    `columnas`, agrega SALARIO y ordena según `orden`, sin copiar las columnas.
+    """
+    extra = buscar_en_masterdata(df, masterdata)
+    origen = {**{c: df[c] for c in df.columns}, **{c: extra[c] for c in extra.columns}}
+    hoja = {nuevo: origen[viejo] for viejo, nuevo in columnas.items() if viejo in origen}
+    hoja['SALARIO'] = extra['SALARIO']
+    return pd.DataFrame({c: hoja[c] for c in orden if c in hoja}, copy=False)
+
+
+# Columnas de cada hoja: {columna de origen (parseada o de MASTERDATA): columna de salida} y orden
+COLUMNAS_NETOS = {
+    'NETO':'NETO','Valor':'Valor','SAP':'SAP',
+    'Número ID':'CÉDULA','Número de personal':'NOMBRE',
+    'División de personal':'REGIONAL','Ce.coste':'CE_COSTE',
+    'Fecha':'F. ING','Función':'CARGO','Área de personal':'NIVEL',
+    'ARCHIVO':'ARCHIVO','PERIODO':'PERIODO'
+}
+ORDEN_NETOS = ['NETO','Valor','SAP','CÉDULA','NOMBRE','REGIONAL','CE_COSTE','SALARIO','F. ING','CARGO','NIVEL','ARCHIVO','PERIODO']
+COLUMNAS_CONCEPTOS = {
+    'CÓDIGO':'CÓDIGO','CONCEPTO':'CONCEPTO','CANTIDAD':'CANTIDAD','VALOR':'VALOR','SAP':'SAP',
+    'Número ID':'CÉDULA','Número de personal':'NOMBRE',
+    'Fecha':'F. INGRESO','Función':'CARGO','Área de personal':'NIVEL',
+    'ARCHIVO':'ARCHIVO','PERIODO':'PERIODO'
+}
+ORDEN_CONCEPTOS = ['CÓDIGO','CONCEPTO','CANTIDAD','VALOR','SAP','CÉDULA','NOMBRE','SALARIO','F. INGRESO','CARGO','NIVEL','ARCHIVO','PERIODO']
+
+
+def preparar_netos(df_netos, masterdata) -> pd.DataFrame:
+    """Hoja 'Netos': netos combinados con MASTERDATA (DataFrame o MasterdataIndexado)"""
+    return _armar_hoja(df_netos, masterdata, COLUMNAS_NETOS, ORDEN_NETOS)
+
+
+def preparar_conceptos(df_conceptos, masterdata) -> pd.DataFrame:
+    """Hoja 'Preno_Convertida': conceptos combinados con MASTERDATA (DataFrame o MasterdataIndexado)"""
+    return _armar_hoja(df_conceptos, masterdata, COLUMNAS_CONCEPTOS, ORDEN_CONCEPTOS)
+
+
+def preparar_hojas(df_conceptos, df_netos, masterdata) -> dict:
+    """
+    Devuelve {nombre_hoja: DataFrame} en el orden en que se escriben.
+    MASTERDATA se indexa una sola vez para ambas hojas (si no viene ya indexado)
+    y las hojas se arman a la vez (ver GrafoEtapas).
+    """
+    if masterdata is None:
+        return {}
+    with etapa('combinacion') as e:
+        if not isinstance(masterdata, MasterdataIndexado):
+            masterdata = indexar_masterdata(masterdata)
+        grafo = GrafoEtapas()
+        if df_netos is not None and not df_netos.empty:
+            grafo.agregar('Netos', lambda: preparar_netos(df_netos, masterdata))
+        if df_conceptos is not None and not df_conceptos.empty:
+            grafo.agregar('Preno_Convertida', lambda: preparar_conceptos(df_conceptos, masterdata))
+        hojas = grafo.ejecutar()
+        e.filas(sum(len(df) for df in (df_conceptos, df_netos) if df is not None),
+                sum(len(df) for df in hojas.values()))
+    return hojas
+
+def hojas_de_resumen(df_conceptos=None, resumen_df=None, conciliacion=None) -> dict:
+    """
+    Hojas adicionales del resultado: 'Resumen_Archivos' (modo lote), 'Cambios_SAP'
+    (versión corregida de un archivo ya procesado, ver cargar_liquidacion_incremental)
+    y 'Conciliacion' (SAP que no cuadran con su 'Total General', ver conciliar).
+    """
+    hojas = {}
+    if resumen_df is not None:
+        hojas['Resumen_Archivos'] = resumen_df
+    cambios = df_conceptos.attrs.get('cambios_sap') if df_conceptos is not None else None
+    if cambios is not None:
+        hojas['Cambios_SAP'] = pd.DataFrame(cambios)
+    if conciliacion is not None:
+        from .conciliacion import incidencias
+        hojas['Conciliacion'] = incidencias(conciliacion)
+    return hojas
+
+# -------------------------------
+# Escritores
+# -------------------------------
+def _partes_hoja(nombre: str, df: pd.DataFrame):
+    """Parte una hoja en bloques que caben en Excel: Nombre, Nombre_2, Nombre_3, ..."""
+    filas_por_hoja = MAX_FILAS_HOJA - 1  # una fila es la cabecera
+    if len(df) <= filas_por_hoja:
+        yield nombre, df
+        return
+    for i, inicio in enumerate(range(0, len(df), filas_por_hoja), start=1):
+        yield (nombre if i == 1 else f'{nombre}_{i}'), df.iloc[inicio:inicio + filas_por_hoja]
+
+
+def _filas_para_escribir(df: pd.DataFrame):
+    """Filas como tuplas de objetos Python, con None en lugar de NaN/NA"""
+    for inicio in range(0, len(df), TAM_LOTE_ESCRITURA):
+        lote = df.iloc[inicio:inicio + TAM_LOTE_ESCRITURA].astype(object)
+        lote = lote.where(lote.notna(), None)
+        yield from lote.itertuples(index=False, name=None)
+
+
+def escribir_xlsx(hojas: dict, destino):
+    """Escribe las hojas con xlsxwriter en modo constant_memory (fila por fila)"""
+    import xlsxwriter
+
+    libro = xlsxwriter.Workbook(destino, {
+        'constant_memory': True,
+        'tmpdir': tempfile.gettempdir(),
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+        'default_date_format': 'dd/mm/yyyy',
+    })
+    formato_cabecera = libro.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    total = sum(len(df) for df in hojas.values()) or 1
+    escritas = 0
+    try:
+        for nombre, df in hojas.items():
+            for nombre_hoja, parte in _partes_hoja(nombre, df):
+                hoja = libro.add_worksheet(nombre_hoja)
+                hoja.write_row(0, 0, [str(c) for c in parte.columns], formato_cabecera)
+                for fila, valores in enumerate(_filas_para_escribir(parte), start=1):
+                    hoja.write_row(fila, 0, valores)
+                    if fila % TAM_LOTE_ESCRITURA == 0:
+                        informar_progreso((escritas + fila) / total)
+                escritas += len(parte)
+    finally:
+        libro.close()
+
+
+def escribir_zip(hojas: dict, destino, formato: str):
+    """Escribe un .zip con un archivo CSV o Parquet por hoja"""
+    fecha = datetime.now().timetuple()[:6]
+    total = sum(len(df) for df in hojas.values()) or 1
+    escritas = 0
+    with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for nombre, df in hojas.items():
+            info = zipfile.ZipInfo(f'{nombre}.{formato}', date_time=fecha)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with zf.open(info, 'w', force_zip64=True) as f:
+                if formato == 'csv':
+                    texto = io.TextIOWrapper(f, encoding='utf-8', newline='')
+                    df.to_csv(texto, index=False, chunksize=TAM_LOTE_ESCRITURA)
+                    texto.flush()
+                    texto.detach()
+                else:
+                    df.to_parquet(f, index=False)
+            escritas += len(df)
+            informar_progreso(escritas / total)
+
+
+def exportar_resultados(df_conceptos, df_netos, masterdata, formato: str = 'xlsx', destino=None,
+                        hojas_adicionales: dict = None):
+    """
+    Genera la salida consolidada en `formato` ('xlsx', 'csv' o 'parquet').
+    `masterdata` puede ser el DataFrame o un MasterdataIndexado ya calculado;
+    `hojas_adicionales` ({nombre: DataFrame}) se escriben después de las principales.
+    Escribe en `destino` (ruta u objeto archivo) o, si no se indica, en un archivo
+    temporal que pasa a disco al superar MAX_SPOOL_MEMORIA; en ese caso se devuelve
+    el archivo posicionado al inicio. Lanza ErrorExportacion si falla.
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ErrorExportacion(f"Formato de exportación no soportado: {formato}")
+
+    output = destino if destino is not None else tempfile.SpooledTemporaryFile(max_size=MAX_SPOOL_MEMORIA)
+    try:
+        hojas = preparar_hojas(df_conceptos, df_netos, masterdata)
+        hojas.update(hojas_adicionales or {})
+        with etapa(f'escritura_{formato}') as e:
+            if formato == 'xlsx':
+                escribir_xlsx(hojas, output)
+            else:
+                escribir_zip(hojas, output, formato)
+            e.filas(salida=sum(len(df) for df in hojas.values()))
+    except Exception as e:
+        if destino is None:
+            output.close()
+        raise ErrorExportacion(f"Error al crear archivo {formato}: {e}") from e
+
+    if hasattr(output, 'seek'):
+        output.seek(0)
+    return output
+
+def _borrar_archivo(ruta: Path):
+    try:
+        os.unlink(ruta)
+    except OSError:
+        pass
+
+
+class ArchivoExportado:
+    """
+    Exportación guardada en un archivo temporal en disco, no en memoria. Cada
+    lectura abre su propio manejador, así que se puede compartir entre sesiones;
+    el archivo se borra cuando el objeto deja de usarse.
+    """
+
+    def __init__(self, ruta, formato: str):
+        self.ruta = Path(ruta)
+        self.formato = formato
+        self._borrar = weakref.finalize(self, _borrar_archivo, self.ruta)
+
+    def __repr__(self):
+        return f"ArchivoExportado({self.formato}, {self.size:,} bytes)"
+
+    @property
+    def size(self) -> int:
+        return self.ruta.stat().st_size
+
+    def abrir(self):
+        """Objeto archivo binario para leer la exportación (cerrarlo al terminar)"""
+        return open(self.ruta, 'rb')
+
+    def leer(self) -> bytes:
+        return self.ruta.read_bytes()
+
+    def borrar(self):
+        self._borrar()
+
+
+def exportar_a_archivo(df_conceptos, df_netos, masterdata, formato: str = 'xlsx',
+                       hojas_adicionales: dict = None) -> ArchivoExportado:
+    """Como exportar_resultados, pero escribe en un archivo temporal en disco (ver ArchivoExportado)"""
+    with tempfile.NamedTemporaryFile(prefix='liquidacion_', suffix=f'.{EXTENSION_EXPORTACION.get(formato, formato)}',
+                                     delete=False) as f:
+        exportado = ArchivoExportado(f.name, formato)
+        try:
+            exportar_resultados(df_conceptos, df_netos, masterdata, formato, destino=f,
+                                hojas_adicionales=hojas_adicionales)
+        except Exception:
+            exportado.borrar()
+            raise
+    return exportado
+
+# -------------------------------
+# Exportación a Excel (con formateo de fechas)
+# -------------------------------
+def crear_excel_descarga(df_conceptos, df_netos, masterdata_df, destino=None):
+    """
+    Crea el Excel con las hojas 'Netos' y 'Preno_Convertida' (fechas dd/mm/yyyy).
+    Ver exportar_resultados para `destino` y el valor devuelto.
+    """
+    return exportar_resultados(df_conceptos, df_netos, masterdata_df, 'xlsx', destino)
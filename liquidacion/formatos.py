@@ -0,0 +1,14 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Formatos de exportación: extensión y tipo MIME de cada uno.
+#
+# Sin dependencias, para que la CLI arme sus opciones sin importar pandas (ver
+# cli.py); exportar.py los reexporta.
+
+FORMATOS_EXPORTACION = ('xlsx', 'csv', 'parquet')
+
+MIME_EXPORTACION = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'application/zip',
+    'parquet': 'application/zip',
+}
+EXTENSION_EXPORTACION = {'xlsx': 'xlsx', 'csv': 'zip', 'parquet': 'zip'}
@@ -0,0 +1,82 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Grafo de etapas: ejecuta a la vez las etapas que no dependen entre sí.
+#
+# Cada etapa declara de qué etapas depende y se lanza en un hilo apenas
+# terminan (hasta MAX_HILOS_ETAPAS a la vez), con el contexto de quien ejecuta
+# el grafo: sus etapas medidas y su avance quedan en la misma ejecución. Así la
+# lectura de MASTERDATA se solapa con el parsing de la liquidación y las hojas
+# del consolidado se arman a la vez; la latencia queda cerca de la rama más
+# larga y no de la suma. Corre en paralelo de verdad lo que espera a procesos
+# hijos, código nativo o disco; el Python puro se turna el GIL.
+
+import contextvars
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .rendimiento import perfilando
+
+# Hilos del grafo (por defecto, los núcleos hasta 4); 1 ejecuta las etapas una tras
+# otra en el hilo actual, lo mejor con un solo núcleo, donde solaparlas solo agrega
+# contención del GIL
+MAX_HILOS_ETAPAS = int(os.environ.get('LIQUIDACION_HILOS_ETAPAS', '0')) or min(os.cpu_count() or 1, 4)
+
+
+class GrafoEtapas:
+    """
+    Etapas con dependencias. `agregar(nombre, funcion, depende)` registra una
+    etapa; `funcion` recibe los resultados de sus dependencias, en ese orden, y
+    las dependencias deben estar agregadas antes (así el grafo no tiene ciclos).
+    """
+
+    def __init__(self, max_hilos: int = None):
+        self.max_hilos = max_hilos or MAX_HILOS_ETAPAS
+        self._etapas = {}
+
+    def agregar(self, nombre: str, funcion, depende=()):
+        if nombre in self._etapas:
+            raise ValueError(f"La etapa '{nombre}' ya está en el grafo")
+        faltantes = [d for d in depende if d not in self._etapas]
+        if faltantes:
+            raise ValueError(f"La etapa '{nombre}' depende de etapas no agregadas: {', '.join(faltantes)}")
+        self._etapas[nombre] = (funcion, tuple(depende))
+        return self
+
+    def ejecutar(self) -> dict:
+        """
+        Ejecuta las etapas y devuelve {nombre: resultado} en el orden en que se
+        agregaron. Si una falla no se lanzan más, se espera a las que están en
+        curso y se relanza el error de la primera fallida (en ese mismo orden).
+        Con un solo hilo, o si se está perfilando, corren en el hilo actual.
+        """
+        if self.max_hilos <= 1 or len(self._etapas) <= 1 or perfilando():
+            resultados = {}
+            for nombre, (funcion, depende) in self._etapas.items():
+                resultados[nombre] = funcion(*(resultados[d] for d in depende))
+            return resultados
+
+        resultados, errores = {}, {}
+        pendientes = dict(self._etapas)
+        en_curso = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_hilos, len(self._etapas)),
+                                thread_name_prefix='etapa') as pool:
+            while True:
+                if not errores:
+                    for nombre, (funcion, depende) in list(pendientes.items()):
+                        if all(d in resultados for d in depende):
+                            del pendientes[nombre]
+                            contexto = contextvars.copy_context()
+                            futuro = pool.submit(contexto.run, funcion, *(resultados[d] for d in depende))
+                            en_curso[futuro] = nombre
+                if not en_curso:
+                    break
+                listos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    nombre = en_curso.pop(futuro)
+                    try:
+                        resultados[nombre] = futuro.result()
+                    except Exception as e:
+                        errores[nombre] = e
+
+        if errores:
+            raise errores[next(n for n in self._etapas if n in errores)]
+        return {nombre: resultados[nombre] for nombre in self._etapas}
@@ -0,0 +1,366 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Histórico de liquidaciones por período en una base SQLite local (sin servidor).
+#
+# Cada procesamiento se puede agregar al histórico como una corrida (período +
+# huella del contenido). Se guardan los conceptos y netos parseados, indexados
+# por corrida y SAP y por CÓDIGO, y al registrar se agregan los conceptos por
+# CÓDIGO; las comparaciones entre períodos (netos que variaron, códigos nuevos o
+# faltantes, ingresos y retiros) consultan esos índices y no vuelven a parsear
+# los TXT de meses anteriores. Las corridas se identifican por su contenido, no
+# por el nombre del archivo: volver a registrar el mismo contenido en el mismo
+# período lo reemplaza, dos archivos distintos con el mismo nombre quedan como
+# dos corridas y una versión corregida reemplaza a la anterior solo si se pide.
+
+import hashlib
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+
+import pandas as pd
+
+from .combinacion import buscar_en_masterdata
+from .cubo import DIMENSIONES, SIN_DATO
+from .errores import ErrorHistorico
+from .rendimiento import etapa
+
+# Base del histórico
+RUTA_HISTORICO = Path(os.environ.get(
+    'LIQUIDACION_HISTORICO',
+    Path.home() / '.local' / 'share' / 'liquidacion' / 'historico.sqlite',
+))
+
+# Filas por executemany al registrar (acota la memoria de las tuplas intermedias)
+FILAS_POR_INSERCION = 50_000
+
+CAMBIO_NUEVO = 'nuevo'
+CAMBIO_FALTANTE = 'faltante'
+CAMBIO_INGRESO = 'ingreso'
+CAMBIO_RETIRO = 'retiro'
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS corridas (
+    id         INTEGER PRIMARY KEY,
+    periodo    TEXT NOT NULL,
+    archivo    TEXT NOT NULL,
+    huella     TEXT NOT NULL,
+    registrado TEXT NOT NULL,
+    conceptos  INTEGER NOT NULL,
+    netos      INTEGER NOT NULL,
+    empleados  INTEGER NOT NULL,
+    valor      REAL NOT NULL,
+    neto       REAL NOT NULL,
+    UNIQUE (periodo, huella)
+);
+CREATE TABLE IF NOT EXISTS conceptos (
+    corrida  INTEGER NOT NULL,
+    sap      INTEGER,
+    codigo   TEXT NOT NULL,
+    cantidad REAL NOT NULL,
+    valor    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS netos (
+    corrida  INTEGER NOT NULL,
+    sap      INTEGER,
+    regional TEXT NOT NULL,
+    valor    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS codigos_corrida (
+    corrida   INTEGER NOT NULL,
+    codigo    TEXT NOT NULL,
+    concepto  TEXT,
+    empleados INTEGER NOT NULL,
+    filas     INTEGER NOT NULL,
+    valor     REAL NOT NULL,
+    PRIMARY KEY (corrida, codigo)
+);
+CREATE INDEX IF NOT EXISTS conceptos_corrida_sap ON conceptos (corrida, sap);
+CREATE INDEX IF NOT EXISTS conceptos_codigo ON conceptos (codigo);
+CREATE INDEX IF NOT EXISTS netos_corrida_sap ON netos (corrida, sap);
+"""
+
+# Corridas de un período (parámetro: periodo)
+_CORRIDAS_PERIODO = 'SELECT id FROM corridas WHERE periodo = ?'
+
+
+def _valores(serie: pd.Series) -> list:
+    """Valores de Python para SQLite (los nulos como None)"""
+    return serie.to_numpy(dtype=object, na_value=None).tolist()
+
+
+def huella_corrida(conceptos: pd.DataFrame, netos: pd.DataFrame) -> str:
+    """SHA-256 de los conceptos y netos de una corrida (igual por ruta, subida o reproceso incremental)"""
+    h = hashlib.sha256()
+    for df, columnas in ((conceptos, ('SAP', 'CÓDIGO', 'CANTIDAD', 'VALOR')), (netos, ('SAP', 'Valor'))):
+        h.update(f'{len(df)}\n'.encode('utf-8'))
+        for columna in columnas:
+            if df.empty:
+                continue
+            serie = df[columna]
+            valores = (serie.astype(str).to_numpy(dtype=object) if columna == 'CÓDIGO'
+                       else serie.to_numpy(dtype='float64', na_value=float('nan')))
+            h.update(pd.util.hash_array(valores).tobytes())
+    return h.hexdigest()
+
+
+def _lotes(filas, tamano: int):
+    filas = iter(filas)
+    while lote := list(islice(filas, tamano)):
+        yield lote
+
+
+class HistoricoNomina:
+    """
+    Histórico en `ruta` (por defecto RUTA_HISTORICO). Cada operación abre su propia
+    conexión, así que se puede usar desde los hilos de los trabajos y de Streamlit.
+    """
+
+    def __init__(self, ruta=None):
+        self.ruta = Path(ruta or RUTA_HISTORICO)
+        self._creada = False
+
+    @contextmanager
+    def _conexion(self):
+        """Conexión con transacción: confirma al salir o revierte si hubo un error"""
+        try:
+            if not self._creada:
+                self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            conexion = sqlite3.connect(self.ruta, timeout=30)
+        except (OSError, sqlite3.Error) as e:
+            raise ErrorHistorico(f"No se pudo abrir el histórico {self.ruta}: {e}") from e
+        with closing(conexion):
+            try:
+                conexion.execute('PRAGMA synchronous=NORMAL')
+                if not self._creada:
+                    # WAL: las consultas de otras sesiones no esperan a un registro en curso
+                    conexion.execute('PRAGMA journal_mode=WAL')
+                    conexion.executescript(_ESQUEMA)
+                    self._creada = True
+                with conexion:
+                    yield conexion
+            except sqlite3.Error as e:
+                raise ErrorHistorico(f"Error en el histórico {self.ruta}: {e}") from e
+
+    # -------------------------------
+    # Registro
+    # -------------------------------
+    def registrar(self, df_conceptos: pd.DataFrame, df_netos: pd.DataFrame, masterdata=None,
+                  periodo: str = None, archivo: str = None, reemplazar: bool = False) -> pd.DataFrame:
+        """
+        Agrega un resultado al histórico. Si los DataFrames traen PERIODO y ARCHIVO
+        (procesar_lote) se registra cada archivo en su período (`periodo` solo para
+        los que no lo tienen); si no, todas las filas van a `periodo` y `archivo`.
+        Con `masterdata` (DataFrame o MasterdataIndexado) se guarda la regional de
+        cada neto. Una corrida con el mismo contenido en el período se reemplaza;
+        con `reemplazar` también las del mismo período y nombre de archivo (versión
+        corregida). Lanza ErrorHistorico si falta el período. Devuelve las corridas
+        registradas.
+        """
+        partes = self._particionar(df_conceptos, df_netos, periodo, archivo)
+        registrado = datetime.now().isoformat(timespec='seconds')
+        corridas = []
+        with etapa('historico') as e, self._conexion() as conexion:
+            for (periodo_parte, archivo_parte), (conceptos, netos) in partes.items():
+                corrida = {
+                    'periodo': periodo_parte, 'archivo': archivo_parte, 'huella': huella_corrida(conceptos, netos),
+                    'registrado': registrado, 'conceptos': len(conceptos), 'netos': len(netos),
+                    'empleados': int(netos['SAP'].nunique()) if not netos.empty else 0,
+                    'valor': float(conceptos['VALOR'].sum()) if not conceptos.empty else 0.0,
+                    'neto': float(netos['Valor'].sum()) if not netos.empty else 0.0,
+                }
+                self._eliminar_corridas(conexion, 'periodo = ? AND huella = ?', (periodo_parte, corrida['huella']))
+                if reemplazar:
+                    self._eliminar_corridas(conexion, 'periodo = ? AND archivo = ?', (periodo_parte, archivo_parte))
+                id_corrida = conexion.execute(
+                    f'INSERT INTO corridas ({", ".join(corrida)}) VALUES ({", ".join("?" * len(corrida))})',
+                    tuple(corrida.values())).lastrowid
+                self._insertar_conceptos(conexion, conceptos, id_corrida)
+                self._insertar_netos(conexion, netos, masterdata, id_corrida)
+                corridas.append(corrida)
+            e.filas(sum(len(df) for df in (df_conceptos, df_netos) if df is not None),
+                    sum(c['conceptos'] + c['netos'] for c in corridas))
+        return pd.DataFrame(corridas)
+
+    @staticmethod
+    def _particionar(df_conceptos, df_netos, periodo, archivo) -> dict:
+        """{(periodo, archivo): (conceptos, netos)} según las columnas PERIODO y ARCHIVO o los parámetros"""
+        df_conceptos = df_conceptos if df_conceptos is not None else pd.DataFrame()
+        df_netos = df_netos if df_netos is not None else pd.DataFrame()
+        datos = [df for df in (df_conceptos, df_netos) if not df.empty]
+        if datos and all('PERIODO' in df.columns and 'ARCHIVO' in df.columns for df in datos):
+            grupos = {}
+            for indice, df in enumerate((df_conceptos, df_netos)):
+                if df.empty:
+                    continue
+                periodos = df['PERIODO'].astype(object).fillna(periodo)
+                for clave, parte in df.groupby([periodos, df['ARCHIVO'].astype(object)], dropna=False, sort=False):
+                    grupos.setdefault(clave, [pd.DataFrame(), pd.DataFrame()])[indice] = parte
+        else:
+            grupos = {(periodo, archivo or 'liquidacion.txt'): [df_conceptos, df_netos]}
+
+        sin_periodo = sorted(str(a) for p, a in grupos if not isinstance(p, str) or not p)
+        if sin_periodo:
+            raise ErrorHistorico(f"Indica el período (AAAA-MM) de: {', '.join(sin_periodo)}")
+        return {clave: tuple(partes) for clave, partes in grupos.items()}
+
+    @staticmethod
+    def _insertar_conceptos(conexion, conceptos: pd.DataFrame, id_corrida: int):
+        if conceptos.empty:
+            return
+        por_codigo = conceptos.groupby('CÓDIGO', observed=True).agg(
+            CONCEPTO=('CONCEPTO', 'first'), EMPLEADOS=('SAP', 'nunique'),
+            FILAS=('VALOR', 'size'), VALOR=('VALOR', 'sum'))
+        conexion.executemany(
+            'INSERT INTO codigos_corrida (corrida, codigo, concepto, empleados, filas, valor) VALUES (?, ?, ?, ?, ?, ?)',
+            zip([id_corrida] * len(por_codigo), por_codigo.index.astype(str), _valores(por_codigo['CONCEPTO']),
+                por_codigo['EMPLEADOS'].tolist(), por_codigo['FILAS'].tolist(), por_codigo['VALOR'].tolist()))
+
+        filas = zip([id_corrida] * len(conceptos), _valores(conceptos['SAP']), _valores(conceptos['CÓDIGO']),
+                    conceptos['CANTIDAD'].tolist(), conceptos['VALOR'].tolist())
+        for lote in _lotes(filas, FILAS_POR_INSERCION):
+            conexion.executemany('INSERT INTO conceptos (corrida, sap, codigo, cantidad, valor) VALUES (?, ?, ?, ?, ?)',
+                                 lote)
+
+    @staticmethod
+    def _insertar_netos(conexion, netos: pd.DataFrame, masterdata, id_corrida: int):
+        if netos.empty:
+            return
+        regional = None
+        if masterdata is not None:
+            regional = buscar_en_masterdata(netos, masterdata).get(DIMENSIONES['REGIONAL'])
+        regional = (regional.astype(object).fillna(SIN_DATO).astype(str).tolist() if regional is not None
+                    else [SIN_DATO] * len(netos))
+        filas = zip([id_corrida] * len(netos), _valores(netos['SAP']), regional, netos['Valor'].tolist())
+        for lote in _lotes(filas, FILAS_POR_INSERCION):
+            conexion.executemany('INSERT INTO netos (corrida, sap, regional, valor) VALUES (?, ?, ?, ?)', lote)
+
+    @staticmethod
+    def _eliminar_corridas(conexion, condicion: str, parametros: tuple):
+        ids = [fila[0] for fila in conexion.execute(f'SELECT id FROM corridas WHERE {condicion}', parametros)]
+        for id_corrida in ids:
+            for tabla in ('conceptos', 'netos', 'codigos_corrida'):
+                conexion.execute(f'DELETE FROM {tabla} WHERE corrida = ?', (id_corrida,))
+            conexion.execute('DELETE FROM corridas WHERE id = ?', (id_corrida,))
+
+    def eliminar(self, periodo: str, archivo: str = None, huella: str = None):
+        """Borra un período completo, sus corridas con el nombre `archivo` o la de `huella`"""
+        condicion, parametros = 'periodo = ?', (periodo,)
+        if archivo is not None:
+            condicion, parametros = condicion + ' AND archivo = ?', parametros + (archivo,)
+        if huella is not None:
+            condicion, parametros = condicion + ' AND huella = ?', parametros + (huella,)
+        with self._conexion() as conexion:
+            self._eliminar_corridas(conexion, condicion, parametros)
+
+    # -------------------------------
+    # Consultas
+    # -------------------------------
+    def _consultar(self, sql: str, parametros=()) -> pd.DataFrame:
+        with self._conexion() as conexion:
+            return pd.read_sql_query(sql, conexion, params=parametros)
+
+    def corridas(self) -> pd.DataFrame:
+        """Archivos registrados por período, del más reciente al más antiguo"""
+        return self._consultar('SELECT periodo, archivo, registrado, conceptos, netos, empleados, valor, neto, '
+                               'huella FROM corridas ORDER BY periodo DESC, archivo')
+
+    def periodos(self) -> list:
+        """Períodos registrados, del más reciente al más antiguo"""
+        return self._consultar('SELECT DISTINCT periodo FROM corridas ORDER BY periodo DESC')['periodo'].tolist()
+
+    def _netos_por_sap(self, sql: str, periodo_base: str, periodo: str, *parametros) -> pd.DataFrame:
+        """Ejecuta `sql` con las CTE base y actual (SAP, REGIONAL y neto de cada período)"""
+        return self._consultar(f"""
+            WITH base AS (SELECT sap, MAX(regional) AS regional, SUM(valor) AS neto FROM netos
+                          WHERE corrida IN ({_CORRIDAS_PERIODO}) AND sap IS NOT NULL GROUP BY sap),
+                 actual AS (SELECT sap, MAX(regional) AS regional, SUM(valor) AS neto FROM netos
+                            WHERE corrida IN ({_CORRIDAS_PERIODO}) AND sap IS NOT NULL GROUP BY sap)
+            {sql}
+        """, (periodo_base, periodo) + parametros)
+
+    def variacion_netos(self, periodo_base: str, periodo: str, umbral_pct: float = 10.0) -> pd.DataFrame:
+        """
+        Empleados presentes en ambos períodos cuyo neto cambió más de `umbral_pct` %
+        respecto de `periodo_base` (con neto base 0, cualquier cambio), de mayor a
+        menor variación absoluta. VARIACION_PCT queda vacío si el neto base es 0.
+        """
+        return self._netos_por_sap("""
+            SELECT actual.sap AS SAP, actual.regional AS REGIONAL,
+                   base.neto AS NETO_ANTERIOR, actual.neto AS NETO,
+                   actual.neto - base.neto AS VARIACION,
+                   CASE WHEN base.neto <> 0 THEN (actual.neto - base.neto) * 100.0 / ABS(base.neto) END
+                       AS VARIACION_PCT
+            FROM actual JOIN base ON base.sap = actual.sap
+            WHERE ABS(actual.neto - base.neto) > ABS(base.neto) * ? / 100.0
+            ORDER BY ABS(actual.neto - base.neto) DESC
+        """, periodo_base, periodo, float(umbral_pct))
+
+    def variacion_empleados(self, periodo_base: str, periodo: str) -> pd.DataFrame:
+        """
+        Plantilla por regional en ambos períodos: EMPLEADOS_ANTERIOR, EMPLEADOS,
+        INGRESOS (SAP solo en `periodo`), RETIROS (solo en `periodo_base`) y
+        VARIACION. Cada SAP cuenta en su regional más reciente.
+        """
+        return self._netos_por_sap("""
+            , todos AS (SELECT actual.regional, base.sap IS NOT NULL AS en_base, 1 AS en_actual
+                        FROM actual LEFT JOIN base ON base.sap = actual.sap
+                        UNION ALL
+                        SELECT regional, 1, 0 FROM base WHERE sap NOT IN (SELECT sap FROM actual))
+            SELECT regional AS REGIONAL, SUM(en_base) AS EMPLEADOS_ANTERIOR, SUM(en_actual) AS EMPLEADOS,
+                   SUM(en_actual AND NOT en_base) AS INGRESOS, SUM(en_base AND NOT en_actual) AS RETIROS,
+                   SUM(en_actual) - SUM(en_base) AS VARIACION
+            FROM todos GROUP BY regional ORDER BY ABS(SUM(en_actual) - SUM(en_base)) DESC, regional
+        """, periodo_base, periodo)
+
+    def movimientos_empleados(self, periodo_base: str, periodo: str) -> pd.DataFrame:
+        """SAP que ingresaron (solo en `periodo`) o se retiraron (solo en `periodo_base`), con su neto"""
+        return self._netos_por_sap("""
+            SELECT sap AS SAP, regional AS REGIONAL, ? AS CAMBIO, neto AS NETO FROM actual
+            WHERE sap NOT IN (SELECT sap FROM base)
+            UNION ALL
+            SELECT sap, regional, ?, neto FROM base WHERE sap NOT IN (SELECT sap FROM actual)
+            ORDER BY CAMBIO, SAP
+        """, periodo_base, periodo, CAMBIO_INGRESO, CAMBIO_RETIRO)
+
+    def cambios_codigos(self, periodo_base: str, periodo: str) -> pd.DataFrame:
+        """
+        Códigos que aparecen en `periodo` y no en `periodo_base` (nuevo) o al revés
+        (faltante), con empleados, filas y valor del período en que están. Los
+        empleados se suman entre los archivos del período.
+        """
+        return self._consultar(f"""
+            WITH base AS (SELECT codigo, MAX(concepto) AS concepto, SUM(empleados) AS empleados,
+                                 SUM(filas) AS filas, SUM(valor) AS valor
+                          FROM codigos_corrida WHERE corrida IN ({_CORRIDAS_PERIODO}) GROUP BY codigo),
+                 actual AS (SELECT codigo, MAX(concepto) AS concepto, SUM(empleados) AS empleados,
+                                   SUM(filas) AS filas, SUM(valor) AS valor
+                            FROM codigos_corrida WHERE corrida IN ({_CORRIDAS_PERIODO}) GROUP BY codigo)
+            SELECT codigo AS "CÓDIGO", concepto AS CONCEPTO, ? AS CAMBIO, empleados AS EMPLEADOS,
+                   filas AS FILAS, valor AS VALOR
+            FROM actual WHERE codigo NOT IN (SELECT codigo FROM base)
+            UNION ALL
+            SELECT codigo, concepto, ?, empleados, filas, valor
+            FROM base WHERE codigo NOT IN (SELECT codigo FROM actual)
+            ORDER BY CAMBIO DESC, "CÓDIGO"
+        """, (periodo_base, periodo, CAMBIO_NUEVO, CAMBIO_FALTANTE))
+
+    def conceptos_empleado(self, sap: int, periodos=()) -> pd.DataFrame:
+        """Conceptos de un SAP por período (todos o los indicados), para revisar una variación"""
+        filtro = f" AND corridas.periodo IN ({', '.join('?' * len(periodos))})" if periodos else ''
+        return self._consultar(f"""
+            SELECT corridas.periodo AS PERIODO, conceptos.codigo AS "CÓDIGO", codigos_corrida.concepto AS CONCEPTO,
+                   SUM(conceptos.cantidad) AS CANTIDAD, SUM(conceptos.valor) AS VALOR
+            FROM corridas
+            JOIN conceptos ON conceptos.corrida = corridas.id AND conceptos.sap = ?
+            LEFT JOIN codigos_corrida ON codigos_corrida.corrida = corridas.id
+                                     AND codigos_corrida.codigo = conceptos.codigo
+            WHERE 1 = 1{filtro}
+            GROUP BY corridas.periodo, conceptos.codigo
+            ORDER BY corridas.periodo DESC, conceptos.codigo
+        """, (int(sap),) + tuple(periodos))
+
+
+# Histórico compartido del proceso (ruta con LIQUIDACION_HISTORICO)
+HISTORICO = HistoricoNomina()
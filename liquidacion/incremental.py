@@ -0,0 +1,345 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Reproceso incremental de versiones corregidas del mismo archivo de liquidación.
+#
+# Cada bloque 'Núm. Personal' (más el preámbulo antes de la primera cabecera)
+# se identifica por la huella de sus bytes. Del procesamiento anterior del mismo
+# archivo se guardan en disco las huellas y las filas parseadas de cada bloque;
+# en la versión siguiente solo se parsean los bloques nuevos o modificados y el
+# resto se toma de lo guardado. También se informa qué SAP se agregaron,
+# eliminaron o cambiaron.
+#
+# El "mismo archivo" es la misma ruta absoluta y el mismo período o, para los
+# archivos subidos, el mismo encabezado (el preámbulo, que trae compañía y
+# período); nunca el nombre del archivo. Aun así, el estado solo se usa si al
+# menos MIN_BLOQUES_COMUNES de los bloques nuevos ya estaban: un archivo sin
+# relación se parsea completo y no se compara. El estado guarda filas de nómina
+# en disco: se borra a los DIAS_ESTADOS días sin uso o con borrar_estados.
+
+import hashlib
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .paralelo import cabeceras_bloques, escanear_liquidacion_paralelo
+from .utilidades import concatenar
+
+logger = logging.getLogger(__name__)
+
+# Directorio del estado por archivo y cuántos conservar (los más antiguos se borran)
+DIR_INCREMENTAL = Path(os.environ.get(
+    'LIQUIDACION_INCREMENTAL',
+    Path.home() / '.cache' / 'liquidacion' / 'incremental',
+))
+MAX_ESTADOS = int(os.environ.get('LIQUIDACION_MAX_ESTADOS', '20'))
+# Días sin uso tras los que se borra un estado
+DIAS_ESTADOS = float(os.environ.get('LIQUIDACION_DIAS_ESTADOS', '35'))
+# Fracción de los bloques nuevos que debe estar en el estado para tratarlo como versión anterior
+MIN_BLOQUES_COMUNES = float(os.environ.get('LIQUIDACION_MIN_BLOQUES_COMUNES', '0.5'))
+# Bytes del inicio del archivo donde se buscan el encabezado y el período
+BYTES_ENCABEZADO = 64 * 1024
+
+# Formato del estado guardado; los de otra versión se descartan (se parsea todo)
+VERSION_ESTADO = '2'
+
+# Columnas internas del estado (ver escanear_liquidacion con bloques=True)
+COLUMNAS_ESTADO = ['BLOQUE', 'NO_CONVERTIDOS']
+
+CAMBIO_NUEVO = 'nuevo'
+CAMBIO_ELIMINADO = 'eliminado'
+CAMBIO_MODIFICADO = 'modificado'
+
+# -------------------------------
+# Bloques y huellas
+# -------------------------------
+@contextmanager
+def _abrir_datos(fuente):
+    """Bytes del archivo: mmap si es una ruta; si no, el contenido en memoria"""
+    if isinstance(fuente, os.PathLike):
+        with open(fuente, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b''
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+                yield datos
+        return
+    if isinstance(fuente, (bytes, bytearray)):
+        yield fuente
+    elif hasattr(fuente, 'getvalue'):
+        yield fuente.getvalue()
+    else:
+        fuente.seek(0)
+        yield fuente.read()
+
+
+def bloques_archivo(datos) -> pd.DataFrame:
+    """
+    Un registro por bloque, en orden: SAP de la cabecera (vacío en el preámbulo),
+    HUELLA (blake2b de sus bytes), INICIO y FIN en bytes.
+    """
+    cabeceras = cabeceras_bloques(datos)
+    inicios = [0] + [inicio for inicio, _ in cabeceras]
+    fines = inicios[1:] + [len(datos)]
+    return pd.DataFrame({
+        'SAP': [None] + [sap for _, sap in cabeceras],
+        'HUELLA': [hashlib.blake2b(datos[i:f], digest_size=16).hexdigest() for i, f in zip(inicios, fines)],
+        'INICIO': inicios,
+        'FIN': fines,
+    })
+
+
+def _inicio(fuente) -> bytes:
+    """Primeros BYTES_ENCABEZADO bytes del archivo"""
+    if isinstance(fuente, os.PathLike):
+        with open(fuente, 'rb') as f:
+            return f.read(BYTES_ENCABEZADO)
+    if isinstance(fuente, (bytes, bytearray)):
+        return bytes(fuente[:BYTES_ENCABEZADO])
+    if hasattr(fuente, 'getbuffer'):
+        with fuente.getbuffer() as buffer:
+            return bytes(buffer[:BYTES_ENCABEZADO])
+    fuente.seek(0)
+    inicio = fuente.read(BYTES_ENCABEZADO)
+    fuente.seek(0)
+    return inicio
+
+
+def clave_estado(fuente) -> str:
+    """
+    Clave del estado de un archivo: SHA-256 de su ruta absoluta y período o, si
+    no es una ruta, de su encabezado (lo anterior a la primera cabecera
+    'Núm. Personal'). None si no tiene encabezado que lo identifique.
+    """
+    from .lote import detectar_periodo
+
+    inicio = _inicio(fuente)
+    cabeceras = cabeceras_bloques(inicio)
+    encabezado = inicio[:cabeceras[0][0]] if cabeceras else b''
+    if isinstance(fuente, os.PathLike):
+        periodo = detectar_periodo(os.fspath(fuente), inicio.decode('latin-1').splitlines())
+        identidad = f'ruta\0{Path(fuente).resolve()}\0{periodo or ""}'.encode('utf-8')
+    elif encabezado.strip():
+        identidad = b'encabezado\0' + encabezado
+    else:
+        return None
+    return hashlib.sha256(identidad).hexdigest()
+
+
+def es_version_anterior(bloques_anteriores: pd.DataFrame, bloques: pd.DataFrame) -> bool:
+    """Si al menos MIN_BLOQUES_COMUNES de los bloques nuevos están sin cambios en el estado anterior"""
+    if bloques.empty:
+        return False
+    comunes = bloques['HUELLA'].isin(set(bloques_anteriores['HUELLA'])).sum()
+    return comunes >= MIN_BLOQUES_COMUNES * len(bloques)
+
+
+def diferencias_sap(bloques_anteriores: pd.DataFrame, bloques: pd.DataFrame) -> pd.DataFrame:
+    """SAP agregados, eliminados o modificados entre dos versiones (columnas SAP y CAMBIO)"""
+    def por_sap(df):
+        huellas = {}
+        for sap, huella in zip(df['SAP'].tolist(), df['HUELLA'].tolist()):
+            if isinstance(sap, str):
+                huellas.setdefault(sap, []).append(huella)
+        return huellas
+
+    antes, ahora = por_sap(bloques_anteriores), por_sap(bloques)
+    cambios = ([(sap, CAMBIO_NUEVO) for sap in ahora if sap not in antes]
+               + [(sap, CAMBIO_ELIMINADO) for sap in antes if sap not in ahora]
+               + [(sap, CAMBIO_MODIFICADO) for sap in ahora if sap in antes and antes[sap] != ahora[sap]])
+    cambios = pd.DataFrame(cambios, columns=['SAP', 'CAMBIO'])
+    cambios['SAP'] = pd.to_numeric(cambios['SAP'])
+    return cambios.sort_values('SAP', kind='stable', ignore_index=True)
+
+# -------------------------------
+# Reproceso
+# -------------------------------
+def _filas_reutilizadas(df_anterior: pd.DataFrame, pares) -> pd.DataFrame:
+    """
+    Filas de los bloques anteriores reutilizados, con BLOQUE renumerado a la versión
+    nueva. `pares` es [(bloque_nuevo, bloque_anterior)]; df_anterior está ordenado por BLOQUE.
+    """
+    if df_anterior.empty or not pares:
+        return df_anterior.iloc[0:0]
+    nuevos, anteriores = np.array(pares, dtype='int64').T
+    bloque = df_anterior['BLOQUE'].to_numpy()
+    inicio = np.searchsorted(bloque, anteriores, 'left')
+    largo = np.searchsorted(bloque, anteriores, 'right') - inicio
+    desplazamiento = np.cumsum(largo) - largo
+    posiciones = np.repeat(inicio - desplazamiento, largo) + np.arange(largo.sum())
+    filas = df_anterior.iloc[posiciones].copy()
+    filas['BLOQUE'] = np.repeat(nuevos, largo)
+    return filas
+
+
+def _unir(reutilizadas: pd.DataFrame, parseadas: pd.DataFrame) -> pd.DataFrame:
+    df = concatenar(df for df in (reutilizadas, parseadas) if not df.empty)
+    if df.empty:
+        return df
+    return df.sort_values('BLOQUE', kind='stable', ignore_index=True)
+
+
+def reprocesar_liquidacion(fuente, anterior=None, max_procesos: int = None):
+    """
+    Parsea la liquidación reutilizando los bloques sin cambios de `anterior`
+    (el estado devuelto por la corrida previa, o None para parsear todo). Un
+    estado que no es una versión anterior del archivo (ver es_version_anterior)
+    se ignora. Devuelve (df_conceptos, df_netos, estado, cambios); `cambios` es
+    None si no hay versión anterior (ver diferencias_sap).
+    """
+    with _abrir_datos(fuente) as datos:
+        bloques = bloques_archivo(datos)
+        if anterior is not None and not es_version_anterior(anterior[0], bloques):
+            anterior = None
+        if anterior is None:
+            cambios = None
+            pares = []
+            a_parsear = list(range(len(bloques)))
+            df_conceptos, df_netos = escanear_liquidacion_paralelo(
+                fuente if isinstance(fuente, os.PathLike) else bytes(datos), max_procesos, bloques=True)
+        else:
+            bloques_anteriores, conceptos_anteriores, netos_anteriores = anterior
+            cambios = diferencias_sap(bloques_anteriores, bloques)
+            indice_anterior = dict(zip(bloques_anteriores['HUELLA'][::-1], bloques_anteriores.index[::-1]))
+            origen = bloques['HUELLA'].map(indice_anterior)
+            pares = [(nuevo, int(viejo)) for nuevo, viejo in origen.dropna().items()]
+            a_parsear = origen.index[origen.isna()].tolist()
+
+            # Los bloques a parsear van juntos en un solo buffer; su numeración
+            # (0 = antes de la primera cabecera) se traduce a la del archivo completo
+            buffer = b''.join(datos[i:f] for i, f in bloques.loc[a_parsear, ['INICIO', 'FIN']].itertuples(index=False))
+            destinos = np.array(a_parsear if a_parsear[:1] == [0] else [-1] + a_parsear, dtype='int64')
+            parseados = escanear_liquidacion_paralelo(buffer, max_procesos, bloques=True) if buffer \
+                else (pd.DataFrame(), pd.DataFrame())
+            for df in parseados:
+                if not df.empty:
+                    df['BLOQUE'] = destinos[df['BLOQUE'].to_numpy()]
+
+            df_conceptos = _unir(_filas_reutilizadas(conceptos_anteriores, pares), parseados[0])
+            df_netos = _unir(_filas_reutilizadas(netos_anteriores, pares), parseados[1])
+
+    estado = (bloques[['SAP', 'HUELLA']], df_conceptos, df_netos)
+    resultado = []
+    for df in (df_conceptos, df_netos):
+        no_convertidos = int(df['NO_CONVERTIDOS'].sum()) if not df.empty else 0
+        df = df.drop(columns=COLUMNAS_ESTADO, errors='ignore')
+        df.attrs['importes_no_convertidos'] = no_convertidos
+        df.attrs['bloques_reprocesados'] = len(a_parsear)
+        df.attrs['bloques_totales'] = len(bloques)
+        resultado.append(df)
+    return resultado[0], resultado[1], estado, cambios
+
+# -------------------------------
+# Estado en disco (Parquet, uno por archivo; ver clave_estado)
+# -------------------------------
+def ruta_estado(clave: str, directorio: Path = None) -> Path:
+    return Path(directorio or DIR_INCREMENTAL) / clave
+
+
+def _texto_como_objeto(df: pd.DataFrame) -> pd.DataFrame:
+    """Las columnas de texto vuelven de Parquet como 'str'; el parser las produce como object"""
+    texto = [c for c in df.columns if isinstance(df[c].dtype, pd.StringDtype)]
+    return df.astype({c: object for c in texto}) if texto else df
+
+
+def leer_estado(clave: str, directorio: Path = None):
+    """Estado guardado con `clave`, o None si no existe o no se puede leer"""
+    ruta = ruta_estado(clave, directorio)
+    if not ruta.is_dir():
+        return None
+    try:
+        if (ruta / 'version').read_text().strip() != VERSION_ESTADO:
+            return None
+    except OSError:
+        return None
+    try:
+        estado = tuple(_texto_como_objeto(pd.read_parquet(ruta / f'{parte}.parquet'))
+                       for parte in ('bloques', 'conceptos', 'netos'))
+    except Exception as e:
+        logger.warning("No se pudo leer el estado incremental %s: %s", clave, e)
+        return None
+    os.utime(ruta)
+    return estado
+
+
+def guardar_estado(clave: str, estado, directorio: Path = None) -> bool:
+    """
+    Guarda el estado como tres archivos Parquet en un directorio por clave. El
+    directorio se reemplaza completo, para no mezclar versiones.
+    """
+    ruta = ruta_estado(clave, directorio)
+    sufijo = f'{os.getpid()}-{threading.get_ident()}'
+    temporal = ruta.with_name(f'{ruta.name}.{sufijo}.tmp')
+    viejo = ruta.with_name(f'{ruta.name}.{sufijo}.old')
+    try:
+        temporal.mkdir(parents=True, exist_ok=True)
+        for parte, df in zip(('bloques', 'conceptos', 'netos'), estado):
+            df.to_parquet(temporal / f'{parte}.parquet', index=False)
+        (temporal / 'version').write_text(VERSION_ESTADO)
+        if ruta.exists():
+            os.replace(ruta, viejo)
+        os.replace(temporal, ruta)
+    except Exception as e:
+        logger.warning("No se pudo guardar el estado incremental %s: %s", clave, e)
+        shutil.rmtree(temporal, ignore_errors=True)
+        return False
+    finally:
+        shutil.rmtree(viejo, ignore_errors=True)
+    _limpiar_estados(ruta.parent)
+    return True
+
+
+def _limpiar_estados(directorio: Path):
+    """Conserva solo los MAX_ESTADOS usados más recientemente y borra los de más de DIAS_ESTADOS días sin uso"""
+    estados = sorted((p for p in directorio.iterdir() if p.is_dir() and not p.name.endswith(('.tmp', '.old'))),
+                     key=lambda p: p.stat().st_mtime, reverse=True)
+    limite = time.time() - DIAS_ESTADOS * 86400
+    for i, estado in enumerate(estados):
+        if i >= MAX_ESTADOS or estado.stat().st_mtime < limite:
+            shutil.rmtree(estado, ignore_errors=True)
+
+
+def borrar_estados(directorio: Path = None) -> int:
+    """Borra todo el estado incremental guardado; devuelve cuántos estados había"""
+    directorio = Path(directorio or DIR_INCREMENTAL)
+    if not directorio.is_dir():
+        return 0
+    estados = [p for p in directorio.iterdir() if p.is_dir() and not p.name.endswith(('.tmp', '.old'))]
+    shutil.rmtree(directorio, ignore_errors=True)
+    return len(estados)
+
+
+def cargar_liquidacion_incremental(fuente, max_procesos: int = None, directorio: Path = None):
+    """
+    Parsea la liquidación reutilizando el estado guardado de su versión anterior
+    (ver clave_estado y es_version_anterior) y guarda el nuevo. En
+    df_conceptos.attrs['cambios_sap'] queda diferencias_sap como
+    {'SAP': [...], 'CAMBIO': [...]} (None si no hay versión anterior). Sin clave
+    (archivo sin encabezado) se parsea completo y no se guarda nada.
+    Devuelve (df_conceptos, df_netos).
+    """
+    clave = clave_estado(fuente)
+    if clave is None:
+        df_conceptos, df_netos, _, _ = reprocesar_liquidacion(fuente, None, max_procesos)
+        df_conceptos.attrs['cambios_sap'] = None
+        return df_conceptos, df_netos
+    if os.path.isdir(directorio or DIR_INCREMENTAL):
+        _limpiar_estados(Path(directorio or DIR_INCREMENTAL))
+    anterior = leer_estado(clave, directorio)
+    try:
+        df_conceptos, df_netos, estado, cambios = reprocesar_liquidacion(fuente, anterior, max_procesos)
+    except Exception:
+        if anterior is None:
+            raise
+        # Un estado incompatible no debe impedir el procesamiento
+        logger.warning("Estado incremental %s descartado; se parsea el archivo completo", clave)
+        df_conceptos, df_netos, estado, cambios = reprocesar_liquidacion(fuente, None, max_procesos)
+    guardar_estado(clave, estado, directorio)
+    df_conceptos.attrs['cambios_sap'] = cambios.to_dict('list') if cambios is not None else None
+    return df_conceptos, df_netos
@@ -0,0 +1,234 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Procesamiento por lotes: muchos archivos de liquidación (uno por compañía,
+# grupo de pago y período) contra un único MASTERDATA.
+#
+# Con varios procesos (y un lote de al menos MIN_BYTES_PARALELO) cada archivo
+# se parsea en un proceso del pool; mientras tanto el proceso principal lee
+# MASTERDATA una sola vez. Las filas quedan marcadas con el archivo de origen y
+# el período, y se arma un resumen por archivo.
+
+import hashlib
+import os
+import re
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+from pathlib import Path
+
+import pandas as pd
+
+from .comprimidos import EXTENSIONES_COMPRIMIDAS, ArchivoComprimido, expandir_comprimido
+from .errores import ErrorArchivoLiquidacion
+from .paralelo import MIN_BYTES_PARALELO, contexto_procesos
+from .parser import _tamano_fuente, escanear_liquidacion, iterar_lineas
+from .proceso import cargar_masterdata
+from .rendimiento import etapa, informar_progreso, seguir_progreso
+from .utilidades import concatenar
+
+# Líneas del inicio del archivo donde se busca el período
+LINEAS_BUSQUEDA_PERIODO = 200
+
+# Período en el nombre del archivo: 2025-01, 2025_01, 202501, 01-2025
+_PERIODO_NOMBRE = [
+    (re.compile(r'(?<!\d)(20\d{2})[-_.]?(0[1-9]|1[0-2])(?!\d)'), lambda m: f'{m[1]}-{m[2]}'),
+    (re.compile(r'(?<!\d)(0[1-9]|1[0-2])[-_.](20\d{2})(?!\d)'), lambda m: f'{m[2]}-{m[1]}'),
+]
+# Período en el texto del recibo: 'Período ... 01.01.2025' o 'Periodo 01/2025'
+_PERIODO_TEXTO = re.compile(
+    r'Per[ií]odo\D{0,40}?(?:\d{1,2}[./-])?(0?[1-9]|1[0-2])[./-](20\d{2})', re.IGNORECASE)
+
+
+def detectar_periodo(nombre: str, lineas_iniciales=()) -> str:
+    """
+    Período 'AAAA-MM' del archivo: primero se busca en el nombre y, si no está,
+    en la primera línea 'Período' del recibo. Devuelve None si no se encuentra.
+    """
+    base = Path(nombre).name
+    for patron, formato in _PERIODO_NOMBRE:
+        m = patron.search(base)
+        if m:
+            return formato(m)
+    for linea in lineas_iniciales:
+        m = _PERIODO_TEXTO.search(linea)
+        if m:
+            return f'{m[2]}-{int(m[1]):02d}'
+    return None
+
+
+def periodo_archivo(nombre: str, fuente) -> str:
+    """Período del archivo (ver detectar_periodo), leyendo solo sus primeras líneas"""
+    with closing(iterar_lineas(fuente)) as lineas:
+        return detectar_periodo(nombre, islice(lineas, LINEAS_BUSQUEDA_PERIODO))
+
+
+def _nombre_fuente(fuente) -> str:
+    if isinstance(fuente, (str, os.PathLike)):
+        return Path(fuente).name
+    return getattr(fuente, 'name', 'liquidacion.txt')
+
+
+def _fuente_para_proceso(fuente):
+    """Las rutas y los comprimidos viajan tal cual al proceso hijo; los archivos subidos, como bytes"""
+    if isinstance(fuente, (str, os.PathLike)):
+        return Path(fuente)
+    if isinstance(fuente, ArchivoComprimido):
+        return fuente
+    if hasattr(fuente, 'getvalue'):
+        return fuente.getvalue()
+    fuente.seek(0)
+    return fuente.read()
+
+
+def parsear_archivo_lote(nombre: str, fuente):
+    """
+    Parsea un archivo del lote (se ejecuta en un proceso hijo).
+    Devuelve (df_conceptos, df_netos, fila_resumen); los errores quedan en el resumen.
+    """
+    resumen = {'ARCHIVO': nombre, 'PERIODO': None}
+    try:
+        periodo = resumen['PERIODO'] = periodo_archivo(nombre, fuente)
+        df_conceptos, df_netos = escanear_liquidacion(fuente)
+    except Exception as e:
+        resumen['ERROR'] = str(e)
+        return pd.DataFrame(), pd.DataFrame(), resumen
+
+    for df in (df_conceptos, df_netos):
+        if not df.empty:
+            df['ARCHIVO'] = pd.Series(nombre, index=df.index, dtype='category')
+            df['PERIODO'] = pd.Series(periodo, index=df.index, dtype='category')
+
+    resumen.update({
+        'CONCEPTOS': len(df_conceptos),
+        'NETOS': len(df_netos),
+        'EMPLEADOS': int(df_netos['SAP'].nunique()) if not df_netos.empty else 0,
+        'VALOR_CONCEPTOS': float(df_conceptos['VALOR'].sum()) if not df_conceptos.empty else 0.0,
+        'NETO_TOTAL': float(df_netos['Valor'].sum()) if not df_netos.empty else 0.0,
+        'IMPORTES_NO_CONVERTIDOS': (df_conceptos.attrs.get('importes_no_convertidos', 0)
+                                    + df_netos.attrs.get('importes_no_convertidos', 0)),
+        'ERROR': None if not (df_conceptos.empty and df_netos.empty)
+                 else "No se pudieron extraer datos del archivo de liquidación.",
+    })
+    return df_conceptos, df_netos, resumen
+
+
+def huella_lote(huellas_archivos) -> str:
+    """Huella de un lote: SHA-256 de las huellas (nombre + contenido) de sus archivos, en orden"""
+    h = hashlib.sha256()
+    for nombre, huella in huellas_archivos:
+        h.update(f'{nombre}\0{huella}\n'.encode('utf-8'))
+    return h.hexdigest()
+
+
+def _ejecutar_lote(archivos, max_procesos: int = None, mientras=None):
+    """
+    Parsea los archivos en un pool de procesos (hasta max_procesos; por defecto,
+    1: en el proceso actual). El pool solo se usa si el lote suma al menos
+    MIN_BYTES_PARALELO (los tamaños que no se conocen no cuentan). Si se indica,
+    `mientras()` corre en el proceso principal en paralelo con el pool. Devuelve
+    (resultados_por_archivo, valor_de_mientras).
+    """
+    nombres = [_nombre_fuente(f) for f in archivos]
+    max_procesos = min(max_procesos or 1, len(archivos)) or 1
+    if sum(_tamano_fuente(f) or 0 for f in archivos) < MIN_BYTES_PARALELO:
+        max_procesos = 1
+
+    def avance(listos, resultados):
+        # Por archivo terminado; los empleados son las filas de netos
+        informar_progreso(listos / len(archivos), empleados=sum(len(r[1]) for r in resultados))
+
+    if max_procesos == 1:
+        valor = mientras() if mientras else None
+        resultados = []
+        for n, f in zip(nombres, archivos):
+            with seguir_progreso(None):
+                resultados.append(parsear_archivo_lote(n, f))
+            avance(len(resultados), resultados)
+        return resultados, valor
+
+    fuentes = [_fuente_para_proceso(f) for f in archivos]
+    with ProcessPoolExecutor(max_workers=max_procesos, mp_context=contexto_procesos()) as pool:
+        futuros = [pool.submit(parsear_archivo_lote, n, f) for n, f in zip(nombres, fuentes)]
+        valor = mientras() if mientras else None
+        for listos, _ in enumerate(as_completed(futuros), start=1):
+            avance(listos, [f.result() for f in futuros if f.done()])
+        return [f.result() for f in futuros], valor
+
+
+def parsear_lote(archivos_liquidacion, max_procesos: int = None):
+    """
+    Parsea varios archivos de liquidación (en paralelo con `max_procesos`, ver _ejecutar_lote).
+    Devuelve (df_conceptos, df_netos, resumen_df) con las columnas ARCHIVO y PERIODO.
+    """
+    resultados, _ = _ejecutar_lote(list(archivos_liquidacion), max_procesos)
+    return _unir_resultados(resultados)
+
+
+def _unir_resultados(resultados):
+    conceptos = [c for c, _, _ in resultados if not c.empty]
+    netos = [n for _, n, _ in resultados if not n.empty]
+    resumen_df = pd.DataFrame([r for _, _, r in resultados])
+
+    if not conceptos and not netos:
+        errores = '; '.join(f"{r['ARCHIVO']}: {r.get('ERROR')}" for _, _, r in resultados)
+        raise ErrorArchivoLiquidacion(f"No se pudieron extraer datos de ningún archivo del lote. {errores}")
+
+    df_conceptos = concatenar(conceptos)
+    df_netos = concatenar(netos)
+    df_conceptos.attrs['importes_no_convertidos'] = sum(c.attrs.get('importes_no_convertidos', 0) for c in conceptos)
+    df_netos.attrs['importes_no_convertidos'] = sum(n.attrs.get('importes_no_convertidos', 0) for n in netos)
+    return df_conceptos, df_netos, resumen_df
+
+
+def procesar_lote(archivos_liquidacion, archivo_masterdata, cache=None, huellas=(None, None),
+                  snapshots: bool = True, max_procesos: int = None):
+    """
+    Procesa un lote de archivos de liquidación contra un solo MASTERDATA.
+    Con `max_procesos` los archivos se parsean en un pool de procesos mientras
+    MASTERDATA se lee en el proceso principal (ver _ejecutar_lote). Con `cache`, `huellas` = (huella_lote, huella_masterdata)
+    identifica el resultado.
+    Devuelve (df_conceptos, df_netos, masterdata_df, resumen_df).
+    """
+    huella_liq, huella_md = huellas
+
+    def leer_masterdata():
+        return cargar_masterdata(archivo_masterdata, cache, huella_md, snapshots)
+
+    clave = ('lote', huella_liq) if cache is not None and huella_liq else None
+    resultado = cache.obtener(clave) if clave else None
+    if resultado is None:
+        # MASTERDATA se lee mientras los procesos hijos parsean
+        with etapa('lote') as e:
+            archivos_liquidacion = list(archivos_liquidacion)
+            resultados, masterdata_df = _ejecutar_lote(archivos_liquidacion, max_procesos, leer_masterdata)
+            resultado = _unir_resultados(resultados)
+            e.filas(len(archivos_liquidacion), len(resultado[0]) + len(resultado[1]))
+        if clave:
+            cache.guardar(clave, resultado)
+    else:
+        masterdata_df = leer_masterdata()
+
+    df_conceptos, df_netos, resumen_df = resultado
+    return df_conceptos, df_netos, masterdata_df, resumen_df
+
+
+def listar_archivos_liquidacion(rutas, extensiones=('.txt',), omitidos: list = None):
+    """
+    Expande directorios a sus archivos de liquidación (ordenados por nombre) y los
+    comprimidos a los archivos que contienen (ver expandir_comprimido). Un
+    comprimido encontrado en un directorio que no trae archivos de liquidación
+    (p. ej. una exportación CSV anterior) se omite y se agrega a `omitidos` como
+    (nombre, motivo); uno indicado explícitamente lanza ErrorArchivoLiquidacion.
+    """
+    archivos = []
+    for ruta in map(Path, rutas):
+        if not ruta.is_dir():
+            archivos.extend(expandir_comprimido(ruta, extensiones))
+            continue
+        for p in sorted(p for p in ruta.iterdir()
+                        if p.is_file() and p.name.lower().endswith(extensiones + EXTENSIONES_COMPRIMIDAS)):
+            try:
+                archivos.extend(expandir_comprimido(p, extensiones))
+            except ErrorArchivoLiquidacion as e:
+                if omitidos is not None:
+                    omitidos.append((p.name, str(e)))
+    return archivos
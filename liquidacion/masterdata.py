@@ -0,0 +1,333 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Lectura de MASTERDATA (CSV, xlsx/xls/xlsm o xlsb, también dentro de un .gz,
+# .zip o .zst). Los motores de Excel (python-calamine, openpyxl, xlrd, pyxlsb)
+# se importan solo cuando se usan.
+#
+# Los extractos de RR. HH. traen más de cien columnas y el procesamiento usa
+# nueve. Se lee primero la fila de encabezados, se eligen las columnas
+# necesarias (ver columna_necesaria) y de cada fila se conservan solo esas. Con
+# python-calamine instalado el Excel se lee con calamine (Rust); si no, el xlsx
+# se recorre en modo solo lectura de openpyxl. Los tipos se infieren igual que
+# en pd.read_excel.
+#
+# Como MASTERDATA casi no cambia durante un ciclo de nómina, cada archivo leído
+# se guarda como snapshot columnar (Parquet) en disco, identificado por la
+# huella SHA-256 del contenido; las siguientes cargas leen el snapshot.
+
+import importlib.util
+import io
+import logging
+import os
+import threading
+from contextlib import ExitStack
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from .comprimidos import expandir_comprimido, formato_compresion
+from .errores import ErrorMasterdata
+from .utilidades import detectar_columna_salario
+
+logger = logging.getLogger(__name__)
+
+COLUMNA_LLAVE = 'Nº pers.'
+# Columnas de MASTERDATA que usan las hojas de salida (además de la llave y el salario)
+COLUMNAS_MASTERDATA = [
+    'Número ID', 'Número de personal', 'División de personal', 'Ce.coste',
+    'Fecha', 'Función', 'Área de personal',
+]
+EXTENSIONES_MASTERDATA = ('.csv', '.xlsb', '.xlsx', '.xls', '.xlsm')
+
+# Con python-calamine instalado se usa para el Excel (el más rápido, pero carga la
+# hoja completa en memoria nativa); LIQUIDACION_CALAMINE=0 lo desactiva y se lee fila por fila
+USAR_CALAMINE = os.environ.get('LIQUIDACION_CALAMINE', '1') != '0'
+
+# Valores de error de Excel: se leen como vacíos, igual que pd.read_excel
+ERRORES_EXCEL = frozenset({'#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A'})
+
+# Directorio de snapshots y cuántos conservar (los más antiguos se borran)
+DIR_SNAPSHOTS = Path(os.environ.get(
+    'LIQUIDACION_SNAPSHOTS',
+    Path.home() / '.cache' / 'liquidacion' / 'masterdata',
+))
+MAX_SNAPSHOTS = int(os.environ.get('LIQUIDACION_MAX_SNAPSHOTS', '20'))
+
+# Estado de la última carga, expuesto en masterdata_df.attrs['snapshot']
+SNAPSHOT_ACIERTO = 'acierto'
+SNAPSHOT_FALLO = 'fallo'
+SNAPSHOT_DESACTIVADO = 'desactivado'
+
+
+def _nombre_archivo(fuente, nombre=None) -> str:
+    """Nombre usado para detectar el formato: explícito, atributo .name o la ruta"""
+    if nombre:
+        return str(nombre)
+    if isinstance(fuente, (str, os.PathLike)):
+        return os.fspath(fuente)
+    return getattr(fuente, 'name', '')
+
+
+def limpiar_masterdata(masterdata_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Limpia los nombres de columna y tipa la llave 'Nº pers.' como entero
+    nullable (Int64). Lanza ErrorMasterdata si la llave no existe.
+    """
+    masterdata_df.columns = masterdata_df.columns.astype(str).str.strip()
+
+    if COLUMNA_LLAVE not in masterdata_df.columns:
+        raise ErrorMasterdata(f"No se encontró la columna '{COLUMNA_LLAVE}' en MASTERDATA",
+                              columnas=masterdata_df.columns)
+
+    llave = pd.to_numeric(masterdata_df[COLUMNA_LLAVE], errors='coerce')
+    masterdata_df[COLUMNA_LLAVE] = llave.round().astype('Int64')
+    return masterdata_df
+
+
+# -------------------------------
+# Lectura proyectada
+# -------------------------------
+def columna_necesaria(nombre) -> bool:
+    """
+    Si la columna se usa en el procesamiento: 'Nº pers.', COLUMNAS_MASTERDATA o
+    una candidata a salario (ver detectar_columna_salario; se conservan todas las
+    candidatas y la elección queda para indexar_masterdata).
+    """
+    nombre = str(nombre).strip()
+    return nombre == COLUMNA_LLAVE or nombre in COLUMNAS_MASTERDATA or detectar_columna_salario([nombre]) is not None
+
+
+def validar_encabezado(encabezado):
+    """
+    Lanza ErrorMasterdata si el encabezado completo (antes de proyectar las
+    columnas) no trae 'Nº pers.'; el error lista todas sus columnas.
+    """
+    columnas = list(dict.fromkeys(str(nombre).strip() for nombre in encabezado if nombre is not None))
+    if COLUMNA_LLAVE not in columnas:
+        raise ErrorMasterdata(f"No se encontró la columna '{COLUMNA_LLAVE}' en MASTERDATA", columnas=columnas)
+
+
+def _proyeccion(encabezado: list):
+    """usecols para pandas: proyecta con columna_necesaria y anota cada columna del archivo en `encabezado`"""
+    def usar(nombre):
+        encabezado.append(nombre)
+        return columna_necesaria(nombre)
+    return usar
+
+
+def motores_excel(nombre: str) -> list:
+    """
+    Motores a intentar para el Excel, en orden: calamine (si está instalado y
+    activado), el del formato y, para xlsx/xls, el otro (la extensión no siempre
+    coincide con el contenido).
+    """
+    if nombre.endswith('.xlsb'):
+        motores = ['pyxlsb']
+    elif nombre.endswith('.xls'):
+        motores = ['xlrd', 'openpyxl']
+    else:
+        motores = ['openpyxl', 'xlrd']
+    if USAR_CALAMINE and importlib.util.find_spec('python_calamine') is not None:
+        motores.insert(0, 'calamine')
+    return motores
+
+
+def _valor_celda(valor):
+    """Celda como la entrega pd.read_excel: vacío '', enteros sin decimales y fechas como datetime"""
+    if valor is None:
+        return ''
+    if isinstance(valor, float):
+        return int(valor) if valor.is_integer() else valor
+    if isinstance(valor, str):
+        return '' if valor in ERRORES_EXCEL else valor
+    if type(valor) is date:
+        return datetime(valor.year, valor.month, valor.day)
+    return valor
+
+
+def _filas_excel(fuente, motor: str):
+    """Filas de la primera hoja como listas de valores, sin convertir"""
+    if motor == 'calamine':
+        from python_calamine import CalamineWorkbook
+        if isinstance(fuente, (str, os.PathLike)):
+            libro = CalamineWorkbook.from_path(os.fspath(fuente))
+        else:
+            libro = CalamineWorkbook.from_filelike(fuente)
+        yield from libro.get_sheet_by_index(0).iter_rows()
+    elif motor == 'pyxlsb':
+        from pyxlsb import open_workbook
+        with open_workbook(fuente) as libro, libro.get_sheet(1) as hoja:
+            for fila in hoja.rows():
+                yield [celda.v for celda in fila]
+    else:
+        import openpyxl
+        with ExitStack() as pila:
+            if isinstance(fuente, (str, os.PathLike)):
+                # Abierto aquí: con la ruta, openpyxl rechaza un xlsx guardado como .xls
+                fuente = pila.enter_context(open(fuente, 'rb'))
+            libro = openpyxl.load_workbook(fuente, read_only=True, data_only=True, keep_links=False)
+            pila.callback(libro.close)
+            hoja = libro.worksheets[0]
+            hoja.reset_dimensions()
+            yield from hoja.iter_rows(values_only=True)
+
+
+def leer_excel_proyectado(fuente, motor: str) -> pd.DataFrame:
+    """
+    Primera hoja del Excel con solo las columnas necesarias (ver columna_necesaria):
+    los encabezados se leen primero, se valida la llave (ver validar_encabezado) y
+    de cada fila se toman esas posiciones. Con xlrd (.xls, que se carga completo de
+    todos modos) se usa pd.read_excel con usecols.
+    """
+    if motor == 'xlrd':
+        encabezado = []
+        masterdata_df = pd.read_excel(fuente, engine='xlrd', usecols=_proyeccion(encabezado))
+        validar_encabezado(encabezado)
+        return masterdata_df
+    filas = _filas_excel(fuente, motor)
+    encabezado = next(filas, None)
+    if encabezado is None:
+        return pd.DataFrame()
+    validar_encabezado(encabezado)
+    posiciones = [i for i, nombre in enumerate(encabezado) if nombre is not None and columna_necesaria(nombre)]
+    datos = [[_valor_celda(encabezado[i]) for i in posiciones]]
+    for fila in filas:
+        largo = len(fila)
+        datos.append([_valor_celda(fila[i]) if i < largo else '' for i in posiciones])
+    # Filas vacías al final (formato sin datos): pd.read_excel también las descarta
+    while len(datos) > 1 and not any(v != '' for v in datos[-1]):
+        datos.pop()
+    return TextParser(datos, header=0).read()
+
+
+def leer_masterdata(fuente, nombre: str = None) -> pd.DataFrame:
+    """
+    Lee MASTERDATA según la extensión del archivo, solo con las columnas
+    necesarias (ver columna_necesaria), y lo limpia (ver limpiar_masterdata).
+    `fuente` puede ser una ruta o un objeto archivo (p. ej. el archivo subido).
+    En masterdata_df.attrs['motor'] queda el lector usado.
+    Si está comprimido se lee el primer archivo de MASTERDATA que contiene: el CSV
+    en streaming y el Excel descomprimido en memoria (sus lectores necesitan
+    acceso aleatorio). Lanza ErrorMasterdata si no se puede leer o no existe la
+    columna 'Nº pers.' (con todas las columnas del archivo en `columnas`).
+    """
+    archivo_nombre = _nombre_archivo(fuente, nombre).lower()
+    if formato_compresion(archivo_nombre):
+        try:
+            interno = expandir_comprimido(fuente, EXTENSIONES_MASTERDATA, archivo_nombre)[0]
+            with interno.abrir() as archivo:
+                if interno.name.lower().endswith('.csv'):
+                    return leer_masterdata(archivo, interno.name)
+                return leer_masterdata(io.BytesIO(archivo.read()), interno.name)
+        except ErrorMasterdata:
+            raise
+        except Exception as e:
+            raise ErrorMasterdata(f"Error al leer MASTERDATA: {e}") from e
+
+    try:
+        if archivo_nombre.endswith('.csv'):
+            motor = 'csv'
+            encabezado = []
+            masterdata_df = pd.read_csv(fuente, encoding='utf-8', usecols=_proyeccion(encabezado))
+            validar_encabezado(encabezado)
+        elif archivo_nombre.endswith(('.xlsb', '.xlsx', '.xls', '.xlsm')):
+            primer_error = None
+            for motor in motores_excel(archivo_nombre):
+                try:
+                    masterdata_df = leer_excel_proyectado(fuente, motor)
+                    break
+                except ErrorMasterdata:
+                    raise
+                except Exception as e:
+                    primer_error = primer_error or e
+                    if hasattr(fuente, 'seek'):
+                        fuente.seek(0)
+            else:
+                # El error del primer motor es el que describe el archivo
+                raise primer_error
+        else:
+            motor = 'pandas'
+            encabezado = []
+            masterdata_df = pd.read_excel(fuente, usecols=_proyeccion(encabezado))
+            validar_encabezado(encabezado)
+    except ErrorMasterdata:
+        raise
+    except Exception as e:
+        raise ErrorMasterdata(f"Error al leer MASTERDATA: {e}") from e
+
+    masterdata_df = limpiar_masterdata(masterdata_df)
+    masterdata_df.attrs['motor'] = motor
+    return masterdata_df
+
+
+# -------------------------------
+# Snapshots columnares en disco
+# -------------------------------
+def ruta_snapshot(huella: str, directorio: Path = None) -> Path:
+    return Path(directorio or DIR_SNAPSHOTS) / f'{huella}.parquet'
+
+
+def leer_snapshot(huella: str, directorio: Path = None):
+    """Devuelve el MASTERDATA del snapshot o None si no existe o no se puede leer"""
+    ruta = ruta_snapshot(huella, directorio)
+    if not ruta.exists():
+        return None
+    try:
+        masterdata_df = pd.read_parquet(ruta)
+    except Exception as e:  # pyarrow ausente o archivo dañado: se trata como fallo
+        logger.warning("No se pudo leer el snapshot %s: %s", ruta, e)
+        return None
+    os.utime(ruta)  # marca de uso para la limpieza por antigüedad
+    return masterdata_df
+
+
+def guardar_snapshot(masterdata_df: pd.DataFrame, huella: str, directorio: Path = None) -> bool:
+    """
+    Guarda MASTERDATA como Parquet (escritura atómica). Devuelve False si no se
+    pudo, p. ej. sin pyarrow o con columnas de tipos mezclados que Parquet no admite.
+    """
+    ruta = ruta_snapshot(huella, directorio)
+    temporal = ruta.with_name(f'{ruta.name}.{os.getpid()}-{threading.get_ident()}.tmp')
+    try:
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        masterdata_df.to_parquet(temporal, index=False)
+        os.replace(temporal, ruta)
+    except Exception as e:
+        logger.warning("No se pudo guardar el snapshot de MASTERDATA: %s", e)
+        temporal.unlink(missing_ok=True)
+        return False
+    _limpiar_snapshots(ruta.parent)
+    return True
+
+
+def _limpiar_snapshots(directorio: Path):
+    """Conserva solo los MAX_SNAPSHOTS usados más recientemente"""
+    snapshots = sorted(directorio.glob('*.parquet'), key=lambda p: p.stat().st_mtime, reverse=True)
+    for viejo in snapshots[MAX_SNAPSHOTS:]:
+        viejo.unlink(missing_ok=True)
+
+
+def borrar_snapshots(directorio: Path = None) -> int:
+    """Borra todos los snapshots de MASTERDATA; devuelve cuántos había"""
+    snapshots = list(Path(directorio or DIR_SNAPSHOTS).glob('*.parquet'))
+    for snapshot in snapshots:
+        snapshot.unlink(missing_ok=True)
+    return len(snapshots)
+
+
+def leer_masterdata_con_snapshot(fuente, huella: str, nombre: str = None, directorio: Path = None) -> pd.DataFrame:
+    """
+    Carga MASTERDATA desde el snapshot de su huella si existe; si no, lo lee del
+    archivo original y crea el snapshot. El resultado indica en
+    masterdata_df.attrs['snapshot'] si fue 'acierto' o 'fallo'.
+    """
+    masterdata_df = leer_snapshot(huella, directorio)
+    if masterdata_df is not None:
+        masterdata_df.attrs['snapshot'] = SNAPSHOT_ACIERTO
+        return masterdata_df
+
+    masterdata_df = leer_masterdata(fuente, nombre)
+    guardar_snapshot(masterdata_df, huella, directorio)
+    masterdata_df.attrs['snapshot'] = SNAPSHOT_FALLO
+    return masterdata_df
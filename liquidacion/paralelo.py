@@ -0,0 +1,222 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Parsing en paralelo de un solo archivo de liquidación.
+#
+# Cada recibo empieza en una cabecera 'Núm. Personal' y no depende de los demás.
+# Un pre-escaneo sobre el archivo (mmap) ubica el inicio de cada bloque, el
+# archivo se parte en trozos de bloques completos de tamaño parecido y cada
+# trozo se parsea en un proceso del pool, que lee su rango del disco por
+# bloques. Los resultados se concatenan en el orden original, así que la salida
+# es idéntica a la de escanear_liquidacion.
+#
+# El paralelismo es opcional (max_procesos) y solo se usa desde
+# MIN_BYTES_PARALELO: por debajo, arrancar y coordinar los procesos cuesta más
+# de lo que ahorra. Los archivos subidos se vuelcan a un temporal para que los
+# procesos no reciban copias de sus bytes.
+
+import io
+import mmap
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from .comprimidos import ArchivoComprimido
+from .parser import _tamano_fuente, escanear_liquidacion, extraer_sap
+from .rendimiento import informar_progreso
+from .utilidades import concatenar
+
+# Desde este tamaño se reparte el archivo entre procesos. El parser avanza unos
+# 9 MB/s por núcleo y un archivo de 10 MB (10.000 empleados) ya era más lento en
+# paralelo (1,78 s) que en serie (1,53 s); desde 32 MB la parte en serie pasa de
+# 3 s y el arranque del pool (0,8 s la primera vez) queda amortizado.
+MIN_BYTES_PARALELO = int(os.environ.get('LIQUIDACION_MIN_BYTES_PARALELO', 32 * 1024 * 1024))
+# Bytes que cada proceso lee por vez de su rango del archivo
+TAM_BLOQUE_LECTURA = 1024 * 1024
+
+# Candidatos a cabecera; cada uno se confirma con extraer_sap sobre la línea decodificada
+_CABECERA_BYTES = re.compile(rb'Personal\.+\d')
+
+
+def contexto_procesos():
+    """
+    Contexto de los pools de procesos del parsing. No se usa 'fork': los pools se
+    crean desde hilos (trabajos, Streamlit) y el proceso hijo heredaría locks
+    tomados por otros hilos. 'forkserver' precarga el motor una vez, así cada
+    proceso nuevo no vuelve a importar pandas; donde no existe, 'spawn'.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    contexto = multiprocessing.get_context('forkserver')
+    contexto.set_forkserver_preload([__name__, f'{__package__}.lote'])
+    return contexto
+
+
+class _RangoArchivo(io.RawIOBase):
+    """Bytes [inicio, fin) de un archivo como archivo binario de solo lectura; cuenta las líneas leídas"""
+
+    def __init__(self, ruta, inicio: int, fin: int):
+        super().__init__()
+        self._archivo = open(ruta, 'rb')
+        self._inicio, self._fin = inicio, fin
+        self._archivo.seek(inicio)
+        self.lineas = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, destino) -> int:
+        restante = self._fin - self._archivo.tell()
+        if restante <= 0:
+            return 0
+        with memoryview(destino) as vista:
+            leidos = self._archivo.readinto(vista[:restante])
+            self.lineas += vista[:leidos].tobytes().count(b'\n')
+        return leidos
+
+    def seek(self, posicion: int, desde: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: self._inicio, io.SEEK_CUR: self._archivo.tell(), io.SEEK_END: self._fin}[desde]
+        return self._archivo.seek(min(max(base + posicion, self._inicio), self._fin)) - self._inicio
+
+    def tell(self) -> int:
+        return self._archivo.tell() - self._inicio
+
+    def close(self):
+        self._archivo.close()
+        super().close()
+
+
+def _inicio_linea(datos, posicion: int) -> int:
+    return datos.rfind(b'\n', 0, posicion) + 1
+
+
+def cabeceras_bloques(datos) -> list:
+    """
+    [(posición, sap)] de cada línea 'Núm. Personal' de `datos` (bytes o mmap),
+    con la posición en bytes del inicio de la línea. Usa el mismo criterio que extraer_sap.
+    """
+    cabeceras = []
+    for m in _CABECERA_BYTES.finditer(datos):
+        inicio = _inicio_linea(datos, m.start())
+        if cabeceras and cabeceras[-1][0] == inicio:
+            continue
+        fin = datos.find(b'\n', m.end())
+        linea = bytes(datos[inicio:fin if fin != -1 else len(datos)]).decode('latin-1')
+        sap = extraer_sap(linea)
+        if sap is not None:
+            cabeceras.append((inicio, sap))
+    return cabeceras
+
+
+def limites_bloques(datos) -> list:
+    """Posiciones (en bytes) donde empieza cada línea 'Núm. Personal' de `datos`"""
+    return [inicio for inicio, _ in cabeceras_bloques(datos)]
+
+
+def dividir_en_trozos(limites, total: int, n_trozos: int) -> list:
+    """
+    Rangos [inicio, fin) que cubren 0..total, cortados solo en inicios de bloque
+    y con tamaños lo más parecidos posible. Lo anterior al primer bloque va en el
+    primer trozo.
+    """
+    cortes = [0]
+    for i in range(1, n_trozos):
+        j = bisect_left(limites, total * i // n_trozos)
+        if j < len(limites) and limites[j] > cortes[-1]:
+            cortes.append(limites[j])
+    cortes.append(total)
+    return list(zip(cortes[:-1], cortes[1:]))
+
+
+def _parsear_trozo(ruta: Path, inicio: int, fin: int, primer_bloque: int = None):
+    """
+    Parsea los bytes [inicio, fin) de `ruta` leyéndolos por bloques (se ejecuta en
+    un proceso hijo). Con `primer_bloque` (cabeceras anteriores al trozo) agrega
+    BLOQUE con la numeración del archivo completo. Devuelve (df_conceptos, df_netos, lineas).
+    """
+    with _RangoArchivo(ruta, inicio, fin) as rango, io.BufferedReader(rango, TAM_BLOQUE_LECTURA) as trozo:
+        resultado = escanear_liquidacion(trozo, bloques=primer_bloque is not None)
+        lineas = rango.lineas
+    if primer_bloque:
+        for df in resultado:
+            if not df.empty:
+                df['BLOQUE'] += primer_bloque
+    return resultado + (lineas,)
+
+
+def _unir_trozos(resultados):
+    """Concatena (df_conceptos, df_netos) de cada trozo en orden y suma los importes no convertidos"""
+    unidos = []
+    for frames in list(zip(*resultados))[:2]:
+        df = concatenar(df for df in frames if not df.empty)
+        df.attrs['importes_no_convertidos'] = sum(f.attrs.get('importes_no_convertidos', 0) for f in frames)
+        unidos.append(df)
+    return tuple(unidos)
+
+
+def escanear_liquidacion_paralelo(fuente, max_procesos: int = None, min_bytes: int = MIN_BYTES_PARALELO,
+                                  bloques: bool = False):
+    """
+    Igual que escanear_liquidacion, pero reparte los bloques 'Núm. Personal' entre
+    hasta `max_procesos` procesos (por defecto, 1: el paralelismo se pide). Con un
+    solo proceso, archivos menores que `min_bytes` (o de tamaño desconocido) o un
+    ArchivoComprimido (se parsea en streaming mientras se descomprime, sin
+    inflarlo en memoria), parsea en el proceso actual. `bloques` se pasa a
+    escanear_liquidacion.
+    Devuelve (df_conceptos, df_netos).
+    """
+    procesos = max_procesos or 1
+    if isinstance(fuente, str):
+        fuente = Path(fuente)
+    tamano = None if isinstance(fuente, ArchivoComprimido) else _tamano_fuente(fuente)
+    if procesos <= 1 or tamano is None or tamano < max(min_bytes, 1):
+        return escanear_liquidacion(fuente, bloques=bloques)
+    if not isinstance(fuente, os.PathLike):
+        return _escanear_copia(fuente, procesos, bloques)
+
+    ruta = Path(fuente)
+    with open(ruta, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+        limites = limites_bloques(datos)
+    trozos = dividir_en_trozos(limites, tamano, procesos)
+    tareas = [(ruta, inicio, fin) for inicio, fin in trozos]
+
+    if bloques:
+        tareas = [tarea + (bisect_left(limites, tarea[1]),) for tarea in tareas]
+
+    if len(tareas) == 1:
+        return _parsear_trozo(*tareas[0])[:2]
+
+    with ProcessPoolExecutor(max_workers=min(procesos, len(tareas)), mp_context=contexto_procesos()) as pool:
+        futuros = {pool.submit(_parsear_trozo, *tarea): (inicio, fin) for tarea, (inicio, fin) in zip(tareas, trozos)}
+        # Avance por trozo terminado: bytes, líneas y cabeceras 'Núm. Personal' de los trozos listos
+        listos = lineas = empleados = 0
+        for futuro in as_completed(futuros):
+            inicio, fin = futuros[futuro]
+            listos += fin - inicio
+            lineas += futuro.result()[2]
+            empleados += bisect_left(limites, fin) - bisect_left(limites, inicio)
+            informar_progreso(listos / tamano, lineas, empleados)
+        return _unir_trozos([f.result() for f in futuros])
+
+
+def _escanear_copia(fuente, procesos: int, bloques: bool):
+    """Vuelca los bytes o el archivo subido a un temporal y lo parsea en paralelo desde el disco"""
+    with tempfile.NamedTemporaryFile(prefix='liquidacion_', suffix='.txt', delete=False) as copia:
+        if isinstance(fuente, (bytes, bytearray)):
+            copia.write(fuente)
+        elif hasattr(fuente, 'getbuffer'):
+            with fuente.getbuffer() as vista:
+                copia.write(vista)
+        else:
+            fuente.seek(0)
+            shutil.copyfileobj(fuente, copia, TAM_BLOQUE_LECTURA)
+    try:
+        return escanear_liquidacion_paralelo(Path(copia.name), procesos, min_bytes=0, bloques=bloques)
+    finally:
+        os.unlink(copia.name)
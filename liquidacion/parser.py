@@ -0,0 +1,274 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Parsing posicional del archivo de liquidación (conceptos y netos).
+
+import io
+import os
+import re
+import time
+
+import pandas as pd
+
+from .comprimidos import ArchivoComprimido
+from .errores import ErrorArchivoLiquidacion
+from .rendimiento import etapa, informar_progreso, progreso_activo, registrar_etapa
+from .utilidades import concatenar, convertir_importes, sap_compacto
+
+# -------------------------------
+# Patrones de línea
+# -------------------------------
+_CODIGO_ALTERNATIVAS = r'/5\d+|[YZ]\d{3}|\d{4}|\d{3,5}'
+CODIGO_REGEX = re.compile(rf'^\s*({_CODIGO_ALTERNATIVAS})')
+# Prefijo hasta el fin del código: grupo 1 = prefijo completo, 2 = código reconocido,
+# 3 = primer token cuando el código no sigue el patrón (mismo criterio del parser original)
+PREFIJO_CODIGO_REGEX = rf'^(\s*(?:({_CODIGO_ALTERNATIVAS})|(\S+)))'
+PREFIJOS_CONCEPTO_REGEX = r'^(?:Y|Z|9|2|/5)'
+
+# -------------------------------
+# Escaneo único del archivo (conceptos + netos)
+# -------------------------------
+SAP_REGEX = re.compile(r'Personal\.+(\d+)')
+
+def extraer_sap(linea: str):
+    """Devuelve el número SAP si la línea es una cabecera 'Núm. Personal'"""
+    if 'Núm. Personal' in linea or 'Nm. Personal' in linea:
+        m = SAP_REGEX.search(linea)
+        return m.group(1) if m else None
+    return None
+
+def parsear_conceptos(lineas: pd.Series, saps: pd.Series, bloques: pd.Series = None) -> pd.DataFrame:
+    """
+    Extracción posicional vectorizada de conceptos: código y concepto con un solo
+    str.extract, CANTIDAD (50–70) y VALOR (69–89) por cortes de columna.
+    Descarta las líneas cuyo código no empieza por Y, Z, 9, 2 o /5. CÓDIGO y
+    CONCEPTO son categóricos (se repiten en cada recibo) y SAP es Int32.
+    Con `bloques` agrega BLOQUE y NO_CONVERTIDOS (importes no convertidos de la fila).
+    """
+    texto = lineas.str.replace('\t', ' ', regex=False)
+    partes = texto.str.extract(PREFIJO_CODIGO_REGEX)
+    codigo = partes[1].fillna(partes[2]).fillna('')
+
+    mascara = codigo.str.contains(PREFIJOS_CONCEPTO_REGEX, regex=True).to_numpy(dtype=bool)
+    texto, lineas, codigo = texto[mascara], lineas[mascara], codigo[mascara]
+    fin = partes[0][mascara].str.len()
+
+    concepto = pd.Series([t[i:50] for t, i in zip(texto, fin)], index=texto.index, dtype=object)
+    por_fila = bloques is not None
+    cantidad, fallidos_cantidad = convertir_importes(lineas.str[50:70], por_fila)
+    valor, fallidos_valor = convertir_importes(lineas.str[69:89], por_fila)
+
+    out = pd.DataFrame({
+        'CÓDIGO':   codigo.astype('category'),
+        'CONCEPTO': concepto.str.strip().astype('category'),
+        'CANTIDAD': cantidad,
+        'VALOR':    valor,
+        'SAP':      sap_compacto(saps[mascara]),
+    }).reset_index(drop=True)
+    if por_fila:
+        out['BLOQUE'] = bloques[mascara].to_numpy()
+        out['NO_CONVERTIDOS'] = fallidos_cantidad.to_numpy(dtype='int64') + fallidos_valor.to_numpy(dtype='int64')
+        fallidos_cantidad, fallidos_valor = int(fallidos_cantidad.sum()), int(fallidos_valor.sum())
+    out.attrs['importes_no_convertidos'] = fallidos_cantidad + fallidos_valor
+    return out
+
+def parsear_netos(lineas: pd.Series, saps: pd.Series, bloques: pd.Series = None) -> pd.DataFrame:
+    """
+    Extracción vectorizada de netos: etiqueta (0–32) y valor (últimos 20 caracteres).
+    Con `bloques` agrega BLOQUE y NO_CONVERTIDOS, como parsear_conceptos.
+    """
+    por_fila = bloques is not None
+    valor, fallidos = convertir_importes(lineas.str[-20:], por_fila)
+    out = pd.DataFrame({
+        'NETO':  lineas.str[:32].str.strip().astype('category'),
+        'Valor': valor,
+        'SAP':   sap_compacto(saps),
+    })
+    if por_fila:
+        out['BLOQUE'] = bloques.to_numpy()
+        out['NO_CONVERTIDOS'] = fallidos.to_numpy(dtype='int64')
+        fallidos = int(fallidos.sum())
+    out.attrs['importes_no_convertidos'] = fallidos
+    return out
+
+# Líneas candidatas que se acumulan antes de parsear un lote por columnas
+TAM_LOTE_LINEAS = 100_000
+# Cada cuántas líneas leídas se informa el avance (si alguien lo sigue)
+LINEAS_ENTRE_AVISOS = 20_000
+
+def fuente_texto(texto: str) -> bytes:
+    """
+    TXT ya decodificado como fuente del parser (ver el parámetro `texto` de
+    escanear_liquidacion): una cadena suelta como fuente siempre es una ruta.
+    Lanza ErrorArchivoLiquidacion si trae caracteres fuera de latin-1 (no se
+    reemplazan: cambiarían nombres o conceptos sin avisar).
+    """
+    try:
+        return texto.encode('latin-1')
+    except UnicodeEncodeError as e:
+        linea = texto.count('\n', 0, e.start) + 1
+        raise ErrorArchivoLiquidacion(
+            f"El texto de la liquidación tiene caracteres que no son latin-1 ({texto[e.start:e.end]!r} en la "
+            f"línea {linea}); pásalo como bytes o como archivo") from e
+
+def _tamano_fuente(fuente):
+    """Tamaño en bytes de la fuente, o None si no se conoce sin leerla"""
+    if isinstance(fuente, (bytes, bytearray)):
+        return len(fuente)
+    if isinstance(fuente, (str, os.PathLike)):
+        return os.path.getsize(fuente)
+    if hasattr(fuente, 'getbuffer'):
+        return fuente.getbuffer().nbytes
+    return getattr(fuente, 'size', None)
+
+def iterar_lineas(fuente):
+    """
+    Genera las líneas del archivo de liquidación sin cargarlo completo en memoria.
+    Acepta bytes, una ruta (str u os.PathLike), un objeto archivo binario (p. ej.
+    el archivo subido en Streamlit) o un ArchivoComprimido, que se descomprime a
+    medida que se lee. Decodifica en latin-1. El texto ya decodificado se pasa
+    con fuente_texto.
+    """
+    if isinstance(fuente, ArchivoComprimido):
+        with fuente.abrir() as f:
+            yield from iterar_lineas(f)
+        return
+    if isinstance(fuente, (bytes, bytearray)):
+        fuente = io.BytesIO(fuente)
+    if isinstance(fuente, (str, os.PathLike)):
+        with open(fuente, 'rb') as f:
+            yield from iterar_lineas(f)
+        return
+
+    if hasattr(fuente, 'seek'):
+        fuente.seek(0)
+    texto = io.TextIOWrapper(fuente, encoding='latin-1', errors='ignore', newline='\n')
+    try:
+        # Sin 'yield from': al cerrar el generador cerraría también el TextIOWrapper
+        for linea in texto:
+            yield linea
+    finally:
+        # Desacoplar para no cerrar el archivo del llamador
+        texto.detach()
+
+def iterar_lotes_liquidacion(fuente, tam_lote: int = TAM_LOTE_LINEAS, bloques: bool = False):
+    """
+    Recorre el archivo una sola vez siguiendo el bloque 'Núm. Personal' actual
+    y reparte cada línea entre conceptos y netos ('Total General').
+    Cada tam_lote líneas se parsean por columnas y se emite
+    ('conceptos', DataFrame) o ('netos', DataFrame), de modo que la memoria
+    no crece con el tamaño del archivo. Con `bloques`, cada fila lleva en BLOQUE
+    el número de cabecera 'Núm. Personal' a la que pertenece (0 = antes de la primera).
+    """
+    lineas_concepto, saps_concepto, bloques_concepto = [], [], []
+    lineas_neto, saps_neto, bloques_neto = [], [], []
+    sap_actual = None
+    bloque_actual = 0
+
+    # Rendimiento: la lectura (decodificación y clasificación de líneas) es el
+    # tiempo del generador que no se pasa parseando lotes ni esperando al consumidor
+    registrar_etapa('lectura_lineas', 0.0)
+    lineas_leidas = 0
+    segundos_fuera = 0.0
+    inicio = time.perf_counter()
+
+    # Avance: líneas, cabeceras vistas y fracción de bytes leídos (latin-1: un byte por carácter)
+    seguir = progreso_activo()
+    total_bytes = _tamano_fuente(fuente) if seguir else None
+    bytes_leidos = 0
+
+    def parsear_lote(nombre, parsear, lineas, saps, numeros_bloque):
+        nonlocal segundos_fuera
+        t = time.perf_counter()
+        with etapa(nombre) as e:
+            df = parsear(pd.Series(lineas, dtype=object), pd.Series(saps, dtype=object),
+                         pd.Series(numeros_bloque, dtype='int64') if bloques else None)
+            e.filas(len(lineas), len(df))
+        segundos_fuera += time.perf_counter() - t
+        return df
+
+    def lote_conceptos():
+        return parsear_lote('conceptos', parsear_conceptos, lineas_concepto, saps_concepto, bloques_concepto)
+
+    def lote_netos():
+        return parsear_lote('netos', parsear_netos, lineas_neto, saps_neto, bloques_neto)
+
+    for linea in iterar_lineas(fuente):
+        lineas_leidas += 1
+        if seguir:
+            bytes_leidos += len(linea)
+            if lineas_leidas % LINEAS_ENTRE_AVISOS == 0:
+                informar_progreso(bytes_leidos / total_bytes if total_bytes else None, lineas_leidas, bloque_actual)
+        linea = linea.strip('\r\n')
+        s = linea.strip()
+        if not s:
+            continue
+
+        sap = extraer_sap(linea)
+        if sap is not None:
+            sap_actual = sap
+            bloque_actual += 1
+
+        if 'Total General' in linea:
+            lineas_neto.append(s)
+            saps_neto.append(sap_actual)
+            bloques_neto.append(bloque_actual)
+            if len(lineas_neto) >= tam_lote:
+                lote = lote_netos()
+                t = time.perf_counter()
+                yield 'netos', lote
+                segundos_fuera += time.perf_counter() - t
+                lineas_neto, saps_neto, bloques_neto = [], [], []
+        elif len(s) > 30 and 'PESOS CON 00/100' not in s:
+            lineas_concepto.append(linea)
+            saps_concepto.append(sap_actual)
+            bloques_concepto.append(bloque_actual)
+            if len(lineas_concepto) >= tam_lote:
+                lote = lote_conceptos()
+                t = time.perf_counter()
+                yield 'conceptos', lote
+                segundos_fuera += time.perf_counter() - t
+                lineas_concepto, saps_concepto, bloques_concepto = [], [], []
+
+    registrar_etapa('lectura_lineas', time.perf_counter() - inicio - segundos_fuera, lineas_leidas)
+    informar_progreso(1.0 if total_bytes else None, lineas_leidas, bloque_actual)
+    if lineas_concepto:
+        yield 'conceptos', lote_conceptos()
+    if lineas_neto:
+        yield 'netos', lote_netos()
+
+def escanear_liquidacion(fuente=None, tam_lote: int = TAM_LOTE_LINEAS, bloques: bool = False,
+                         texto: str = None):
+    """
+    Procesa el archivo de liquidación en streaming (ver iterar_lotes_liquidacion)
+    y arma los DataFrames finales a partir de los lotes. En .attrs['importes_no_convertidos']
+    de cada uno queda cuántos importes no se pudieron convertir (se tomaron como 0).
+    `bloques` agrega BLOQUE y NO_CONVERTIDOS por fila (ver parsear_conceptos).
+    `texto` reemplaza a `fuente` con el contenido ya decodificado.
+    Devuelve (df_conceptos, df_netos).
+    """
+    if texto is not None:
+        fuente = fuente_texto(texto)
+    lotes = {'conceptos': [], 'netos': []}
+    fallidos = {'conceptos': 0, 'netos': 0}
+    for tipo, lote in iterar_lotes_liquidacion(fuente, tam_lote, bloques):
+        fallidos[tipo] += lote.attrs.get('importes_no_convertidos', 0)
+        if not lote.empty:
+            lotes[tipo].append(lote)
+
+    df_conceptos = concatenar(lotes['conceptos'])
+    df_netos     = concatenar(lotes['netos'])
+    df_conceptos.attrs['importes_no_convertidos'] = fallidos['conceptos']
+    df_netos.attrs['importes_no_convertidos'] = fallidos['netos']
+    return df_conceptos, df_netos
+
+# -------------------------------
+# Compatibilidad: pipelines por separado
+# -------------------------------
+def procesar_liquidacion_pipeline(contenido_archivo_txt: str) -> pd.DataFrame:
+    """Procesa los conceptos del archivo de liquidación (ver escanear_liquidacion)"""
+    df_conceptos, _ = escanear_liquidacion(texto=contenido_archivo_txt)
+    return df_conceptos
+
+def procesar_netos_pipeline(contenido_archivo_txt: str) -> pd.DataFrame:
+    """Procesa los netos del archivo de liquidación (ver escanear_liquidacion)"""
+    _, df_netos = escanear_liquidacion(texto=contenido_archivo_txt)
+    return df_netos
@@ -0,0 +1,131 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Procesamiento principal: liquidación + MASTERDATA, sin dependencias de interfaz.
+
+from pathlib import Path
+
+from .cache import hash_archivo
+from .comprimidos import ArchivoComprimido
+from .errores import ErrorArchivoLiquidacion, ErrorMasterdata
+from .grafo import GrafoEtapas
+from .incremental import cargar_liquidacion_incremental
+from .masterdata import leer_masterdata, leer_masterdata_con_snapshot, SNAPSHOT_DESACTIVADO
+from .paralelo import escanear_liquidacion_paralelo
+from .parser import fuente_texto
+from .rendimiento import etapa
+
+
+def _admite_incremental(fuente) -> bool:
+    """
+    Los comprimidos no admiten reproceso incremental: necesita los bytes
+    completos del archivo y estos se parsean en streaming.
+    """
+    return not isinstance(fuente, ArchivoComprimido)
+
+
+def _fuente_liquidacion(fuente, texto: str = None):
+    """Las cadenas son rutas; `texto` (contenido ya decodificado) reemplaza a la fuente"""
+    if texto is not None:
+        return fuente_texto(texto)
+    if isinstance(fuente, str):
+        if '\n' in fuente:
+            raise ErrorArchivoLiquidacion("Se recibió el contenido del archivo de liquidación en lugar de una "
+                                          "ruta; el texto ya decodificado se pasa con texto=")
+        return Path(fuente)
+    return fuente
+
+
+def cargar_liquidacion(fuente=None, cache=None, huella: str = None, max_procesos: int = None,
+                       incremental: bool = False, texto: str = None):
+    """
+    Parsea la liquidación repartiendo los bloques 'Núm. Personal' entre hasta
+    `max_procesos` procesos (ver escanear_liquidacion_paralelo). Con `incremental`
+    solo se parsean los bloques que cambiaron respecto de la versión anterior del
+    mismo archivo, guardada en disco (ver cargar_liquidacion_incremental). Con
+    `cache` (CacheLRU) el resultado se reutiliza por huella SHA-256 del contenido
+    (se calcula si no se indica).
+    `fuente` es una ruta (str u os.PathLike), bytes, un objeto archivo binario o
+    un ArchivoComprimido; el contenido ya decodificado se pasa en `texto`.
+    Devuelve (df_conceptos, df_netos).
+    """
+    fuente = _fuente_liquidacion(fuente, texto)
+    incremental = incremental and _admite_incremental(fuente)
+    calculado = []
+
+    def parsear():
+        calculado.append(True)
+        try:
+            if incremental:
+                return cargar_liquidacion_incremental(fuente, max_procesos)
+            return escanear_liquidacion_paralelo(fuente, max_procesos)
+        except Exception as e:
+            raise ErrorArchivoLiquidacion(f"Error al leer el archivo de liquidación: {e}") from e
+
+    with etapa('liquidacion') as e:
+        if cache is None:
+            resultado = parsear()
+        else:
+            # Con incremental el resultado además trae los cambios respecto de la versión anterior
+            clave = ('liquidacion', huella or hash_archivo(fuente), incremental)
+            resultado = cache.obtener_o_calcular(clave, parsear)
+            e.detalle['cache'] = 'fallo' if calculado else 'acierto'
+        e.filas(salida=sum(len(df) for df in resultado))
+    return resultado
+
+
+def cargar_masterdata(fuente, cache=None, huella: str = None, snapshots: bool = True):
+    """
+    Lee MASTERDATA (ver leer_masterdata). Con `snapshots` usa el snapshot Parquet
+    en disco de su huella (ver leer_masterdata_con_snapshot); con `cache` además
+    lo reutiliza en memoria.
+    """
+    def leer():
+        if snapshots:
+            return leer_masterdata_con_snapshot(fuente, huella)
+        masterdata_df = leer_masterdata(fuente)
+        masterdata_df.attrs['snapshot'] = SNAPSHOT_DESACTIVADO
+        return masterdata_df
+
+    with etapa('masterdata') as e:
+        if snapshots or cache is not None:
+            huella = huella or hash_archivo(fuente, ErrorMasterdata)
+        if cache is None:
+            masterdata_df = leer()
+        else:
+            masterdata_df = cache.obtener_o_calcular(('masterdata', huella), leer)
+        e.filas(salida=len(masterdata_df))
+        e.detalle['snapshot'] = masterdata_df.attrs.get('snapshot')
+        e.detalle['motor'] = masterdata_df.attrs.get('motor')
+    return masterdata_df
+
+
+def procesar_archivos(archivo_liquidacion, archivo_masterdata, cache=None, huellas=(None, None),
+                      snapshots: bool = True, max_procesos: int = None, incremental: bool = False,
+                      texto: str = None):
+    """
+    Procesa la liquidación (en streaming) y lee MASTERDATA a la vez (ver GrafoEtapas).
+    Ambos archivos pueden ser rutas (str u os.PathLike) u objetos archivo; el
+    contenido de la liquidación ya decodificado se pasa en `texto` (con
+    `archivo_liquidacion` en None). Con `cache` se reutilizan
+    resultados previos del mismo contenido; `huellas` permite pasar los SHA-256
+    (liquidación, MASTERDATA) ya calculados y `snapshots` activa el snapshot
+    columnar de MASTERDATA en disco. `max_procesos` limita los procesos del parsing
+    (por defecto 1, en el proceso actual; ver escanear_liquidacion_paralelo) e `incremental`
+    reutiliza los bloques sin cambios de la versión anterior del mismo archivo
+    (guarda en disco las filas parseadas; ver borrar_estados).
+    Devuelve (df_conceptos, df_netos, masterdata_df); lanza ErrorLiquidacion
+    (o una subclase) si algo falla.
+    """
+    huella_liq, huella_md = huellas
+    archivo_liquidacion = _fuente_liquidacion(archivo_liquidacion, texto)
+
+    def liquidacion():
+        df_conceptos, df_netos = cargar_liquidacion(archivo_liquidacion, cache, huella_liq, max_procesos, incremental)
+        if df_conceptos.empty and df_netos.empty:
+            raise ErrorArchivoLiquidacion("No se pudieron extraer datos del archivo de liquidación.")
+        return df_conceptos, df_netos
+
+    grafo = GrafoEtapas()
+    grafo.agregar('liquidacion', liquidacion)
+    grafo.agregar('masterdata', lambda: cargar_masterdata(archivo_masterdata, cache, huella_md, snapshots))
+    resultados = grafo.ejecutar()
+    return resultados['liquidacion'] + (resultados['masterdata'],)
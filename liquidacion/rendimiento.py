@@ -0,0 +1,440 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Instrumentación por etapa: duración, filas de entrada y salida, filas por
+# segundo y pico de memoria (RSS) de cada etapa de una ejecución.
+#
+# Las funciones del motor marcan sus etapas con `etapa(nombre)`; solo se
+# registran dentro de `medir_ejecucion()`, que además agrega una línea JSON por
+# ejecución al log de rendimiento y, opcionalmente, perfila con cProfile.
+# Fuera de una medición `etapa` no hace nada.
+#
+# El avance (etapa actual, líneas leídas, empleados parseados y fracción) se
+# sigue con `seguir_progreso(Progreso())`; el parser lo informa con
+# `informar_progreso`, que tampoco hace nada si nadie lo sigue.
+#
+# Las etapas pueden correr a la vez en hilos (ver GrafoEtapas): cada hilo hereda
+# el contexto de quien lo lanzó, así que sus etapas quedan bajo la misma etapa
+# padre. Con etapas simultáneas el pico de memoria de cada una es el del proceso
+# desde que empezó la última.
+#
+# El pico de memoria es del proceso: se reinicia al empezar cada ejecución y
+# cada etapa, pero solo mientras no haya otra ejecución en curso (trabajos
+# simultáneos de la app). Una ejecución que se solapó con otra no reinicia el
+# pico e informa el del proceso (Ejecucion.memoria_proceso). Sin /proc ni el
+# módulo resource (Windows) se mide la memoria asignada con tracemalloc.
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Log de ejecuciones (una línea JSON por ejecución); vacío lo desactiva
+LOG_RENDIMIENTO = os.environ.get(
+    'LIQUIDACION_LOG_RENDIMIENTO',
+    str(Path.home() / '.cache' / 'liquidacion' / 'rendimiento.jsonl'),
+)
+# Funciones que se muestran en el resumen del perfil
+LINEAS_RESUMEN_PERFIL = 30
+
+# Peso de cada etapa principal en la fracción de avance (por prefijo del nombre)
+# (la escritura del Excel suele ser la etapa más lenta)
+PESOS_PROGRESO = {'liquidacion': 0.35, 'lote': 0.45, 'masterdata': 0.1, 'cubo': 0.05, 'combinacion': 0.05,
+                  'escritura': 0.45}
+
+_EJECUCION = ContextVar('ejecucion_liquidacion', default=None)
+_PROGRESO = ContextVar('progreso_liquidacion', default=None)
+# Etapas abiertas en este contexto, de la principal a la actual
+_PILA = ContextVar('pila_etapas', default=())
+# Clave en Progreso de la etapa principal en curso en este contexto
+_ETAPA_PROGRESO = ContextVar('etapa_progreso', default=None)
+
+# -------------------------------
+# Memoria
+# -------------------------------
+# Ejecuciones en curso en el proceso; con más de una el pico no se reinicia
+_EJECUCIONES_ACTIVAS = set()
+_LOCK_MEMORIA = threading.Lock()
+
+
+def rss_memoria_mb(campo: str = 'VmRSS'):
+    """RSS actual (VmRSS) o pico (VmHWM) en MB, desde /proc; None si no está disponible"""
+    try:
+        with open('/proc/self/status') as f:
+            for linea in f:
+                if linea.startswith(campo + ':'):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def pico_memoria_mb() -> float:
+    """
+    Pico de RSS del proceso en MB (desde el último reinicio, si se pudo reiniciar).
+    Sin /proc ni resource, el pico de memoria asignada según tracemalloc.
+    """
+    if resource is None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    pico = rss_memoria_mb('VmHWM')
+    if pico is not None:
+        return pico
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def reiniciar_pico_memoria() -> bool:
+    """
+    Reinicia el pico de memoria del proceso (Linux, o tracemalloc sin resource).
+    False si no se puede: en macOS el pico es el del proceso completo.
+    """
+    if resource is None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        return True
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _reiniciar_pico_ejecucion():
+    """Reinicia el pico solo si no hay otra ejecución en curso (el pico es de todo el proceso)"""
+    with _LOCK_MEMORIA:
+        if len(_EJECUCIONES_ACTIVAS) <= 1:
+            reiniciar_pico_memoria()
+
+
+def _activar_ejecucion(ejecucion):
+    with _LOCK_MEMORIA:
+        _EJECUCIONES_ACTIVAS.add(ejecucion)
+        if len(_EJECUCIONES_ACTIVAS) > 1:
+            for activa in _EJECUCIONES_ACTIVAS:
+                activa.memoria_proceso = True
+
+# -------------------------------
+# Registro de etapas
+# -------------------------------
+class Etapa:
+    """Una etapa medida; las repeticiones del mismo nombre bajo el mismo padre se acumulan"""
+
+    def __init__(self, nombre: str, nivel: int):
+        self.nombre = nombre
+        self.nivel = nivel
+        self.segundos = 0.0
+        self.filas_entrada = None
+        self.filas_salida = None
+        self.memoria_pico_mb = 0.0
+        self.detalle = {}
+        self._hijas = {}
+
+    def filas(self, entrada=None, salida=None):
+        """Suma filas de entrada y salida (las etapas que se repiten por lote acumulan)"""
+        if entrada is not None:
+            self.filas_entrada = (self.filas_entrada or 0) + int(entrada)
+        if salida is not None:
+            self.filas_salida = (self.filas_salida or 0) + int(salida)
+
+    @property
+    def filas_por_segundo(self):
+        filas = self.filas_salida if self.filas_salida is not None else self.filas_entrada
+        if filas is None or self.segundos <= 0:
+            return None
+        return round(filas / self.segundos)
+
+    def como_dict(self) -> dict:
+        return {
+            'etapa': self.nombre,
+            'nivel': self.nivel,
+            'segundos': round(self.segundos, 4),
+            'filas_entrada': self.filas_entrada,
+            'filas_salida': self.filas_salida,
+            'filas_por_segundo': self.filas_por_segundo,
+            'memoria_pico_mb': round(self.memoria_pico_mb, 1),
+            **self.detalle,
+        }
+
+
+class Ejecucion:
+    """Etapas de una ejecución: cada una seguida de sus hijas, en el orden en que empezaron"""
+
+    def __init__(self, origen: str, datos: dict = None):
+        self.origen = origen
+        self.datos = dict(datos or {})
+        self.fecha = datetime.now()
+        self.segundos = 0.0
+        self.memoria_pico_mb = 0.0
+        # True si se solapó con otra ejecución: los picos son del proceso, no solo de esta
+        self.memoria_proceso = False
+        self.perfil = None  # cProfile.Profile si se perfiló
+        self.perfilando = False
+        self._raiz = {}
+        self._lock = threading.Lock()
+
+    def _etapa(self, nombre: str, padre: Etapa = None) -> Etapa:
+        with self._lock:
+            hijas = padre._hijas if padre else self._raiz
+            if nombre not in hijas:
+                hijas[nombre] = Etapa(nombre, padre.nivel + 1 if padre else 0)
+            return hijas[nombre]
+
+    @property
+    def etapas(self) -> list:
+        def recorrer(hijas):
+            for e in list(hijas.values()):
+                yield e
+                yield from recorrer(e._hijas)
+        with self._lock:
+            return list(recorrer(self._raiz))
+
+    def como_dict(self) -> dict:
+        return {
+            'fecha': self.fecha.isoformat(timespec='seconds'),
+            'origen': self.origen,
+            **self.datos,
+            'segundos': round(self.segundos, 4),
+            'memoria_pico_mb': round(self.memoria_pico_mb, 1),
+            'memoria_proceso': self.memoria_proceso,
+            'etapas': [e.como_dict() for e in self.etapas],
+        }
+
+    def tabla(self):
+        """Etapas como DataFrame, con la etapa sangrada según su nivel"""
+        import pandas as pd
+
+        filas = [e.como_dict() for e in self.etapas]
+        for fila in filas:
+            fila['etapa'] = '    ' * fila.pop('nivel') + fila['etapa']
+        return pd.DataFrame(filas)
+
+    def resumen_perfil(self, lineas: int = LINEAS_RESUMEN_PERFIL) -> str:
+        """Funciones con mayor tiempo acumulado según cProfile ('' si no se perfiló)"""
+        if self.perfil is None:
+            return ''
+        salida = io.StringIO()
+        pstats.Stats(self.perfil, stream=salida).sort_stats('cumulative').print_stats(lineas)
+        return salida.getvalue()
+
+    def perfil_bytes(self) -> bytes:
+        """Perfil en el formato de pstats/snakeviz (b'' si no se perfiló)"""
+        if self.perfil is None:
+            return b''
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = Path(directorio) / 'perfil.prof'
+            self.perfil.dump_stats(ruta)
+            return ruta.read_bytes()
+
+
+@contextmanager
+def etapa(nombre: str):
+    """
+    Mide una etapa de la ejecución en curso. Devuelve la Etapa para indicar filas
+    (`e.filas(entrada, salida)`) o detalles (`e.detalle[...]`); sin medición activa
+    devuelve una Etapa que no se guarda.
+    """
+    progreso = _PROGRESO.get()
+    if progreso is None or _ETAPA_PROGRESO.get() is not None:
+        with _medir_etapa(nombre) as actual:
+            yield actual
+        return
+    clave = progreso._entrar(nombre)
+    token = _ETAPA_PROGRESO.set(clave)
+    try:
+        with _medir_etapa(nombre) as actual:
+            yield actual
+    finally:
+        _ETAPA_PROGRESO.reset(token)
+        progreso._salir(clave)
+
+
+@contextmanager
+def _medir_etapa(nombre: str):
+    ejecucion = _EJECUCION.get()
+    if ejecucion is None:
+        yield Etapa(nombre, 0)
+        return
+
+    # El pico de la etapa padre hasta aquí se guarda antes de reiniciarlo para la hija
+    pila = _PILA.get()
+    padre = pila[-1] if pila else None
+    if padre:
+        padre.memoria_pico_mb = max(padre.memoria_pico_mb, pico_memoria_mb())
+    actual = ejecucion._etapa(nombre, padre)
+    token = _PILA.set(pila + (actual,))
+    _reiniciar_pico_ejecucion()
+    inicio = time.perf_counter()
+    try:
+        yield actual
+    finally:
+        actual.segundos += time.perf_counter() - inicio
+        actual.memoria_pico_mb = max(actual.memoria_pico_mb, pico_memoria_mb())
+        _PILA.reset(token)
+        if padre:
+            padre.memoria_pico_mb = max(padre.memoria_pico_mb, actual.memoria_pico_mb)
+
+
+def registrar_etapa(nombre: str, segundos: float, filas_entrada=None, filas_salida=None):
+    """Registra una etapa calculada aparte (p. ej. el resto de un bucle) bajo la etapa actual"""
+    ejecucion = _EJECUCION.get()
+    if ejecucion is None:
+        return
+    pila = _PILA.get()
+    registrada = ejecucion._etapa(nombre, pila[-1] if pila else None)
+    registrada.segundos += segundos
+    registrada.filas(filas_entrada, filas_salida)
+
+
+# -------------------------------
+# Progreso
+# -------------------------------
+class Progreso:
+    """
+    Avance de una ejecución, actualizado desde los hilos que la corren y leído
+    desde otros: etapa principal actual (la última que empezó, si hay varias a la
+    vez), líneas leídas y empleados parseados de la liquidación, y fracción total
+    (0–1) según PESOS_PROGRESO.
+    """
+
+    def __init__(self):
+        self.etapa = None
+        self.lineas = 0
+        self.empleados = 0
+        self.fraccion = 0.0
+        self._completado = 0.0  # peso de las etapas principales ya terminadas
+        self._activas = {}  # clave -> [nombre, peso, fracción] de las etapas principales en curso
+        self._lock = threading.Lock()
+
+    def _entrar(self, nombre: str):
+        """Registra una etapa principal en curso y devuelve su clave"""
+        clave = object()
+        peso = next((p for prefijo, p in PESOS_PROGRESO.items() if nombre.startswith(prefijo)), 0.0)
+        with self._lock:
+            self.etapa = nombre
+            self._activas[clave] = [nombre, peso, 0.0]
+        return clave
+
+    def _salir(self, clave):
+        with self._lock:
+            _, peso, _ = self._activas.pop(clave)
+            self._completado = min(1.0, self._completado + peso)
+            if self._activas:
+                self.etapa = next(reversed(self._activas.values()))[0]
+            self._actualizar()
+
+    def _actualizar(self):
+        self.fraccion = min(1.0, self._completado + sum(peso * f for _, peso, f in self._activas.values()))
+
+    def avanzar(self, fraccion_etapa: float = None, lineas: int = None, empleados: int = None, clave=None):
+        """Informa el avance dentro de la etapa principal `clave` (ver informar_progreso)"""
+        with self._lock:
+            if lineas is not None:
+                self.lineas = lineas
+            if empleados is not None:
+                self.empleados = empleados
+            if fraccion_etapa is not None and clave in self._activas:
+                self._activas[clave][2] = min(max(fraccion_etapa, 0.0), 1.0)
+                self._actualizar()
+
+    def terminar(self):
+        with self._lock:
+            self.fraccion = 1.0
+
+    def como_dict(self) -> dict:
+        with self._lock:
+            return {'etapa': self.etapa, 'lineas': self.lineas, 'empleados': self.empleados,
+                    'fraccion': self.fraccion}
+
+
+@contextmanager
+def seguir_progreso(progreso: Progreso):
+    """El motor informa en `progreso` el avance de lo que se ejecute dentro del bloque (en este hilo; None lo silencia)"""
+    token = _PROGRESO.set(progreso)
+    token_etapa = _ETAPA_PROGRESO.set(None)
+    try:
+        yield progreso
+    finally:
+        _ETAPA_PROGRESO.reset(token_etapa)
+        _PROGRESO.reset(token)
+
+
+def progreso_activo() -> bool:
+    return _PROGRESO.get() is not None
+
+
+def informar_progreso(fraccion_etapa: float = None, lineas: int = None, empleados: int = None):
+    """Avance dentro de la etapa actual (ver Progreso.avanzar); no hace nada si nadie lo sigue"""
+    progreso = _PROGRESO.get()
+    if progreso is not None:
+        progreso.avanzar(fraccion_etapa, lineas, empleados, _ETAPA_PROGRESO.get())
+
+# -------------------------------
+# Log y medición de la ejecución
+# -------------------------------
+def escribir_log(ejecucion: Ejecucion, ruta=None) -> bool:
+    """Agrega la ejecución como una línea JSON al log de rendimiento"""
+    ruta = LOG_RENDIMIENTO if ruta is None else ruta
+    if not ruta:
+        return False
+    try:
+        Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+        with open(ruta, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(ejecucion.como_dict(), ensure_ascii=False, default=str) + '\n')
+    except OSError:
+        return False
+    return True
+
+
+@contextmanager
+def medir_ejecucion(origen: str, datos: dict = None, perfil: bool = False, log=None):
+    """
+    Registra las etapas de todo lo que se ejecute dentro del bloque y, al salir,
+    agrega la ejecución al log (`log` cambia la ruta; '' lo desactiva). Con
+    `perfil` además perfila el hilo actual con cProfile (ver Ejecucion.perfil).
+    """
+    ejecucion = Ejecucion(origen, datos)
+    ejecucion.perfilando = bool(perfil)
+    token = _EJECUCION.set(ejecucion)
+    token_pila = _PILA.set(())
+    perfilador = cProfile.Profile() if perfil else None
+    _activar_ejecucion(ejecucion)
+    _reiniciar_pico_ejecucion()
+    inicio = time.perf_counter()
+    if perfilador:
+        perfilador.enable()
+    try:
+        yield ejecucion
+    finally:
+        if perfilador:
+            perfilador.disable()
+            ejecucion.perfil = perfilador
+        ejecucion.segundos = time.perf_counter() - inicio
+        ejecucion.memoria_pico_mb = max([pico_memoria_mb()] + [e.memoria_pico_mb for e in ejecucion.etapas])
+        with _LOCK_MEMORIA:
+            _EJECUCIONES_ACTIVAS.discard(ejecucion)
+        _PILA.reset(token_pila)
+        _EJECUCION.reset(token)
+        escribir_log(ejecucion, log)
+
+
+def perfilando() -> bool:
+    """Si la ejecución en curso se perfila (cProfile solo ve el hilo que lo activó)"""
+    ejecucion = _EJECUCION.get()
+    return ejecucion is not None and ejecucion.perfilando
@@ -0,0 +1,260 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Trabajos en segundo plano: procesamiento + exportación en un pool acotado.
+#
+# Cada trabajo corre en un hilo del pool (a lo sumo MAX_TRABAJOS a la vez; los
+# demás esperan en cola) y los núcleos del parsing se reparten entre los
+# trabajos simultáneos, para no sobrecargar el servidor cuando varias sesiones
+# procesan a la vez. El avance se lee de Trabajo.progreso desde cualquier hilo.
+# Los últimos MAX_TRABAJOS_GUARDADOS trabajos terminados se conservan con su
+# resultado, para que una sesión pueda reconectarse a ellos por su id; desde
+# otra sesión, solo presentando además su llave de acceso (p. ej. las huellas
+# de los archivos procesados), no basta con conocer el id.
+
+import io
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .rendimiento import Progreso, medir_ejecucion, seguir_progreso
+
+logger = logging.getLogger(__name__)
+
+# Trabajos que corren a la vez y terminados que se conservan (cada uno retiene sus DataFrames)
+MAX_TRABAJOS = int(os.environ.get('LIQUIDACION_MAX_TRABAJOS', '2'))
+MAX_TRABAJOS_GUARDADOS = int(os.environ.get('LIQUIDACION_TRABAJOS_GUARDADOS', '10'))
+
+EN_COLA = 'en_cola'
+EN_PROCESO = 'en_proceso'
+TERMINADO = 'terminado'
+FALLIDO = 'fallido'
+
+# -------------------------------
+# Trabajos
+# -------------------------------
+class Trabajo:
+    """
+    Un trabajo enviado al pool. `resultado` es lo que devolvió la función (si
+    terminó), `error` la excepción (si falló) y `ejecucion` su registro de
+    rendimiento (ver medir_ejecucion). `acceso` es la llave para reconectarse
+    desde otra sesión (ver GestorTrabajos.reconectar).
+    """
+
+    def __init__(self, id: str, descripcion: str = '', clave=None, acceso=None):
+        self.id = id
+        self.descripcion = descripcion
+        self.clave = clave
+        self.acceso = acceso
+        self.estado = EN_COLA
+        self.progreso = Progreso()
+        self.resultado = None
+        self.error = None
+        self.ejecucion = None
+        self.creado = datetime.now()
+        self.iniciado = None
+        self.finalizado = None
+        self._listo = threading.Event()
+
+    @property
+    def terminado(self) -> bool:
+        return self.estado in (TERMINADO, FALLIDO)
+
+    def esperar(self, timeout: float = None) -> bool:
+        """Espera a que termine; False si se agotó el tiempo"""
+        return self._listo.wait(timeout)
+
+    def como_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'descripcion': self.descripcion,
+            'estado': self.estado,
+            'creado': self.creado,
+            'segundos': (self.finalizado - self.iniciado).total_seconds()
+                        if self.iniciado and self.finalizado else None,
+            **self.progreso.como_dict(),
+        }
+
+
+class GestorTrabajos:
+    """Pool de hilos acotado y registro de los trabajos enviados"""
+
+    def __init__(self, max_trabajos: int = MAX_TRABAJOS, max_guardados: int = MAX_TRABAJOS_GUARDADOS):
+        self.max_trabajos = max(1, max_trabajos)
+        self.max_guardados = max_guardados
+        self._trabajos = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def procesos_por_trabajo(self) -> int:
+        """Procesos de parsing para cada trabajo, repartiendo los núcleos entre los simultáneos"""
+        return max(1, (os.cpu_count() or 1) // self.max_trabajos)
+
+    def enviar(self, funcion, *args, descripcion: str = '', clave=None, perfil: bool = False,
+               datos: dict = None, acceso=None, **kwargs) -> Trabajo:
+        """
+        Encola funcion(*args, **kwargs) y devuelve el Trabajo. Si ya hay un trabajo
+        con la misma `clave` en cola, en proceso o terminado con éxito, se devuelve
+        ese (dos sesiones con los mismos archivos comparten el trabajo). `datos` y
+        `perfil` se pasan a medir_ejecucion; `acceso` es la llave para reconectarse
+        (sin ella, el trabajo no se puede reconectar desde otra sesión).
+        """
+        with self._lock:
+            if clave is not None:
+                for trabajo in reversed(self._trabajos.values()):
+                    if trabajo.clave == clave and trabajo.estado != FALLIDO:
+                        return trabajo
+            trabajo = Trabajo(uuid.uuid4().hex[:12], descripcion, clave, acceso)
+            self._trabajos[trabajo.id] = trabajo
+            self._limpiar()
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_trabajos,
+                                                thread_name_prefix='trabajo-liquidacion')
+        self._pool.submit(self._ejecutar, trabajo, funcion, args, kwargs, perfil, datos)
+        return trabajo
+
+    def obtener(self, id: str):
+        """Trabajo con ese id, o None si no existe o ya se descartó"""
+        with self._lock:
+            return self._trabajos.get(id)
+
+    def reconectar(self, id: str, acceso):
+        """Trabajo con ese id si `acceso` es su llave; None si no existe, no tiene llave o no coincide"""
+        trabajo = self.obtener(id)
+        if trabajo is None or trabajo.acceso is None or trabajo.acceso != acceso:
+            return None
+        return trabajo
+
+    def trabajos(self) -> list:
+        """Trabajos conocidos, del más reciente al más antiguo"""
+        with self._lock:
+            return list(reversed(self._trabajos.values()))
+
+    def _ejecutar(self, trabajo: Trabajo, funcion, args, kwargs, perfil, datos):
+        trabajo.estado = EN_PROCESO
+        trabajo.iniciado = datetime.now()
+        try:
+            with seguir_progreso(trabajo.progreso), \
+                    medir_ejecucion('trabajo', {'trabajo': trabajo.id, **(datos or {})}, perfil) as ejecucion:
+                trabajo.ejecucion = ejecucion
+                trabajo.resultado = funcion(*args, **kwargs)
+            trabajo.progreso.terminar()
+            trabajo.estado = TERMINADO
+        except Exception as e:
+            logger.warning("Trabajo %s fallido: %s", trabajo.id, e)
+            trabajo.error = e
+            trabajo.estado = FALLIDO
+        finally:
+            trabajo.finalizado = datetime.now()
+            with self._lock:
+                self._limpiar()
+            trabajo._listo.set()
+
+    def _limpiar(self):
+        """Descarta los terminados más antiguos por encima de max_guardados (con el lock tomado)"""
+        terminados = [id for id, t in self._trabajos.items() if t.terminado]
+        for id in terminados[:max(0, len(terminados) - self.max_guardados)]:
+            del self._trabajos[id]
+
+
+# Gestor compartido del proceso (tamaño del pool con LIQUIDACION_MAX_TRABAJOS)
+GESTOR_TRABAJOS = GestorTrabajos()
+
+# -------------------------------
+# Trabajo de consolidación
+# -------------------------------
+def copiar_archivo(archivo) -> io.BytesIO:
+    """
+    Copia en memoria de un archivo subido (conserva `name`), para que el trabajo
+    no comparta la posición de lectura con las reejecuciones de la sesión.
+    """
+    copia = io.BytesIO(archivo.getvalue() if hasattr(archivo, 'getvalue') else archivo.read())
+    copia.name = getattr(archivo, 'name', None)
+    return copia
+
+
+def procesar_y_exportar(archivos_liquidacion, archivo_masterdata, formato: str = 'xlsx', cache=None,
+                        huellas=(None, None), max_procesos: int = None, incremental: bool = False,
+                        prefijos=None) -> dict:
+    """
+    Procesa uno o varios archivos de liquidación contra MASTERDATA (ver
+    procesar_archivos y procesar_lote; los comprimidos se expanden con
+    expandir_comprimidos, así que un .zip con varios TXT es un lote), calcula
+    el cubo de análisis y la conciliación con 'Total General' y genera la
+    exportación en `formato` (el cubo se calcula mientras se concilia y exporta,
+    ver GrafoEtapas). `incremental` se aplica con un solo archivo (ver
+    procesar_archivos) y `prefijos` es (deducción, informativos) para la
+    conciliación (por defecto, los configurados; sin prefijos de deducción no se
+    concilia y conciliacion queda en None, ver conciliacion_configurada). Con
+    `cache` se reutilizan y guardan el parsing, MASTERDATA indexado, el cubo y la
+    conciliación por `huellas`; la exportación no se cachea (queda en disco). Devuelve un dict con df_conceptos,
+    df_netos, masterdata_df, resumen_df (None con un solo archivo), masterdata
+    (MasterdataIndexado), cubo (CuboAnalisis), conciliacion (ver conciliar),
+    explorador (ExploradorResultados, con índices perezosos), huellas,
+    exportaciones ({formato: ArchivoExportado}, en disco), archivos (nombres), periodo (el detectado
+    con un solo archivo; en un lote, cada fila trae su PERIODO) y prefijos (los de la conciliación).
+    """
+    from .combinacion import indexar_masterdata
+    from .comprimidos import expandir_comprimidos
+    from .conciliacion import PREFIJOS_DEDUCCION, PREFIJOS_INFORMATIVOS, conciliacion_configurada, conciliar
+    from .cubo import calcular_cubo
+    from .explorador import ExploradorResultados
+    from .exportar import exportar_a_archivo, hojas_de_resumen
+    from .grafo import GrafoEtapas
+    from .lote import _nombre_fuente, periodo_archivo, procesar_lote
+    from .proceso import procesar_archivos
+
+    prefijos = tuple(tuple(p) for p in (prefijos or (PREFIJOS_DEDUCCION, PREFIJOS_INFORMATIVOS)))
+    archivos_liquidacion = expandir_comprimidos(archivos_liquidacion)
+    nombres = [_nombre_fuente(a) for a in archivos_liquidacion]
+    periodo = None
+    if len(archivos_liquidacion) == 1:
+        periodo = periodo_archivo(nombres[0], archivos_liquidacion[0])
+        df_conceptos, df_netos, masterdata_df = procesar_archivos(
+            archivos_liquidacion[0], archivo_masterdata, cache=cache, huellas=huellas, max_procesos=max_procesos,
+            incremental=incremental)
+        resumen_df = None
+    else:
+        df_conceptos, df_netos, masterdata_df, resumen_df = procesar_lote(
+            archivos_liquidacion, archivo_masterdata, cache=cache, huellas=huellas, max_procesos=max_procesos)
+
+    def calcular(clave, funcion):
+        if cache is None or None in huellas:
+            return funcion()
+        return cache.obtener_o_calcular(clave, funcion)
+
+    masterdata = calcular(('masterdata_indexado', huellas[1]), lambda: indexar_masterdata(masterdata_df))
+
+    def generar(conciliacion):
+        return exportar_a_archivo(df_conceptos, df_netos, masterdata, formato,
+                                  hojas_adicionales=hojas_de_resumen(df_conceptos, resumen_df, conciliacion))
+
+    grafo = GrafoEtapas()
+    grafo.agregar('cubo', lambda: calcular(('cubo',) + tuple(huellas),
+                                           lambda: calcular_cubo(df_conceptos, df_netos, masterdata)))
+    if conciliacion_configurada(prefijos[0]):
+        grafo.agregar('conciliacion', lambda: calcular(('conciliacion',) + tuple(huellas) + prefijos,
+                                                       lambda: conciliar(df_conceptos, df_netos, masterdata,
+                                                                         *prefijos)))
+        grafo.agregar('exportacion', generar, depende=['conciliacion'])
+    else:
+        grafo.agregar('exportacion', lambda: generar(None))
+    resultados = grafo.ejecutar()
+    cubo, conciliacion, exportacion = resultados['cubo'], resultados.get('conciliacion'), resultados['exportacion']
+    return {
+        'df_conceptos': df_conceptos,
+        'df_netos': df_netos,
+        'masterdata_df': masterdata_df,
+        'resumen_df': resumen_df,
+        'masterdata': masterdata,
+        'cubo': cubo,
+        'conciliacion': conciliacion,
+        'explorador': ExploradorResultados(df_conceptos, df_netos, masterdata),
+        'huellas': tuple(huellas),
+        'exportaciones': {formato: exportacion},
+        'archivos': nombres,
+        'periodo': periodo,
+        'prefijos': prefijos,
+    }
@@ -0,0 +1,212 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Utilidades de conversión y detección de columnas, sin dependencias de interfaz.
+
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# -------------------------------
+# Conversión de valores
+# -------------------------------
+def to_num(v):
+    """Convierte un valor a número de forma segura"""
+    try:
+        if pd.isna(v) or v == '': 
+            return 0
+        return float(str(v).replace('.', '').replace(',', '.'))
+    except (TypeError, ValueError):
+        return 0
+
+def formatear_fecha_excel(fecha_valor):
+    """
+    Convierte números de fecha de Excel (serial date) a formato dd/mm/yyyy
+    """
+    try:
+        # Si ya es una cadena con formato de fecha, devolverla
+        if isinstance(fecha_valor, str):
+            # Verificar si ya está en formato dd/mm/yyyy
+            if re.match(r'\d{1,2}/\d{1,2}/\d{4}', fecha_valor):
+                return fecha_valor
+        
+        # Si es un número (serial date de Excel)
+        if isinstance(fecha_valor, (int, float)) and not pd.isna(fecha_valor):
+            # Excel cuenta desde 1900-01-01, pero tiene un bug del año bisiesto
+            # Fecha base de Excel: 1900-01-01 = 1
+            fecha_base = datetime(1899, 12, 30)  # Compensar el bug de Excel
+            fecha_convertida = fecha_base + timedelta(days=int(fecha_valor))
+            return fecha_convertida.strftime('%d/%m/%Y')
+        
+        # Si es un objeto datetime
+        if isinstance(fecha_valor, datetime):
+            return fecha_valor.strftime('%d/%m/%Y')
+        
+        # Si es pd.Timestamp
+        if isinstance(fecha_valor, pd.Timestamp):
+            return fecha_valor.strftime('%d/%m/%Y')
+        
+        # Si no se puede convertir, devolver valor original
+        return fecha_valor
+        
+    except Exception:
+        # En caso de error, devolver el valor original
+        return fecha_valor
+
+# -------------------------------
+# Conversión por columnas (vectorizada)
+# -------------------------------
+FECHA_TEXTO_REGEX = r'\d{1,2}/\d{1,2}/\d{4}'
+FECHA_BASE_EXCEL = pd.Timestamp(1899, 12, 30)  # Compensa el bug del año bisiesto de Excel
+# Rango de seriales que se convierten por columnas; fuera de él se usa formatear_fecha_excel
+MAX_SERIAL_VECTORIZADO = 100_000
+_TIPOS_FECHA = [datetime, pd.Timestamp]
+_TIPOS_NUMERO = [int, float, np.int64, np.int32, np.float64, np.float32]
+
+def convertir_importes(serie: pd.Series, por_fila: bool = False):
+    """
+    Convierte importes con formato colombiano (miles '.', decimales ',') en una sola
+    pasada. Los valores que no son texto quedan igual; el texto vacío vale 0 y el que
+    no se puede convertir también vale 0, pero se cuenta.
+    Devuelve (serie_convertida, cantidad_no_convertidos); con `por_fila`, en lugar
+    de la cantidad devuelve la máscara booleana de los no convertidos.
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie, (pd.Series(False, index=serie.index) if por_fila else 0)
+
+    es_texto = serie.str.len().notna()
+    limpio = (serie.str.strip()
+                   .str.replace('.', '', regex=False)
+                   .str.replace(',', '.', regex=False))
+    numeros = pd.to_numeric(limpio, errors='coerce')
+
+    fallidos = es_texto & numeros.isna() & (limpio != '')
+    fallidos = fallidos if por_fila else int(fallidos.sum())
+    numeros = numeros.where(~es_texto | numeros.notna(), 0.0)
+    if es_texto.all():
+        return numeros.astype('float64'), fallidos
+    return serie.where(~es_texto, numeros).infer_objects(), fallidos
+
+def to_num_serie(serie: pd.Series) -> pd.Series:
+    """Versión vectorizada de to_num para una columna completa de texto"""
+    convertida, _ = convertir_importes(serie)
+    return convertida.astype('float64')
+
+def _seriales_a_texto(valores: pd.Series) -> pd.Series:
+    """Seriales de Excel (numéricos, sin nulos) a dd/mm/yyyy; los fuera de rango uno a uno"""
+    dias = pd.to_numeric(valores).astype('float64')
+    en_rango = (dias.abs() < MAX_SERIAL_VECTORIZADO).to_numpy()
+    resultado = pd.Series(index=valores.index, dtype=object)
+    fechas = FECHA_BASE_EXCEL + pd.to_timedelta(dias[en_rango].astype('int64'), unit='D')
+    resultado[en_rango] = fechas.dt.strftime('%d/%m/%Y')
+    if not en_rango.all():
+        resultado[~en_rango] = valores[~en_rango].map(formatear_fecha_excel)
+    return resultado
+
+def formatear_fechas_excel(serie: pd.Series):
+    """
+    Versión por columnas de formatear_fecha_excel: seriales de Excel, datetime y
+    Timestamp pasan a dd/mm/yyyy en bloque; el texto que ya está en dd/mm/yyyy y los
+    vacíos quedan igual. Los demás valores se dejan como estaban y se cuentan.
+    Devuelve (serie_formateada, cantidad_no_convertidos).
+    """
+    presentes = serie.notna()
+
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.dt.strftime('%d/%m/%Y').astype(object).where(presentes, serie), 0
+
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        resultado = serie.astype(object)
+        resultado[presentes] = _seriales_a_texto(serie[presentes])
+    else:
+        # Columna mezclada: se separa por tipo de valor y cada grupo se convierte en bloque
+        resultado = serie.astype(object).copy()
+        tipos = resultado.map(type)
+        es_fecha = (tipos.isin(_TIPOS_FECHA) & presentes).to_numpy()
+        es_numero = (tipos.isin(_TIPOS_NUMERO) & presentes).to_numpy()
+        if es_fecha.any():
+            resultado[es_fecha] = pd.to_datetime(resultado[es_fecha]).dt.strftime('%d/%m/%Y')
+        if es_numero.any():
+            resultado[es_numero] = _seriales_a_texto(resultado[es_numero])
+
+    texto = resultado.where(resultado.map(type) == str)
+    no_convertidos = presentes & ~texto.str.match(FECHA_TEXTO_REGEX).fillna(False).astype(bool)
+    return resultado, int(no_convertidos.sum())
+
+# -------------------------------
+# Tipos compactos
+# -------------------------------
+_MAX_INT32 = np.iinfo('int32').max
+
+def sap_compacto(saps: pd.Series) -> pd.Series:
+    """SAP como entero nullable: Int32 (Int64 solo si algún número no cabe)"""
+    sap = pd.to_numeric(saps, errors='coerce')
+    if sap.notna().any() and sap.abs().max() > _MAX_INT32:
+        return sap.astype('Int64')
+    return sap.astype('Int32')
+
+def concatenar(frames) -> pd.DataFrame:
+    """
+    pd.concat(ignore_index=True) que conserva las columnas categóricas: pd.concat
+    las vuelve object si las categorías difieren entre partes. Las categorías del
+    resultado quedan ordenadas y sin valores que no aparecen.
+    """
+    frames = list(frames)
+    if not frames:
+        return pd.DataFrame()
+    categoricas = list(dict.fromkeys(c for df in frames for c, tipo in df.dtypes.items()
+                                     if isinstance(tipo, pd.CategoricalDtype)))
+    tipos = {}
+    for columna in categoricas:
+        valores = set()
+        for df in frames:
+            if columna in df.columns:
+                serie = df[columna]
+                valores.update(serie.cat.categories if isinstance(serie.dtype, pd.CategoricalDtype)
+                               else serie.dropna().unique())
+        tipos[columna] = pd.CategoricalDtype(sorted(valores, key=str))
+    if tipos:
+        frames = [df.astype({c: t for c, t in tipos.items() if c in df.columns}) for df in frames]
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].reset_index(drop=True)
+    for columna in categoricas:
+        df[columna] = df[columna].cat.remove_unused_categories()
+    return df
+
+# -------------------------------
+# Detección de columnas
+# -------------------------------
+def _normalize(s: str) -> str:
+    """Normaliza una cadena para comparación"""
+    s = s.lower().strip()
+    s = s.replace('á','a').replace('é','e').replace('í','i').replace('ó','o').replace('ú','u')
+    return re.sub(r'[^a-z0-9]', '', s)
+
+CANDIDATOS_SALARIO = [
+    'importe','importebase','salario','salariobase','sueldo','sueldobase',
+    'basico','basicos','basicointegral','remuneracion','remuneraciones','valorbase'
+]
+
+def detectar_columna_salario(columnas):
+    """Columna de salario: 'SALARIO' o la primera cuyo nombre coincide con CANDIDATOS_SALARIO"""
+    if 'SALARIO' in columnas:
+        return 'SALARIO'
+    for col in columnas:
+        key = _normalize(str(col))
+        if any(cand in key for cand in CANDIDATOS_SALARIO):
+            return col
+    return None
+
+def adjuntar_salario(df_merged: pd.DataFrame) -> pd.DataFrame:
+    """Identifica y adjunta la columna de salario automáticamente"""
+    if 'SALARIO' in df_merged.columns:
+        return df_merged
+
+    elegido = detectar_columna_salario(df_merged.columns)
+
+    if elegido:
+        # Convertir a numérico si es texto
+        df_merged['SALARIO'], _ = convertir_importes(df_merged[elegido])
+    else:
+        df_merged['SALARIO'] = pd.NA
+
+    return df_merged
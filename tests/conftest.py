@@ -0,0 +1,34 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Configuración común de las pruebas: datos de ejemplo y directorios aislados.
+#
+# tests/datos trae una liquidación de 40 empleados (con preámbulo y algunas
+# líneas CRLF) y un MASTERDATA sin 6 de ellos, generados con
+# bench/generar_datos.py. esperado.xlsx es la salida de crear_excel_descarga de
+# la versión original de app.py (commit 'baseline') para esos dos archivos.
+
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+DATOS = Path(__file__).resolve().parent / 'datos'
+
+
+@pytest.fixture
+def datos() -> Path:
+    return DATOS
+
+
+@pytest.fixture(autouse=True)
+def directorios_aislados(tmp_path, monkeypatch):
+    """Estado incremental, snapshots, histórico y log de rendimiento en un temporal por prueba"""
+    from liquidacion import historico, incremental, masterdata, rendimiento
+
+    monkeypatch.setattr(incremental, 'DIR_INCREMENTAL', tmp_path / 'incremental')
+    monkeypatch.setattr(masterdata, 'DIR_SNAPSHOTS', tmp_path / 'masterdata')
+    monkeypatch.setattr(historico, 'RUTA_HISTORICO', tmp_path / 'historico.sqlite')
+    monkeypatch.setattr(rendimiento, 'LOG_RENDIMIENTO', '')
+    return tmp_path
@@ -0,0 +1,17 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Humo de bench/benchmark.py: todas las etapas corren sobre los datos de 1k.
+
+import sys
+
+from conftest import RAIZ
+
+# Como al ejecutar el script: los procesos hijos importan el módulo 'benchmark'
+sys.path.insert(0, str(RAIZ / 'bench'))
+
+import benchmark  # noqa: E402
+
+
+def test_todas_las_etapas(tmp_path):
+    resultados = benchmark.medir(['1k'], list(benchmark.ETAPAS), guardar=False, directorio_datos=tmp_path)
+    assert [r['etapa'] for r in resultados] == list(benchmark.ETAPAS)
+    assert all(r['filas'] > 0 for r in resultados)
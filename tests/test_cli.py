@@ -0,0 +1,30 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Línea de comandos: nombre de salida por formato y opciones sin importar el motor.
+
+import subprocess
+import sys
+import zipfile
+
+import pytest
+
+from liquidacion import EXTENSION_EXPORTACION
+from liquidacion.cli import main
+
+from conftest import RAIZ
+
+
+@pytest.mark.parametrize('formato', ['xlsx', 'csv', 'parquet'])
+def test_salida_por_defecto(datos, tmp_path, monkeypatch, formato):
+    monkeypatch.chdir(tmp_path)
+    assert main(['procesar', str(datos / 'liquidacion.txt'), str(datos / 'masterdata.xlsx'), '-f', formato,
+                 '-q', '--sin-snapshot']) == 0
+    salida, = tmp_path.glob('JMC_Nomina2025_*')
+    assert salida.suffix == f'.{EXTENSION_EXPORTACION[formato]}'
+    if formato != 'xlsx':
+        assert sorted(zipfile.ZipFile(salida).namelist()) == [f'Netos.{formato}', f'Preno_Convertida.{formato}']
+
+
+def test_ayuda_sin_pandas():
+    codigo = "import sys, liquidacion.cli as c; c.crear_parser(); print('pandas' in sys.modules)"
+    salida = subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+    assert salida.stdout.strip() == 'False'
@@ -0,0 +1,86 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Archivos comprimidos: un .gz, .zip o .zst (por ruta o subido) debe dar lo mismo
+# que el TXT sin comprimir, y un .zip con varios TXT se expande a uno por TXT.
+
+import gzip
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from liquidacion import ErrorArchivoLiquidacion, escanear_liquidacion, expandir_comprimidos, leer_masterdata
+
+
+def comprimir(contenido: bytes, formato: str) -> bytes:
+    if formato == 'gz':
+        return gzip.compress(contenido)
+    if formato == 'zst':
+        return pytest.importorskip('zstandard').ZstdCompressor().compress(contenido)
+    destino = io.BytesIO()
+    with zipfile.ZipFile(destino, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('liquidacion.txt', contenido)
+    return destino.getvalue()
+
+
+def verificar_igual(actual, esperado):
+    for df_actual, df_esperado in zip(actual, esperado):
+        pd.testing.assert_frame_equal(df_actual, df_esperado)
+
+
+@pytest.mark.parametrize('formato', ['gz', 'zip', 'zst'])
+@pytest.mark.parametrize('subido', [False, True])
+def test_paridad_con_el_txt(datos, tmp_path, formato, subido):
+    contenido = (datos / 'liquidacion.txt').read_bytes()
+    comprimido = comprimir(contenido, formato)
+    if subido:
+        fuente = io.BytesIO(comprimido)
+        fuente.name = f'liquidacion.txt.{formato}'
+    else:
+        fuente = tmp_path / f'liquidacion.txt.{formato}'
+        fuente.write_bytes(comprimido)
+
+    [archivo] = expandir_comprimidos([fuente])
+    assert archivo.name == 'liquidacion.txt'
+    assert archivo.size in (len(contenido), None)
+    verificar_igual(escanear_liquidacion(archivo), escanear_liquidacion(datos / 'liquidacion.txt'))
+
+
+def test_zip_con_varios_txt(datos, tmp_path):
+    contenido = (datos / 'liquidacion.txt').read_bytes()
+    ruta = tmp_path / 'lote.zip'
+    with zipfile.ZipFile(ruta, 'w') as z:
+        z.writestr('febrero/liq_2025-02.txt', contenido)
+        z.writestr('liq_2025-01.txt', contenido)
+        z.writestr('__MACOSX/._liq_2025-01.txt', b'')
+        z.writestr('leeme.pdf', b'%PDF')
+
+    archivos = expandir_comprimidos([ruta, datos / 'liquidacion.txt'])
+    assert [a.name for a in archivos] == ['liq_2025-02.txt', 'liq_2025-01.txt', 'liquidacion.txt']
+    verificar_igual(escanear_liquidacion(archivos[1]), escanear_liquidacion(datos / 'liquidacion.txt'))
+
+
+def test_zip_invalido_o_sin_txt(tmp_path):
+    invalido = tmp_path / 'invalido.zip'
+    invalido.write_bytes(b'no es un zip')
+    with pytest.raises(ErrorArchivoLiquidacion, match='invalido.zip no es un .zip válido'):
+        expandir_comprimidos([invalido])
+
+    vacio = tmp_path / 'vacio.zip'
+    with zipfile.ZipFile(vacio, 'w') as z:
+        z.writestr('leeme.pdf', b'%PDF')
+    with pytest.raises(ErrorArchivoLiquidacion, match='vacio.zip no contiene archivos .txt'):
+        expandir_comprimidos([vacio])
+
+
+@pytest.mark.parametrize('formato', ['gz', 'zip'])
+def test_masterdata_comprimido(datos, tmp_path, formato):
+    contenido = (datos / 'masterdata.xlsx').read_bytes()
+    ruta = tmp_path / f'masterdata.xlsx.{formato}'
+    if formato == 'gz':
+        ruta.write_bytes(gzip.compress(contenido))
+    else:
+        ruta = tmp_path / 'masterdata.zip'
+        with zipfile.ZipFile(ruta, 'w') as z:
+            z.writestr('masterdata.xlsx', contenido)
+    pd.testing.assert_frame_equal(leer_masterdata(ruta), leer_masterdata(datos / 'masterdata.xlsx'))
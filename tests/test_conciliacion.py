@@ -0,0 +1,63 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Conciliación con 'Total General': solo con prefijos de deducción configurados;
+# sin ellos se omite y se avisa.
+
+import io
+
+import pandas as pd
+import pytest
+
+from liquidacion import (
+    ErrorLiquidacion, conciliacion_configurada, conciliar, escanear_liquidacion, incidencias, leer_masterdata,
+    procesar_y_exportar, resumen_conciliacion,
+)
+from liquidacion.cli import main
+
+# Esquema de códigos de los datos de prueba (bench/generar_datos.py)
+PREFIJOS = (('Z1', 'Z2', '2'), ('/',))
+
+
+@pytest.fixture
+def resultado(datos):
+    return escanear_liquidacion(datos / 'liquidacion.txt')
+
+
+def test_cuadra_con_los_prefijos(datos, resultado):
+    conciliacion = conciliar(*resultado, leer_masterdata(datos / 'masterdata.xlsx'), *PREFIJOS)
+    resumen = resumen_conciliacion(conciliacion)
+    assert resumen['cuadra'] == 40
+    assert resumen['diferencia'] == resumen['sin_total_general'] == resumen['sin_conceptos'] == 0
+    assert resumen['sin_masterdata'] == len(incidencias(conciliacion)) > 0
+
+
+def test_detecta_diferencias(resultado):
+    df_conceptos, df_netos = resultado
+    sap = df_netos['SAP'].iloc[0]
+    df_netos = df_netos.assign(Valor=df_netos['Valor'].where(df_netos['SAP'] != sap, df_netos['Valor'] + 100))
+    tabla = incidencias(conciliar(df_conceptos, df_netos, None, *PREFIJOS))
+    assert tabla['SAP'].tolist() == [sap]
+    assert tabla['DIFERENCIA'].iloc[0] == pytest.approx(-100)
+
+
+def test_sin_prefijos_no_concilia(resultado):
+    assert not conciliacion_configurada()
+    assert not conciliacion_configurada(())
+    with pytest.raises(ErrorLiquidacion, match='prefijos de deducción'):
+        conciliar(*resultado)
+
+
+def test_trabajo_sin_prefijos(datos):
+    resultado = procesar_y_exportar([datos / 'liquidacion.txt'], datos / 'masterdata.xlsx')
+    assert resultado['conciliacion'] is None
+    hojas = pd.read_excel(io.BytesIO(resultado['exportaciones']['xlsx'].leer()), sheet_name=None)
+    assert 'Conciliacion' not in hojas
+
+
+@pytest.mark.parametrize('prefijos', [[], ['--prefijos-deduccion', 'Z1,Z2,2', '--prefijos-informativos', '/']])
+def test_cli(datos, tmp_path, capsys, prefijos):
+    salida = tmp_path / 'salida.xlsx'
+    assert main(['procesar', str(datos / 'liquidacion.txt'), str(datos / 'masterdata.xlsx'), '-o', str(salida),
+                 '-q', '--sin-snapshot'] + prefijos) == 0
+    hojas = pd.read_excel(salida, sheet_name=None)
+    assert ('Conciliacion' in hojas) == bool(prefijos)
+    assert ('no se concilia' in capsys.readouterr().err) != bool(prefijos)
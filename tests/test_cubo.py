@@ -0,0 +1,78 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Cubo de análisis: los totales y desgloses deben coincidir con agrupar
+# directamente las filas de conceptos y netos cruzadas con MASTERDATA.
+
+import pandas as pd
+import pytest
+
+from liquidacion import calcular_cubo, escanear_liquidacion, leer_masterdata
+from liquidacion.cubo import DIMENSIONES, SIN_DATO
+
+
+@pytest.fixture
+def resultado(datos):
+    df_conceptos, df_netos = escanear_liquidacion(datos / 'liquidacion.txt')
+    return df_conceptos, df_netos, leer_masterdata(datos / 'masterdata.xlsx')
+
+
+def con_dimensiones(df: pd.DataFrame, masterdata_df: pd.DataFrame) -> pd.DataFrame:
+    """Filas de `df` con REGIONAL, CE_COSTE y NIVEL sacados de MASTERDATA a mano"""
+    extra = masterdata_df.drop_duplicates('Nº pers.').set_index('Nº pers.')[list(DIMENSIONES.values())]
+    extra = extra.rename(columns={columna: dimension for dimension, columna in DIMENSIONES.items()})
+    filas = df.astype({'SAP': 'int64'}).join(extra.astype(object), on='SAP')
+    return filas.fillna({dimension: SIN_DATO for dimension in DIMENSIONES})
+
+
+def test_totales(resultado):
+    df_conceptos, df_netos, masterdata_df = resultado
+    totales = calcular_cubo(df_conceptos, df_netos, masterdata_df).totales()
+    assert totales['valor'] == pytest.approx(df_conceptos['VALOR'].sum())
+    assert totales['cantidad'] == pytest.approx(df_conceptos['CANTIDAD'].sum())
+    assert totales['filas_conceptos'] == len(df_conceptos)
+    assert totales['codigos'] == df_conceptos['CÓDIGO'].nunique()
+    assert totales['empleados'] == df_netos['SAP'].nunique()
+    assert totales['neto'] == pytest.approx(df_netos['Valor'].sum())
+
+
+def test_sin_masterdata(resultado):
+    df_conceptos, df_netos, masterdata_df = resultado
+    cubo = calcular_cubo(df_conceptos, df_netos, masterdata_df)
+    faltantes = set(df_netos['SAP']) - set(masterdata_df['Nº pers.'])
+    assert SIN_DATO in cubo.valores('REGIONAL')
+    assert cubo.totales(REGIONAL=[SIN_DATO])['empleados'] == len(faltantes)
+
+
+@pytest.mark.parametrize('dimension', list(DIMENSIONES))
+def test_netos_por_dimension(resultado, dimension):
+    df_netos, masterdata_df = resultado[1:]
+    filas = con_dimensiones(df_netos, masterdata_df)
+    esperado = filas.groupby(dimension)['Valor'].sum()
+    actual = calcular_cubo(*resultado).netos_por(dimension).set_index(dimension)['NETO']
+    assert actual.to_dict() == pytest.approx(esperado.to_dict())
+
+
+def test_desglose_filtrado(resultado):
+    df_conceptos, _, masterdata_df = resultado
+    cubo = calcular_cubo(*resultado)
+    regional = cubo.valores('REGIONAL')[0]
+    filas = con_dimensiones(df_conceptos, masterdata_df)
+    filas = filas[filas['REGIONAL'] == regional]
+    esperado = filas.groupby('CÓDIGO', observed=True).agg(VALOR=('VALOR', 'sum'), EMPLEADOS=('SAP', 'nunique'))
+
+    actual = cubo.conceptos_por('CÓDIGO', REGIONAL=[regional]).set_index('CÓDIGO')
+    assert actual['VALOR'].to_dict() == pytest.approx(esperado['VALOR'].to_dict())
+    assert actual['EMPLEADOS'].to_dict() == esperado['EMPLEADOS'].to_dict()
+    assert actual['CONCEPTO'].notna().all()
+
+    codigo = actual.index[0]
+    totales = cubo.totales(REGIONAL=[regional], CÓDIGO=[codigo])
+    assert totales['valor'] == pytest.approx(esperado.loc[codigo, 'VALOR'])
+    assert totales['empleados'] == filas['SAP'].nunique()
+
+
+def test_vacio(resultado):
+    masterdata_df = resultado[2]
+    cubo = calcular_cubo(None, None, masterdata_df)
+    assert cubo.totales() == {'valor': 0.0, 'cantidad': 0.0, 'filas_conceptos': 0, 'codigos': 0,
+                              'empleados': 0, 'neto': 0.0}
+    assert cubo.valores('REGIONAL') == []
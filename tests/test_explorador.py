@@ -0,0 +1,66 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Filtros del explorador: se combinan con Y, los valores desconocidos no
+# devuelven filas y la cédula se compara como número entero.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from liquidacion import ExploradorResultados, escanear_liquidacion, leer_masterdata
+
+
+@pytest.fixture
+def resultado(datos):
+    df_conceptos, df_netos = escanear_liquidacion(datos / 'liquidacion.txt')
+    return df_conceptos, df_netos, leer_masterdata(datos / 'masterdata.xlsx')
+
+
+def explorador_con(resultado, masterdata_df):
+    df_conceptos, df_netos, _ = resultado
+    return ExploradorResultados(df_conceptos, df_netos, masterdata_df)
+
+
+def saps(hoja, **consulta) -> set:
+    return set(hoja.df['SAP'].iloc[hoja.posiciones(**consulta)].tolist())
+
+
+def test_cedula_numerica_con_vacios(resultado):
+    masterdata_df = resultado[2].copy()
+    cedulas = pd.to_numeric(masterdata_df['Número ID'])
+    cedulas.iloc[1] = np.nan  # una cédula vacía deja la columna en float
+    masterdata_df['Número ID'] = cedulas
+    hoja = explorador_con(resultado, masterdata_df)['Netos']
+    fila = masterdata_df.iloc[0]
+    assert saps(hoja, cedula=[str(int(fila['Número ID']))]) == {fila['Nº pers.']}
+
+
+def test_sin_columna_cedula(resultado):
+    explorador = explorador_con(resultado, resultado[2].drop(columns=['Número ID']))
+    hoja = explorador['Netos']
+    assert not explorador.filtra_cedula()
+    assert len(hoja.posiciones(cedula=['123'])) == len(hoja)
+
+
+def test_valores_desconocidos(resultado):
+    explorador = explorador_con(resultado, resultado[2])
+    assert len(explorador['Netos'].posiciones(regional=['NoExiste'])) == 0
+    assert len(explorador['Preno_Convertida'].posiciones(codigo=['X999'])) == 0
+
+
+def test_sap_y_cedula_se_intersectan(resultado):
+    masterdata_df = resultado[2]
+    hoja = explorador_con(resultado, masterdata_df)['Netos']
+    primero, segundo = masterdata_df.iloc[0], masterdata_df.iloc[1]
+    assert saps(hoja, sap=[primero['Nº pers.']], cedula=[segundo['Número ID']]) == set()
+    assert saps(hoja, sap=[primero['Nº pers.']], cedula=[primero['Número ID']]) == {primero['Nº pers.']}
+
+
+def test_regional_y_codigo(resultado):
+    masterdata_df = resultado[2]
+    explorador = explorador_con(resultado, masterdata_df)
+    regional = explorador.regionales()[0]
+    de_regional = set(masterdata_df.loc[masterdata_df['División de personal'] == regional, 'Nº pers.'])
+    hoja = explorador['Preno_Convertida']
+    esperado = set(hoja.df.loc[hoja.df['CÓDIGO'] == 'Y001', 'SAP']) & de_regional
+    assert esperado
+    assert saps(hoja, regional=[regional], codigo=['Y001']) == esperado
@@ -0,0 +1,70 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Exportación: las hojas que no caben en Excel se parten en Nombre, Nombre_2, ...
+# y las salidas CSV y Parquet traen en el .zip las mismas hojas que el Excel.
+
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from liquidacion import (
+    ErrorExportacion, escanear_liquidacion, exportar_a_archivo, exportar_resultados, leer_masterdata,
+    preparar_hojas,
+)
+from liquidacion import exportar
+
+
+@pytest.fixture
+def resultado(datos):
+    df_conceptos, df_netos = escanear_liquidacion(datos / 'liquidacion.txt')
+    return df_conceptos, df_netos, leer_masterdata(datos / 'masterdata.xlsx')
+
+
+def test_hojas_partidas(resultado, datos, monkeypatch):
+    monkeypatch.setattr(exportar, 'MAX_FILAS_HOJA', 101)
+    hojas = pd.read_excel(exportar_resultados(*resultado), sheet_name=None)
+    esperado = pd.read_excel(datos / 'esperado.xlsx', sheet_name=None)
+    assert list(hojas) == ['Netos', 'Preno_Convertida', 'Preno_Convertida_2', 'Preno_Convertida_3']
+    assert [len(hojas[h]) for h in list(hojas)[1:]] == [100, 100, len(esperado['Preno_Convertida']) - 200]
+    partes = pd.concat([hojas[h] for h in list(hojas)[1:]], ignore_index=True)
+    pd.testing.assert_frame_equal(partes, esperado['Preno_Convertida'], check_dtype=False)
+    pd.testing.assert_frame_equal(hojas['Netos'], esperado['Netos'], check_dtype=False)
+
+
+def test_hoja_justa_no_se_parte(resultado, monkeypatch):
+    monkeypatch.setattr(exportar, 'MAX_FILAS_HOJA', len(resultado[1]) + 1)
+    hojas = pd.read_excel(exportar_resultados(*resultado), sheet_name=None)
+    assert 'Netos_2' not in hojas
+    assert len(hojas['Netos']) == len(resultado[1])
+
+
+@pytest.mark.parametrize('formato', ['csv', 'parquet'])
+def test_zip_por_hoja(resultado, formato):
+    adicional = pd.DataFrame({'CÓDIGO': ['Y020'], 'VALOR': [1.5]})
+    salida = exportar_resultados(*resultado, formato=formato, hojas_adicionales={'Resumen': adicional})
+    esperado = preparar_hojas(*resultado)
+    esperado['Resumen'] = adicional
+    with zipfile.ZipFile(salida) as z:
+        assert z.namelist() == [f'{nombre}.{formato}' for nombre in esperado]
+        for nombre, df_esperado in esperado.items():
+            contenido = io.BytesIO(z.read(f'{nombre}.{formato}'))
+            actual = pd.read_csv(contenido) if formato == 'csv' else pd.read_parquet(contenido)
+            assert list(actual.columns) == list(df_esperado.columns)
+            assert len(actual) == len(df_esperado)
+            if 'VALOR' in actual.columns:
+                assert actual['VALOR'].sum() == pytest.approx(df_esperado['VALOR'].sum())
+
+
+def test_archivo_temporal(resultado):
+    exportado = exportar_a_archivo(*resultado, formato='csv')
+    assert exportado.ruta.suffix == '.zip'
+    with exportado.abrir() as f:
+        assert zipfile.ZipFile(f).namelist() == ['Netos.csv', 'Preno_Convertida.csv']
+    exportado.borrar()
+    assert not exportado.ruta.exists()
+
+
+def test_formato_no_soportado(resultado):
+    with pytest.raises(ErrorExportacion, match='json'):
+        exportar_resultados(*resultado, formato='json')
@@ -0,0 +1,73 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Fuentes de entrada: las cadenas son rutas en todo el motor, el contenido ya
+# decodificado va por texto= y los errores de lectura quedan en ErrorLiquidacion.
+
+import io
+
+import pandas as pd
+import pytest
+
+from liquidacion import (
+    ErrorArchivoLiquidacion, ErrorMasterdata, cargar_liquidacion, escanear_liquidacion, hash_archivo,
+    leer_masterdata, procesar_archivos,
+)
+
+
+def test_cadena_es_ruta(datos):
+    por_cadena = procesar_archivos(str(datos / 'liquidacion.txt'), str(datos / 'masterdata.xlsx'), snapshots=False)
+    por_ruta = procesar_archivos(datos / 'liquidacion.txt', datos / 'masterdata.xlsx', snapshots=False)
+    for actual, esperado in zip(por_cadena, por_ruta):
+        pd.testing.assert_frame_equal(actual, esperado)
+
+
+def test_escanear_cadena_es_ruta(datos):
+    por_cadena = escanear_liquidacion(str(datos / 'liquidacion.txt'))
+    por_texto = escanear_liquidacion(texto=(datos / 'liquidacion.txt').read_bytes().decode('latin-1'))
+    for actual, esperado in zip(por_cadena, por_texto):
+        pd.testing.assert_frame_equal(actual, esperado)
+
+
+def test_contenido_como_ruta(datos):
+    texto = (datos / 'liquidacion.txt').read_bytes().decode('latin-1')
+    with pytest.raises(ErrorArchivoLiquidacion, match='texto='):
+        cargar_liquidacion(texto)
+
+
+def test_liquidacion_inexistente(tmp_path):
+    with pytest.raises(ErrorArchivoLiquidacion):
+        cargar_liquidacion(str(tmp_path / 'no_existe.txt'))
+
+
+def test_hash_archivo_inexistente(tmp_path):
+    with pytest.raises(ErrorArchivoLiquidacion, match='no_existe.txt'):
+        hash_archivo(str(tmp_path / 'no_existe.txt'))
+    with pytest.raises(ErrorMasterdata):
+        hash_archivo(tmp_path / 'no_existe.xlsx', ErrorMasterdata)
+
+
+def test_hash_archivo_mismo_contenido(datos):
+    ruta = datos / 'liquidacion.txt'
+    archivo = io.BytesIO(ruta.read_bytes())
+    assert hash_archivo(ruta) == hash_archivo(str(ruta)) == hash_archivo(archivo) == hash_archivo(ruta.read_bytes())
+
+
+@pytest.mark.parametrize('extension', ['xlsx', 'csv'])
+def test_masterdata_sin_llave_lista_todo_el_encabezado(datos, tmp_path, extension):
+    masterdata_df = pd.read_excel(datos / 'masterdata.xlsx').drop(columns=['Nº pers.'])
+    ruta = tmp_path / f'masterdata.{extension}'
+    if extension == 'csv':
+        masterdata_df.to_csv(ruta, index=False)
+    else:
+        masterdata_df.to_excel(ruta, index=False)
+    with pytest.raises(ErrorMasterdata) as error:
+        leer_masterdata(ruta)
+    assert error.value.columnas == list(masterdata_df.columns)
+
+
+def test_texto_fuera_de_latin1(datos):
+    texto = (datos / 'liquidacion.txt').read_bytes().decode('latin-1')
+    linea = texto.count('\n', 0, texto.index('MARTA')) + 1
+    with pytest.raises(ErrorArchivoLiquidacion, match=f"'Ł' en la línea {linea}"):
+        escanear_liquidacion(texto=texto.replace('MARTA', 'ŁMARTA', 1))
+    with pytest.raises(ErrorArchivoLiquidacion):
+        procesar_archivos(None, datos / 'masterdata.xlsx', snapshots=False, texto='Nombre Łukasz\n')
@@ -0,0 +1,65 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Grafo de etapas: cada etapa recibe los resultados de sus dependencias, las
+# independientes se solapan y el primer error se relanza sin lanzar más etapas.
+
+import contextvars
+import threading
+
+import pytest
+
+from liquidacion import GrafoEtapas
+
+
+@pytest.mark.parametrize('max_hilos', [1, 4])
+def test_dependencias(max_hilos):
+    grafo = GrafoEtapas(max_hilos=max_hilos)
+    grafo.agregar('a', lambda: 2)
+    grafo.agregar('b', lambda: 3)
+    grafo.agregar('suma', lambda a, b: a + b, depende=('a', 'b'))
+    grafo.agregar('doble', lambda suma: suma * 2, depende=('suma',))
+    resultados = grafo.ejecutar()
+    assert resultados == {'a': 2, 'b': 3, 'suma': 5, 'doble': 10}
+    assert list(resultados) == ['a', 'b', 'suma', 'doble']
+
+
+def test_independientes_se_solapan():
+    """Dos etapas que se esperan entre sí solo terminan si corren a la vez"""
+    barrera = threading.Barrier(2, timeout=5)
+    grafo = GrafoEtapas(max_hilos=2)
+    grafo.agregar('a', lambda: barrera.wait() is not None)
+    grafo.agregar('b', lambda: barrera.wait() is not None)
+    assert grafo.ejecutar() == {'a': True, 'b': True}
+
+
+def test_contexto_de_quien_ejecuta():
+    """Las etapas ven el contexto del hilo que ejecuta el grafo (etapas medidas y avance)"""
+    variable = contextvars.ContextVar('ejecucion')
+    variable.set('corrida-1')
+    grafo = GrafoEtapas(max_hilos=2)
+    grafo.agregar('a', variable.get)
+    grafo.agregar('b', variable.get)
+    assert grafo.ejecutar() == {'a': 'corrida-1', 'b': 'corrida-1'}
+
+
+@pytest.mark.parametrize('max_hilos', [1, 4])
+def test_error_detiene_las_dependientes(max_hilos):
+    ejecutadas = []
+
+    def falla():
+        raise ValueError('falló la lectura')
+
+    grafo = GrafoEtapas(max_hilos=max_hilos)
+    grafo.agregar('lectura', falla)
+    grafo.agregar('otra', lambda: ejecutadas.append('otra'))
+    grafo.agregar('hojas', lambda lectura: ejecutadas.append('hojas'), depende=('lectura',))
+    with pytest.raises(ValueError, match='falló la lectura'):
+        grafo.ejecutar()
+    assert 'hojas' not in ejecutadas
+
+
+def test_agregar_validaciones():
+    grafo = GrafoEtapas(max_hilos=2).agregar('a', lambda: 1)
+    with pytest.raises(ValueError, match='ya está'):
+        grafo.agregar('a', lambda: 1)
+    with pytest.raises(ValueError, match='no agregadas: b'):
+        grafo.agregar('c', lambda b: b, depende=('b',))
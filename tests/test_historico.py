@@ -0,0 +1,86 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Histórico por período: las corridas se identifican por su contenido, no por el
+# nombre del archivo, y las comparaciones consultan la base.
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from liquidacion import ErrorHistorico, HistoricoNomina, escanear_liquidacion, leer_masterdata
+
+
+@pytest.fixture
+def historico(tmp_path) -> HistoricoNomina:
+    return HistoricoNomina(tmp_path / 'historico.sqlite')
+
+
+@pytest.fixture
+def resultado(datos):
+    return escanear_liquidacion(datos / 'liquidacion.txt')
+
+
+def otro_contenido(df_conceptos: pd.DataFrame, df_netos: pd.DataFrame):
+    """El mismo resultado sin el primer empleado (otro archivo, mismo nombre)"""
+    sap = df_netos['SAP'].iloc[0]
+    return df_conceptos[df_conceptos['SAP'] != sap], df_netos[df_netos['SAP'] != sap]
+
+
+def test_mismo_nombre_distinto_contenido(historico, resultado):
+    historico.registrar(*resultado, periodo='2025-01', archivo='liquidacion.txt')
+    historico.registrar(*otro_contenido(*resultado), periodo='2025-01', archivo='liquidacion.txt')
+    corridas = historico.corridas()
+    assert len(corridas) == 2
+    assert corridas['huella'].nunique() == 2
+    assert corridas['netos'].sum() == len(resultado[1]) * 2 - 1
+
+
+def test_mismo_contenido_reemplaza(historico, resultado, datos):
+    historico.registrar(*resultado, periodo='2025-01', archivo='liquidacion.txt')
+    texto = (datos / 'liquidacion.txt').read_bytes().decode('latin-1')
+    historico.registrar(*escanear_liquidacion(texto=texto), periodo='2025-01', archivo='subido.txt')
+    corridas = historico.corridas()
+    assert corridas['archivo'].tolist() == ['subido.txt']
+
+
+def test_version_corregida(historico, resultado):
+    historico.registrar(*resultado, periodo='2025-01', archivo='liquidacion.txt')
+    historico.registrar(*otro_contenido(*resultado), periodo='2025-01', archivo='liquidacion.txt', reemplazar=True)
+    corridas = historico.corridas()
+    assert len(corridas) == 1
+    assert corridas['netos'].iloc[0] == len(resultado[1]) - 1
+
+
+def test_eliminar_por_huella(historico, resultado):
+    historico.registrar(*resultado, periodo='2025-01', archivo='liquidacion.txt')
+    corridas = historico.registrar(*otro_contenido(*resultado), periodo='2025-01', archivo='liquidacion.txt')
+    historico.eliminar('2025-01', huella=corridas['huella'].iloc[0])
+    assert historico.corridas()['netos'].tolist() == [len(resultado[1])]
+
+
+def test_sin_periodo(historico, resultado):
+    with pytest.raises(ErrorHistorico, match='liquidacion.txt'):
+        historico.registrar(*resultado)
+
+
+def test_comparacion_periodos(historico, resultado, datos):
+    masterdata_df = leer_masterdata(datos / 'masterdata.xlsx')
+    df_conceptos, df_netos = resultado
+    historico.registrar(df_conceptos, df_netos, masterdata_df, periodo='2025-01')
+    sap = df_netos['SAP'].iloc[0]
+    df_netos = df_netos.assign(Valor=df_netos['Valor'].where(df_netos['SAP'] != sap, df_netos['Valor'] * 2))
+    codigo = df_conceptos['CÓDIGO'].iloc[0]
+    historico.registrar(df_conceptos[df_conceptos['CÓDIGO'] != codigo], df_netos, masterdata_df, periodo='2025-02')
+
+    assert historico.periodos() == ['2025-02', '2025-01']
+    assert historico.variacion_netos('2025-01', '2025-02', 10)['SAP'].tolist() == [sap]
+    cambios = historico.cambios_codigos('2025-01', '2025-02')
+    assert cambios[['CÓDIGO', 'CAMBIO']].values.tolist() == [[codigo, 'faltante']]
+    assert historico.variacion_empleados('2025-01', '2025-02')['VARIACION'].eq(0).all()
+
+
+def test_indices(historico, resultado):
+    historico.registrar(*resultado, periodo='2025-01')
+    with sqlite3.connect(historico.ruta) as conexion:
+        indices = {fila[0] for fila in conexion.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'conceptos_corrida_sap', 'conceptos_codigo', 'netos_corrida_sap'} <= indices
@@ -0,0 +1,94 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Reproceso incremental: el estado es del mismo archivo (ruta y período, o
+# encabezado si se sube), nunca del nombre, y solo se usa si se pide.
+
+import io
+import os
+import shutil
+
+import pandas as pd
+
+from liquidacion import borrar_estados, cargar_liquidacion, escanear_liquidacion
+from liquidacion import incremental
+
+
+def corregir_un_empleado(datos: bytes) -> bytes:
+    """Cambia un importe del segundo empleado (el bloque de un solo SAP)"""
+    inicio = datos.index('Núm. Personal'.encode('latin-1'), datos.index('Núm. Personal'.encode('latin-1')) + 1)
+    linea = datos.index(b'\n', datos.index(b',', inicio))
+    return datos[:linea - 1] + (b'9' if datos[linea - 1:linea] != b'9' else b'8') + datos[linea:]
+
+
+def estados():
+    directorio = incremental.DIR_INCREMENTAL
+    return sorted(os.listdir(directorio)) if directorio.is_dir() else []
+
+
+def test_desactivado_por_defecto(datos):
+    df_conceptos, _ = cargar_liquidacion(datos / 'liquidacion.txt')
+    assert df_conceptos.attrs.get('cambios_sap') is None
+    assert estados() == []
+
+
+def test_version_corregida(datos, tmp_path):
+    ruta = tmp_path / 'liquidacion.txt'
+    shutil.copy(datos / 'liquidacion.txt', ruta)
+    df_conceptos, _ = cargar_liquidacion(ruta, incremental=True)
+    assert df_conceptos.attrs['cambios_sap'] is None
+
+    ruta.write_bytes(corregir_un_empleado(ruta.read_bytes()))
+    df_conceptos, df_netos = cargar_liquidacion(ruta, incremental=True)
+    assert df_conceptos.attrs['cambios_sap'] == {'SAP': [10001], 'CAMBIO': ['modificado']}
+    assert df_conceptos.attrs['bloques_reprocesados'] == 1
+    esperado_conceptos, esperado_netos = escanear_liquidacion(ruta)
+    pd.testing.assert_frame_equal(df_conceptos, esperado_conceptos, check_dtype=False)
+    pd.testing.assert_frame_equal(df_netos, esperado_netos, check_dtype=False)
+
+
+def test_mismo_nombre_en_otro_directorio(datos, tmp_path):
+    """Dos archivos distintos con el mismo nombre no son versiones uno del otro"""
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    original = (datos / 'liquidacion.txt').read_bytes()
+    (tmp_path / 'a' / 'liquidacion.txt').write_bytes(original)
+    (tmp_path / 'b' / 'liquidacion.txt').write_bytes(corregir_un_empleado(original))
+
+    cargar_liquidacion(tmp_path / 'a' / 'liquidacion.txt', incremental=True)
+    df_conceptos, _ = cargar_liquidacion(tmp_path / 'b' / 'liquidacion.txt', incremental=True)
+    assert df_conceptos.attrs['cambios_sap'] is None
+    assert len(estados()) == 2
+
+
+def test_subido_con_otro_nombre(datos):
+    """Los archivos subidos se reconocen por el encabezado, no por el nombre"""
+    original = (datos / 'liquidacion.txt').read_bytes()
+    primero = io.BytesIO(original)
+    primero.name = 'liquidacion.txt'
+    cargar_liquidacion(primero, incremental=True)
+
+    corregido = io.BytesIO(corregir_un_empleado(original))
+    corregido.name = 'liquidacion_v2.txt'
+    df_conceptos, _ = cargar_liquidacion(corregido, incremental=True)
+    assert df_conceptos.attrs['cambios_sap'] == {'SAP': [10001], 'CAMBIO': ['modificado']}
+
+
+def test_subido_sin_relacion_con_el_estado(datos):
+    """Mismo nombre y encabezado pero otros empleados: se parsea todo y no se compara"""
+    original = (datos / 'liquidacion.txt').read_bytes()
+    primero = io.BytesIO(original)
+    primero.name = 'liquidacion.txt'
+    cargar_liquidacion(primero, incremental=True)
+
+    cabecera = 'Núm. Personal.......'.encode('latin-1')
+    otro = io.BytesIO(original.replace(cabecera + b'100', cabecera + b'900'))
+    otro.name = 'liquidacion.txt'
+    df_conceptos, _ = cargar_liquidacion(otro, incremental=True)
+    assert df_conceptos.attrs['cambios_sap'] is None
+    assert df_conceptos['SAP'].min() >= 90000
+
+
+def test_borrar_estados(datos):
+    cargar_liquidacion(datos / 'liquidacion.txt', incremental=True)
+    assert len(estados()) == 1
+    assert borrar_estados() == 1
+    assert estados() == []
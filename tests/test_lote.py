@@ -0,0 +1,44 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Lotes desde un directorio: los comprimidos sin TXT (p. ej. una exportación
+# anterior) se omiten; si se indican explícitamente, son un error.
+
+import shutil
+import zipfile
+
+import pytest
+
+from liquidacion import ErrorArchivoLiquidacion, listar_archivos_liquidacion
+from liquidacion.cli import main
+
+
+@pytest.fixture
+def directorio(datos, tmp_path):
+    lote = tmp_path / 'lote'
+    lote.mkdir()
+    shutil.copy(datos / 'liquidacion.txt', lote / 'liq_2025-01.txt')
+    with zipfile.ZipFile(lote / 'liq_2025-02.zip', 'w') as z:
+        z.write(datos / 'liquidacion.txt', 'liq_2025-02.txt')
+    with zipfile.ZipFile(lote / 'exportacion.zip', 'w') as z:
+        z.writestr('Netos.csv', 'NETO,Valor\n')
+    return lote
+
+
+def test_directorio_omite_comprimidos_sin_txt(directorio):
+    omitidos = []
+    archivos = listar_archivos_liquidacion([directorio], omitidos=omitidos)
+    assert [a.name for a in archivos] == ['liq_2025-01.txt', 'liq_2025-02.txt']
+    assert [nombre for nombre, _ in omitidos] == ['exportacion.zip']
+
+
+def test_comprimido_explicito_sin_txt(directorio):
+    with pytest.raises(ErrorArchivoLiquidacion, match='exportacion.zip'):
+        listar_archivos_liquidacion([directorio / 'exportacion.zip'])
+
+
+def test_cli_lote_con_su_propia_exportacion(datos, directorio, capsys):
+    """Un lote que escribe su .zip en el mismo directorio se puede volver a correr"""
+    for _ in range(2):
+        codigo = main(['lote', '-m', str(datos / 'masterdata.xlsx'), str(directorio), '-f', 'csv',
+                       '-o', str(directorio / 'consolidado.zip'), '-q', '--sin-snapshot'])
+        assert codigo == 0
+    assert 'consolidado.zip se omite' in capsys.readouterr().err
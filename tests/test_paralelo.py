@@ -0,0 +1,72 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Parsing en paralelo: mismo resultado que el secuencial por cualquier fuente,
+# cada proceso lee solo su rango y el paralelismo se pide y tiene umbral.
+
+import io
+
+import pandas as pd
+import pytest
+
+from liquidacion import escanear_liquidacion, escanear_liquidacion_paralelo, parsear_lote
+from liquidacion import lote, paralelo
+
+
+def assert_iguales(actual, esperado):
+    for df_actual, df_esperado in zip(actual, esperado):
+        pd.testing.assert_frame_equal(df_actual, df_esperado)
+        assert df_actual.attrs['importes_no_convertidos'] == df_esperado.attrs['importes_no_convertidos']
+
+
+@pytest.fixture
+def contenido(datos) -> bytes:
+    return (datos / 'liquidacion.txt').read_bytes()
+
+
+@pytest.mark.parametrize('bloques', [False, True])
+def test_ruta_igual_al_secuencial(datos, bloques):
+    ruta = datos / 'liquidacion.txt'
+    assert_iguales(escanear_liquidacion_paralelo(ruta, 3, min_bytes=0, bloques=bloques),
+                   escanear_liquidacion(ruta, bloques=bloques))
+
+
+def test_subido_igual_al_secuencial(contenido):
+    subido = io.BytesIO(contenido)
+    subido.name = 'liquidacion.txt'
+    esperado = escanear_liquidacion(contenido)
+    assert_iguales(escanear_liquidacion_paralelo(subido, 2, min_bytes=0), esperado)
+    assert_iguales(escanear_liquidacion_paralelo(contenido, 2, min_bytes=0), esperado)
+
+
+def test_rango_por_bloques(datos, contenido, monkeypatch):
+    """Cada trozo se lee por bloques pequeños y da lo mismo que sus bytes en memoria"""
+    monkeypatch.setattr(paralelo, 'TAM_BLOQUE_LECTURA', 64)
+    limites = paralelo.limites_bloques(contenido)
+    inicio, fin = limites[3], limites[10]
+    df_conceptos, df_netos, lineas = paralelo._parsear_trozo(datos / 'liquidacion.txt', inicio, fin)
+    assert lineas == contenido[inicio:fin].count(b'\n')
+    assert_iguales((df_conceptos, df_netos), escanear_liquidacion(contenido[inicio:fin]))
+
+
+def test_secuencial_por_defecto(datos, monkeypatch):
+    def sin_pool(*args, **kwargs):
+        raise AssertionError("no se debía abrir un pool de procesos")
+
+    monkeypatch.setattr(paralelo, 'ProcessPoolExecutor', sin_pool)
+    monkeypatch.setattr(lote, 'ProcessPoolExecutor', sin_pool)
+    ruta = datos / 'liquidacion.txt'
+    escanear_liquidacion_paralelo(ruta)
+    escanear_liquidacion_paralelo(ruta, 4)
+    parsear_lote([ruta, ruta], 4)
+
+
+def test_lote_en_procesos(datos, monkeypatch):
+    monkeypatch.setattr(lote, 'MIN_BYTES_PARALELO', 0)
+    ruta = datos / 'liquidacion.txt'
+    en_procesos = parsear_lote([ruta, ruta], 2)
+    secuencial = parsear_lote([ruta, ruta])
+    for actual, esperado in zip(en_procesos, secuencial):
+        pd.testing.assert_frame_equal(actual, esperado)
+
+
+def test_contexto_sin_fork():
+    assert paralelo.contexto_procesos().get_start_method() in ('forkserver', 'spawn')
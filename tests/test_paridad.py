@@ -0,0 +1,71 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Paridad con la versión original: las hojas Netos y Preno_Convertida deben
+# quedar iguales a las de esperado.xlsx (ver conftest.py) por cualquier camino.
+
+import io
+
+import pandas as pd
+import pytest
+
+from liquidacion import (
+    CacheLRU, crear_excel_descarga, escanear_liquidacion, procesar_archivos,
+    procesar_liquidacion_pipeline, procesar_netos_pipeline,
+)
+
+
+def hojas_excel(destino) -> dict:
+    return pd.read_excel(io.BytesIO(destino.getvalue()), sheet_name=None)
+
+
+def verificar_paridad(datos, df_conceptos, df_netos, masterdata_df):
+    destino = io.BytesIO()
+    crear_excel_descarga(df_conceptos, df_netos, masterdata_df, destino=destino)
+    actual = hojas_excel(destino)
+    esperado = pd.read_excel(datos / 'esperado.xlsx', sheet_name=None)
+    assert list(actual) == list(esperado)
+    for hoja, df_esperado in esperado.items():
+        pd.testing.assert_frame_equal(actual[hoja], df_esperado, check_dtype=False, obj=hoja)
+
+
+@pytest.mark.parametrize('snapshots', [False, True])
+def test_procesar_archivos_rutas(datos, snapshots):
+    resultado = procesar_archivos(datos / 'liquidacion.txt', datos / 'masterdata.xlsx', snapshots=snapshots)
+    verificar_paridad(datos, *resultado)
+
+
+def test_procesar_archivos_subidos(datos):
+    liquidacion = io.BytesIO((datos / 'liquidacion.txt').read_bytes())
+    liquidacion.name = 'liquidacion.txt'
+    masterdata = io.BytesIO((datos / 'masterdata.xlsx').read_bytes())
+    masterdata.name = 'masterdata.xlsx'
+    verificar_paridad(datos, *procesar_archivos(liquidacion, masterdata, snapshots=False))
+
+
+def test_procesar_archivos_texto(datos):
+    texto = (datos / 'liquidacion.txt').read_bytes().decode('latin-1')
+    verificar_paridad(datos, *procesar_archivos(None, datos / 'masterdata.xlsx', snapshots=False, texto=texto))
+
+
+def test_procesar_archivos_cache(datos):
+    cache = CacheLRU(64 * 1024 * 1024)
+    primero = procesar_archivos(datos / 'liquidacion.txt', datos / 'masterdata.xlsx', cache=cache)
+    segundo = procesar_archivos(datos / 'liquidacion.txt', datos / 'masterdata.xlsx', cache=cache)
+    assert segundo[0] is primero[0]
+    verificar_paridad(datos, *segundo)
+
+
+def test_procesar_archivos_incremental(datos):
+    for _ in range(2):
+        resultado = procesar_archivos(datos / 'liquidacion.txt', datos / 'masterdata.xlsx', snapshots=False,
+                                      incremental=True)
+        verificar_paridad(datos, *resultado)
+
+
+def test_pipelines_compatibles(datos):
+    texto = (datos / 'liquidacion.txt').read_bytes().decode('latin-1')
+    df_conceptos, df_netos = escanear_liquidacion(datos / 'liquidacion.txt')
+    pd.testing.assert_frame_equal(procesar_liquidacion_pipeline(texto), df_conceptos)
+    pd.testing.assert_frame_equal(procesar_netos_pipeline(texto), df_netos)
+    esperado = pd.read_excel(datos / 'esperado.xlsx', sheet_name=None)
+    assert len(df_conceptos) == len(esperado['Preno_Convertida'])
+    assert len(df_netos) == len(esperado['Netos'])
@@ -0,0 +1,60 @@
+# Jerónimo Martins Colombia — Nómina 2025
+# Pool de trabajos: los trabajos con la misma clave se comparten y desde otra
+# sesión solo se reconecta quien presenta la llave de acceso.
+
+import threading
+
+import pytest
+
+from liquidacion import GestorTrabajos, procesar_y_exportar
+from liquidacion.trabajos import FALLIDO, TERMINADO
+
+
+@pytest.fixture
+def gestor() -> GestorTrabajos:
+    return GestorTrabajos(max_trabajos=1, max_guardados=2)
+
+
+def test_misma_clave_comparte_el_trabajo(gestor):
+    liberar = threading.Event()
+    primero = gestor.enviar(liberar.wait, clave=('a',))
+    segundo = gestor.enviar(liberar.wait, clave=('a',))
+    otro = gestor.enviar(liberar.wait, clave=('b',))
+    liberar.set()
+    assert segundo is primero and otro is not primero
+    assert primero.esperar(10) and otro.esperar(10)
+    assert primero.estado == TERMINADO and primero.resultado is True
+
+
+def test_fallido_no_se_comparte(gestor):
+    fallido = gestor.enviar(lambda: 1 / 0, clave=('a',))
+    fallido.esperar(10)
+    assert fallido.estado == FALLIDO and isinstance(fallido.error, ZeroDivisionError)
+    nuevo = gestor.enviar(lambda: 1, clave=('a',))
+    assert nuevo is not fallido and nuevo.esperar(10) and nuevo.resultado == 1
+
+
+def test_reconectar_con_llave(gestor):
+    trabajo = gestor.enviar(lambda: 1, acceso=('huella_liquidacion', 'huella_masterdata'))
+    sin_llave = gestor.enviar(lambda: 2)
+    assert gestor.reconectar(trabajo.id, ('huella_liquidacion', 'huella_masterdata')) is trabajo
+    assert gestor.reconectar(trabajo.id, ('otra', 'huella_masterdata')) is None
+    assert gestor.reconectar(trabajo.id, None) is None
+    assert gestor.reconectar(sin_llave.id, None) is None
+    assert gestor.obtener(sin_llave.id) is sin_llave
+
+
+def test_descarta_los_terminados_mas_antiguos(gestor):
+    trabajos = [gestor.enviar(lambda i=i: i) for i in range(4)]
+    for trabajo in trabajos:
+        trabajo.esperar(10)
+    assert [t.id for t in gestor.trabajos()] == [t.id for t in reversed(trabajos[2:])]
+
+
+def test_procesar_y_exportar_en_el_pool(gestor, datos):
+    trabajo = gestor.enviar(procesar_y_exportar, [datos / 'liquidacion.txt'], datos / 'masterdata.xlsx',
+                            formato='csv', max_procesos=1)
+    assert trabajo.esperar(60)
+    assert trabajo.estado == TERMINADO, trabajo.error
+    assert list(trabajo.resultado['exportaciones']) == ['csv']
+    assert trabajo.ejecucion.segundos > 0